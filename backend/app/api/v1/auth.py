@@ -1,5 +1,7 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db, Base, engine
 from app.schemas.schemas import UserCreate, LoginRequest, Token, UserOut
 from app.models.models import User
@@ -11,21 +13,22 @@ router = APIRouter()
 Base.metadata.create_all(bind=engine)
 
 @router.post("/register", response_model=UserOut)
-def register(payload: UserCreate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.phone == payload.phone).first()
+async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)):
+    user = (await db.execute(select(User).where(User.phone == payload.phone))).scalars().first()
     if user:
         raise HTTPException(status_code=400, detail="Phone already registered")
-    hashed = get_password_hash(payload.password)
+    # bcrypt is deliberately slow; keep it off the event loop
+    hashed = await asyncio.to_thread(get_password_hash, payload.password)
     new = User(name=payload.name, phone=payload.phone, hashed_password=hashed, language_preference=payload.language_preference)
     db.add(new)
-    db.commit()
-    db.refresh(new)
+    await db.commit()
+    await db.refresh(new)
     return new
 
 @router.post("/login", response_model=Token)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.phone == payload.phone).first()
-    if not user or not verify_password(payload.password, user.hashed_password):
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
+    user = (await db.execute(select(User).where(User.phone == payload.phone))).scalars().first()
+    if not user or not await asyncio.to_thread(verify_password, payload.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     token = create_access_token(subject=str(user.id))
     return Token(access_token=token)
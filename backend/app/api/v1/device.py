@@ -1,6 +1,7 @@
 # backend/app/api/v1/device.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 from app.db.session import get_db
 from app.models.models import Device, RefreshToken
@@ -13,23 +14,25 @@ router = APIRouter()
 
 @router.post("/bind", response_model=DeviceBindOut)
 
-def bind_device(device_uid: str, user = Depends(get_current_user), db: Session = Depends(get_db)):
+async def bind_device(device_uid: str, user = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """
     Bind a device UID to the user and create a refresh token tied to device.
     Client provides a device_uid (UUID) from the mobile app.
     """
-    d = db.query(Device).filter(Device.device_uid == device_uid, Device.user_id == user.id).first()
+    d = (await db.execute(
+        select(Device).where(Device.device_uid == device_uid, Device.user_id == user.id)
+    )).scalars().first()
     if not d:
         d = Device(user_id=user.id, device_uid=device_uid)
         db.add(d)
-        db.commit()
-        db.refresh(d)
+        await db.commit()
+        await db.refresh(d)
 
     # Create refresh token (random UUID)
     refresh_token = str(uuid.uuid4())
     rt = RefreshToken(user_id=user.id, device_id=d.id, token=refresh_token)
     db.add(rt)
-    db.commit()
+    await db.commit()
 
     # Also return access token for immediate use
     access = create_access_token(subject=str(user.id))
@@ -1,74 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional
 from app.db.session import get_db
+from app.db.replicas import get_read_db
 from app.models.models import Farm, User
-from app.schemas.schemas import FarmCreate, FarmOut, FarmUpdate
-from shapely.geometry import shape, mapping
-from geoalchemy2.shape import from_shape, to_shape
-from app.core.auth import get_current_user
+from app.schemas.schemas import FarmCreate, FarmOut, FarmUpdate, FarmLocationOut, FarmImportOut
+from shapely.geometry import shape
+from app.core.auth import get_current_user, get_current_reader
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.services.farm_geometry import set_farm_geometry
+from app.services.farm_geojson import farm_list_page, farm_detail
+from app.services.farm_tiles import MVT_CONTENT_TYPE, get_farm_tile, invalidate_user_tiles, valid_tile
+from app.services.farm_spatial import farms_near, farms_in_bbox, farms_in_district, parse_bbox
+from app.services.farm_import import import_feature_collection
 
 router = APIRouter()
 
 
-def wkb_to_geojson(wkb_element):
-    """Convert WKBElement to GeoJSON dict"""
-    if wkb_element is None:
-        return None
-    shapely_geom = to_shape(wkb_element)
-    return mapping(shapely_geom)
-
-
-def calculate_area_ha(geom_obj, db: Session = None):
-    """Calculate area in hectares using geodesic calculation"""
-    try:
-        if geom_obj.geom_type == 'Polygon':
-            # Use Shapely's area (planar in degrees) and convert to hectares
-            # For WGS84 (EPSG:4326), we need to account for latitude
-            coords = list(geom_obj.exterior.coords)
-            if len(coords) > 0:
-                # Calculate average latitude for accurate conversion
-                avg_lat = sum(coord[1] for coord in coords) / len(coords)
-                
-                # Convert degrees to meters at this latitude
-                # 1 degree latitude ≈ 111,320 meters (constant)
-                # 1 degree longitude ≈ 111,320 * cos(latitude) meters
-                lat_meters_per_deg = 111320.0
-                lon_meters_per_deg = 111320.0 * abs(geom_obj.centroid.x) * 0.017453292519943295
-                
-                # Area in square degrees (from Shapely)
-                area_sq_deg = abs(geom_obj.area)
-                
-                # Convert to square meters, then to hectares
-                # Approximation: use average of lat/lon factors
-                meters_per_deg_avg = (lat_meters_per_deg + lon_meters_per_deg) / 2
-                area_sq_m = area_sq_deg * (meters_per_deg_avg ** 2)
-                area_ha = area_sq_m / 10000  # convert m² to hectares
-                
-                return round(area_ha, 2)
-    except Exception:
-        pass
-    return None
-
-
 @router.get("/", response_model=List[FarmOut])
-def list_farms(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """List all farms belonging to the current user"""
-    farms = db.query(Farm).filter(Farm.user_id == user.id).order_by(Farm.created_at.desc()).all()
-    result = []
-    for farm in farms:
-        geom_json = wkb_to_geojson(farm.geom) if farm.geom else None
-        result.append(FarmOut(
-            id=farm.id,
-            name=farm.name,
-            area_ha=farm.area_ha,
-            geom=geom_json or {"type": "Polygon", "coordinates": []}
-        ))
-    return result
+async def list_farms(
+    zoom: Optional[int] = Query(default=None, ge=0, le=22, description="Simplify geometry for this map zoom"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    user: User = Depends(get_current_reader),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """List the current user's farms, newest first; the X-Next-Cursor header continues the list"""
+    after = decode_cursor(cursor, "farms", (datetime, int))
+    # Serialized in PostGIS; returned as-is without per-row Pydantic validation
+    content, next_key = await db.run_sync(farm_list_page, user.id, zoom, limit, after)
+    response = Response(content=content, media_type="application/json")
+    set_next_cursor(response, "farms", next_key)
+    return response
 
 
 @router.post("/", response_model=FarmOut)
-def create_farm(payload: FarmCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_farm(payload: FarmCreate, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Create a new farm with GeoJSON polygon boundary"""
     # payload.geom expected to be GeoJSON Polygon
     try:
@@ -78,44 +47,118 @@ def create_farm(payload: FarmCreate, user: User = Depends(get_current_user), db:
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid geometry: {str(e)}")
     
-    geom_wkb = from_shape(geom_obj, srid=4326)
-    area_ha = calculate_area_ha(geom_obj)
-    
-    farm = Farm(user_id=user.id, name=payload.name, geom=geom_wkb, area_ha=area_ha)
+    farm = Farm(user_id=user.id, name=payload.name)
+    set_farm_geometry(farm, geom_obj)
     db.add(farm)
-    db.commit()
-    db.refresh(farm)
-    
-    geom_json = wkb_to_geojson(farm.geom)
-    return FarmOut(id=farm.id, name=farm.name, area_ha=farm.area_ha, geom=geom_json or payload.geom)
+    await invalidate_user_tiles(db, user.id)
+    await db.commit()
+    return await db.run_sync(farm_detail, farm.id, user.id)
+
+
+@router.post("/import", response_model=FarmImportOut)
+async def import_farms(
+    collection: dict = Body(..., description="GeoJSON FeatureCollection of Polygon features"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bulk-create farms from a GeoJSON FeatureCollection; invalid features are reported, not imported"""
+    try:
+        result = await import_feature_collection(db, user.id, collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result["imported"]:
+        await invalidate_user_tiles(db, user.id)
+    await db.commit()
+    return result
+
+
+@router.get("/near", response_model=List[FarmLocationOut])
+async def list_farms_near(
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(default=5000, gt=0, le=200_000),
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Farms within radius_m metres of a point, nearest first"""
+    after = decode_cursor(cursor, "farms_near", (float, int))
+    farms, next_key = await db.run_sync(farms_near, user.id, lat, lon, radius_m, limit, after)
+    set_next_cursor(response, "farms_near", next_key)
+    return farms
+
+
+@router.get("/within", response_model=List[FarmLocationOut])
+async def list_farms_within(
+    response: Response,
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Farms intersecting a bounding box, by id"""
+    bounds = parse_bbox(bbox)
+    if not bounds:
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    after = decode_cursor(cursor, "farms_within", (int,))
+    farms, next_key = await db.run_sync(farms_in_bbox, user.id, *bounds, limit, after)
+    set_next_cursor(response, "farms_within", next_key)
+    return farms
+
+
+@router.get("/district/{district}", response_model=List[FarmLocationOut])
+async def list_farms_in_district(
+    district: str,
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Farms in an Odisha district (nearest district centre), by id"""
+    after = decode_cursor(cursor, "farms_district", (int,))
+    farms, next_key = await db.run_sync(farms_in_district, user.id, district, limit, after)
+    set_next_cursor(response, "farms_district", next_key)
+    return farms
+
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_farm_tile_mvt(
+    z: int,
+    x: int,
+    y: int,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Mapbox Vector Tile (layer "farms") of the current user's farm boundaries"""
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+    tile = await get_farm_tile(db, user.id, z, x, y)
+    return Response(content=tile, media_type=MVT_CONTENT_TYPE, headers={"Cache-Control": "private, max-age=60"})
 
 
 @router.get("/{farm_id}", response_model=FarmOut)
-def get_farm(farm_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_farm(farm_id: int, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get a specific farm by ID"""
-    farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+    farm = await db.run_sync(farm_detail, farm_id, user.id)
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found")
-    
-    geom_json = wkb_to_geojson(farm.geom) if farm.geom else None
-    return FarmOut(
-        id=farm.id,
-        name=farm.name,
-        area_ha=farm.area_ha,
-        geom=geom_json or {"type": "Polygon", "coordinates": []}
-    )
+    return farm
 
 
 @router.put("/{farm_id}", response_model=FarmOut)
 @router.patch("/{farm_id}", response_model=FarmOut)
-def update_farm(
+async def update_farm(
     farm_id: int,
     payload: FarmUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a farm (name and/or geometry)"""
-    farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+    farm = (await db.execute(select(Farm).where(Farm.id == farm_id, Farm.user_id == user.id))).scalars().first()
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found")
     
@@ -132,32 +175,24 @@ def update_farm(
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid geometry: {str(e)}")
         
-        geom_wkb = from_shape(geom_obj, srid=4326)
-        farm.geom = geom_wkb
-        # Recalculate area
-        farm.area_ha = calculate_area_ha(geom_obj)
-    
-    db.commit()
-    db.refresh(farm)
+        # Recalculate area, centroid and bounding box
+        set_farm_geometry(farm, geom_obj)
     
-    geom_json = wkb_to_geojson(farm.geom) if farm.geom else None
-    return FarmOut(
-        id=farm.id,
-        name=farm.name,
-        area_ha=farm.area_ha,
-        geom=geom_json or {"type": "Polygon", "coordinates": []}
-    )
+    await invalidate_user_tiles(db, user.id)
+    await db.commit()
+    return await db.run_sync(farm_detail, farm.id, user.id)
 
 
 @router.delete("/{farm_id}")
-def delete_farm(farm_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_farm(farm_id: int, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Delete a farm and all associated data"""
-    farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+    farm = (await db.execute(select(Farm).where(Farm.id == farm_id, Farm.user_id == user.id))).scalars().first()
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found")
     
     # Note: In production, you might want to check for associated soil samples/predictions
     # and either cascade delete or prevent deletion if data exists
-    db.delete(farm)
-    db.commit()
+    await db.delete(farm)
+    await invalidate_user_tiles(db, user.id)
+    await db.commit()
     return {"message": "Farm deleted successfully"}
@@ -1,13 +1,17 @@
 # backend/app/api/v1/predict.py
 
-from typing import Dict, Any, List
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
-from app.core.auth import get_current_user
-from app.models.models import Farm, Prediction, User
+from app.db.replicas import get_read_db
+from app.core.auth import get_current_user, get_current_reader
+from app.core.pagination import decode_cursor, newest_first, set_next_cursor
+from app.models.models import Farm, Prediction, SoilSample, User
 from app.schemas.schemas import (
     PredictIn,
     PredictOut,
@@ -22,22 +26,27 @@ router = APIRouter()
 
 
 @router.post("/", response_model=PredictOut)
-def predict(
+async def predict(
     payload: PredictIn,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     # 1) Ensure farm belongs to this user
     farm = (
-        db.query(Farm)
-        .filter(Farm.id == payload.farm_id, Farm.user_id == user.id)
-        .first()
-    )
+        await db.execute(select(Farm).where(Farm.id == payload.farm_id, Farm.user_id == user.id))
+    ).scalars().first()
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found")
 
     # 2) Build input features from latest soil sample if present
-    latest_soil = farm.soils[-1] if farm.soils else None
+    latest_soil = (
+        await db.execute(
+            select(SoilSample)
+            .where(SoilSample.farm_id == farm.id)
+            .order_by(SoilSample.sample_date.desc(), SoilSample.id.desc())  # ix_soil_samples_farm_date
+            .limit(1)
+        )
+    ).scalars().first()
     inputs: Dict[str, Any] = {"crop": payload.crop}
     if latest_soil:
         inputs.update(
@@ -124,8 +133,8 @@ def predict(
         inputs=save_inputs,
     )
     db.add(pred)
-    db.commit()
-    db.refresh(pred)
+    await db.commit()
+    await db.refresh(pred)
 
     # 7) Return response matching PredictOut schema
     return PredictOut(
@@ -224,37 +233,43 @@ def simple_predict(
 
 
 @router.get("/farm/{farm_id}", response_model=List[PredictionOut])
-def list_predictions_for_farm(
+async def list_predictions_for_farm(
     farm_id: int,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    user: User = Depends(get_current_reader),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """List all predictions for a specific farm"""
-    farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+    """List the predictions of a specific farm, newest first"""
+    farm = (await db.execute(select(Farm).where(Farm.id == farm_id, Farm.user_id == user.id))).scalars().first()
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found")
     
-    predictions = (
-        db.query(Prediction)
-        .filter(Prediction.farm_id == farm_id)
-        .order_by(Prediction.date_run.desc())
-        .all()
-    )
+    after = decode_cursor(cursor, "predictions", (datetime, int))
+    query = newest_first(select(Prediction).where(Prediction.farm_id == farm_id), Prediction.date_run, Prediction.id, after, limit)
+    rows = (await db.execute(query)).scalars().all()
+    predictions = rows[:limit]
+    set_next_cursor(response, "predictions", (predictions[-1].date_run, predictions[-1].id) if len(rows) > limit else None)
     return predictions
 
 
 @router.get("/{prediction_id}", response_model=PredictionOut)
-def get_prediction(
+async def get_prediction(
     prediction_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Get a specific prediction by ID"""
-    pred = db.query(Prediction).filter(Prediction.id == prediction_id).first()
-    if not pred:
+    # The prediction and its farm's owner in one query
+    row = (await db.execute(
+        select(Prediction, Farm.user_id).outerjoin(Farm, Farm.id == Prediction.farm_id).where(Prediction.id == prediction_id)
+    )).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Prediction not found")
     
-    if pred.farm.user_id != user.id:
+    pred, owner_id = row
+    if owner_id != user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
     return pred
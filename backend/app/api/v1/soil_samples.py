@@ -1,23 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional, Tuple
 from app.db.session import get_db
-from app.core.auth import get_current_user
+from app.db.replicas import get_read_db
+from app.core.auth import get_current_user, get_current_reader
+from app.core.pagination import decode_cursor, newest_first, set_next_cursor
 from app.models.models import SoilSample, Farm, User
 from app.schemas.schemas import SoilSampleIn, SoilSampleOut, SoilSampleUpdate
 
 router = APIRouter()
 
 
+async def _owned_farm(db: AsyncSession, farm_id: int, user: User) -> Optional[Farm]:
+    return (await db.execute(select(Farm).where(Farm.id == farm_id, Farm.user_id == user.id))).scalars().first()
+
+
+async def _sample_and_owner(db: AsyncSession, sample_id: int) -> Tuple[Optional[SoilSample], Optional[int]]:
+    """A soil sample and the user id owning its farm, in one query"""
+    row = (await db.execute(
+        select(SoilSample, Farm.user_id).outerjoin(Farm, Farm.id == SoilSample.farm_id).where(SoilSample.id == sample_id)
+    )).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+async def _sample_page(db: AsyncSession, query, limit: int, cursor: Optional[str], response: Response) -> List[SoilSample]:
+    """One page of ``query``, newest sample first, with the next page's cursor set on ``response``"""
+    after = decode_cursor(cursor, "soil_samples", (datetime, int))
+    rows = (await db.execute(newest_first(query, SoilSample.sample_date, SoilSample.id, after, limit))).scalars().all()
+    samples = rows[:limit]
+    set_next_cursor(response, "soil_samples", (samples[-1].sample_date, samples[-1].id) if len(rows) > limit else None)
+    return samples
+
+
 @router.post("/", response_model=SoilSampleOut)
-def create_soil_sample(
+async def create_soil_sample(
     payload: SoilSampleIn,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """Create a new soil sample for a farm"""
     # validate farm ownership
-    farm = db.query(Farm).filter(Farm.id == payload.farm_id, Farm.user_id == user.id).first()
+    farm = await _owned_farm(db, payload.farm_id, user)
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found or not owned by user")
     
@@ -30,59 +55,63 @@ def create_soil_sample(
         extra=payload.extra
     )
     db.add(s)
-    db.commit()
-    db.refresh(s)
+    await db.commit()
+    await db.refresh(s)
     return s
 
 
 @router.get("/", response_model=List[SoilSampleOut])
-def list_all_soil_samples(
+async def list_all_soil_samples(
+    response: Response,
     farm_id: Optional[int] = Query(None, description="Filter by farm ID"),
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_reader)
 ):
-    """List all soil samples for the user, optionally filtered by farm_id"""
-    query = db.query(SoilSample).join(Farm).filter(Farm.user_id == user.id)
+    """List the user's soil samples, newest first, optionally filtered by farm_id"""
+    query = select(SoilSample).join(Farm).where(Farm.user_id == user.id)
     
     if farm_id is not None:
         # Verify farm ownership
-        farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+        farm = await _owned_farm(db, farm_id, user)
         if not farm:
             raise HTTPException(status_code=404, detail="Farm not found or not owned by user")
-        query = query.filter(SoilSample.farm_id == farm_id)
+        query = query.where(SoilSample.farm_id == farm_id)
     
-    samples = query.order_by(SoilSample.sample_date.desc()).all()
-    return samples
+    return await _sample_page(db, query, limit, cursor, response)
 
 
 @router.get("/farm/{farm_id}", response_model=List[SoilSampleOut])
-def list_soil_samples_for_farm(
+async def list_soil_samples_for_farm(
     farm_id: int,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_reader)
 ):
-    """List all soil samples for a specific farm"""
-    farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+    """List the soil samples of a specific farm, newest first"""
+    farm = await _owned_farm(db, farm_id, user)
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found or not owned by user")
     
-    samples = db.query(SoilSample).filter(SoilSample.farm_id == farm_id).order_by(SoilSample.sample_date.desc()).all()
-    return samples
+    return await _sample_page(db, select(SoilSample).where(SoilSample.farm_id == farm_id), limit, cursor, response)
 
 
 @router.get("/{sample_id}", response_model=SoilSampleOut)
-def get_soil_sample(
+async def get_soil_sample(
     sample_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """Get a specific soil sample by ID"""
-    s = db.query(SoilSample).filter(SoilSample.id == sample_id).first()
+    s, owner_id = await _sample_and_owner(db, sample_id)
     if not s:
         raise HTTPException(status_code=404, detail="Soil sample not found")
     
     # Verify farm ownership
-    if s.farm.user_id != user.id:
+    if owner_id != user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
     return s
@@ -90,19 +119,19 @@ def get_soil_sample(
 
 @router.put("/{sample_id}", response_model=SoilSampleOut)
 @router.patch("/{sample_id}", response_model=SoilSampleOut)
-def update_soil_sample(
+async def update_soil_sample(
     sample_id: int,
     payload: SoilSampleUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """Update a soil sample"""
-    s = db.query(SoilSample).filter(SoilSample.id == sample_id).first()
+    s, owner_id = await _sample_and_owner(db, sample_id)
     if not s:
         raise HTTPException(status_code=404, detail="Soil sample not found")
     
     # Verify farm ownership
-    if s.farm.user_id != user.id:
+    if owner_id != user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Update fields if provided
@@ -117,26 +146,26 @@ def update_soil_sample(
     if payload.extra is not None:
         s.extra = payload.extra
     
-    db.commit()
-    db.refresh(s)
+    await db.commit()
+    await db.refresh(s)
     return s
 
 
 @router.delete("/{sample_id}")
-def delete_soil_sample(
+async def delete_soil_sample(
     sample_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """Delete a soil sample"""
-    s = db.query(SoilSample).filter(SoilSample.id == sample_id).first()
+    s, owner_id = await _sample_and_owner(db, sample_id)
     if not s:
         raise HTTPException(status_code=404, detail="Soil sample not found")
     
     # Verify farm ownership
-    if s.farm.user_id != user.id:
+    if owner_id != user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    db.delete(s)
-    db.commit()
+    await db.delete(s)
+    await db.commit()
     return {"message": "Soil sample deleted successfully"}
@@ -1,13 +1,16 @@
 # backend/app/api/v1/sync.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
-from app.core.auth import get_current_user
+from app.db.replicas import get_read_db
+from app.core.auth import get_current_user, get_current_reader
+from app.core.pagination import decode_cursor, encode_cursor, oldest_first
 from app.models.models import SyncLog, SoilSample, Farm
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timezone
 
 router = APIRouter()
 
@@ -27,16 +30,22 @@ class PushOutItem(BaseModel):
 class PushOut(BaseModel):
     results: List[PushOutItem]
 
+async def _find_sync_log(db: AsyncSession, user_id: int, rec: ClientRecord) -> Optional[SyncLog]:
+    """Idempotency key: same user_id + client_id + record_type"""
+    return (await db.execute(select(SyncLog).where(
+        SyncLog.user_id == user_id,
+        SyncLog.client_id == rec.client_id,
+        SyncLog.record_type == rec.record_type
+    ))).scalars().first()
+
 @router.post("/push", response_model=PushOut)
-def sync_push(body: PushIn, user=Depends(get_current_user), db: Session = Depends(get_db)):
+async def sync_push(body: PushIn, user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # Read before any rollback: expired attributes cannot be lazy-loaded in async code
+    user_id = user.id
     results = []
     for rec in body.records:
         # Check idempotency: same user_id + client_id + record_type
-        existing = db.query(SyncLog).filter(
-            SyncLog.user_id == user.id,
-            SyncLog.client_id == rec.client_id,
-            SyncLog.record_type == rec.record_type
-        ).first()
+        existing = await _find_sync_log(db, user_id, rec)
         if existing:
             results.append({"client_id": rec.client_id, "record_type": rec.record_type, "server_id": existing.server_id})
             continue
@@ -58,33 +67,29 @@ def sync_push(body: PushIn, user=Depends(get_current_user), db: Session = Depend
                     extra=payload.get("extra", None)
                 )
                 db.add(ss)
-                db.commit()
-                db.refresh(ss)
+                await db.commit()
+                await db.refresh(ss)
                 server_id = ss.id
             elif rec.record_type == "farm":
                 # For farms pushed from client (with geojson), create farm entry
                 p = rec.payload
                 # p should include name and geom (GeoJSON). We store geom as NULL here for simplicity OR try to convert.
-                f = Farm(user_id=user.id, name=p.get("name"), area_ha=p.get("area_ha"))
+                f = Farm(user_id=user_id, name=p.get("name"), area_ha=p.get("area_ha"))
                 db.add(f)
-                db.commit()
-                db.refresh(f)
+                await db.commit()
+                await db.refresh(f)
                 server_id = f.id
             else:
                 # For unknown types, just record payload
                 pass
 
-            sync = SyncLog(user_id=user.id, client_id=rec.client_id, record_type=rec.record_type, server_id=server_id, payload=rec.payload)
+            sync = SyncLog(user_id=user_id, client_id=rec.client_id, record_type=rec.record_type, server_id=server_id, payload=rec.payload)
             db.add(sync)
-            db.commit()
+            await db.commit()
             results.append({"client_id": rec.client_id, "record_type": rec.record_type, "server_id": server_id})
         except IntegrityError:
-            db.rollback()
-            existing = db.query(SyncLog).filter(
-                SyncLog.user_id == user.id,
-                SyncLog.client_id == rec.client_id,
-                SyncLog.record_type == rec.record_type
-            ).first()
+            await db.rollback()
+            existing = await _find_sync_log(db, user_id, rec)
             server_id = existing.server_id if existing else None
             results.append({"client_id": rec.client_id, "record_type": rec.record_type, "server_id": server_id})
     return {"results": results}
@@ -97,12 +102,23 @@ class PullOutRecord(BaseModel):
 
 class PullOut(BaseModel):
     records: List[PullOutRecord]
+    next_cursor: Optional[str] = None
+
+# Soil samples start after this key once the farms are exhausted
+_SOILS_START = (datetime(1970, 1, 1, tzinfo=timezone.utc), 0)
 
 @router.get("/pull", response_model=PullOut)
-def sync_pull(since: Optional[str] = None, user=Depends(get_current_user), db: Session = Depends(get_db)):
+async def sync_pull(
+    since: Optional[str] = None,
+    limit: int = Query(default=500, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    user=Depends(get_current_reader),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
-    Pull records changed since timestamp `since` (ISO format). If not provided, pull last 100 records.
-    For demo we will pull soil_samples and farms.
+    Pull records changed since timestamp `since` (ISO format): farms, then soil samples, oldest first.
+    Each page holds up to `limit` records; repeat with the same `since` and the returned
+    `next_cursor` until it is null.
     """
     q_since = None
     if since:
@@ -110,24 +126,36 @@ def sync_pull(since: Optional[str] = None, user=Depends(get_current_user), db: S
             q_since = datetime.fromisoformat(since)
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid since timestamp. Use ISO format.")
+    # (stage, sort key, id) of the last record sent; stage 0 is farms, 1 soil samples
+    stage, *after = decode_cursor(cursor, "sync", (int, datetime, int)) or (0,)
 
     records = []
-    # Farms
-    farm_q = db.query(Farm).filter(Farm.user_id == user.id)
-    if q_since:
-        farm_q = farm_q.filter(Farm.created_at >= q_since)
-    farms = farm_q.limit(200).all()
-    for f in farms:
-        payload = {"id": f.id, "name": f.name, "area_ha": f.area_ha}
-        records.append({"record_type": "farm", "server_id": f.id, "payload": payload, "updated_at": f.created_at})
-
-    # Soil samples
-    ss_q = db.query(SoilSample).join(Farm).filter(Farm.user_id == user.id)
-    if q_since:
-        ss_q = ss_q.filter(SoilSample.sample_date >= q_since)
-    soils = ss_q.limit(500).all()
-    for s in soils:
-        payload = {"id": s.id, "farm_id": s.farm_id, "ph": s.ph, "n": s.n, "p": s.p, "k": s.k, "extra": s.extra}
-        records.append({"record_type": "soil_sample", "server_id": s.id, "payload": payload, "updated_at": s.sample_date})
-
-    return {"records": records}
+    next_key = None
+    if stage == 0:
+        farm_q = select(Farm).where(Farm.user_id == user.id)
+        if q_since:
+            farm_q = farm_q.where(Farm.created_at >= q_since)
+        farm_q = oldest_first(farm_q, Farm.created_at, Farm.id, after, limit)
+        farms = (await db.execute(farm_q)).scalars().all()
+        for f in farms[:limit]:
+            payload = {"id": f.id, "name": f.name, "area_ha": f.area_ha}
+            records.append({"record_type": "farm", "server_id": f.id, "payload": payload, "updated_at": f.created_at})
+        if len(farms) > limit:
+            next_key = (0, farms[limit - 1].created_at, farms[limit - 1].id)
+        else:
+            stage, after = 1, _SOILS_START
+
+    if stage == 1 and next_key is None:
+        remaining = limit - len(records)
+        ss_q = select(SoilSample).join(Farm).where(Farm.user_id == user.id)
+        if q_since:
+            ss_q = ss_q.where(SoilSample.sample_date >= q_since)
+        ss_q = oldest_first(ss_q, SoilSample.sample_date, SoilSample.id, after, remaining)
+        soils = (await db.execute(ss_q)).scalars().all()
+        for s in soils[:remaining]:
+            payload = {"id": s.id, "farm_id": s.farm_id, "ph": s.ph, "n": s.n, "p": s.p, "k": s.k, "extra": s.extra}
+            records.append({"record_type": "soil_sample", "server_id": s.id, "payload": payload, "updated_at": s.sample_date})
+        if len(soils) > remaining:
+            next_key = (1, soils[remaining - 1].sample_date, soils[remaining - 1].id) if remaining else (1, *_SOILS_START)
+
+    return {"records": records, "next_cursor": encode_cursor("sync", next_key) if next_key else None}
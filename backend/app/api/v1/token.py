@@ -1,6 +1,7 @@
 # backend/app/api/v1/token.py
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.models.models import RefreshToken, User
 from app.core.security import create_access_token
@@ -16,11 +17,11 @@ class RefreshOut(BaseModel):
     token_type: str = "bearer"
 
 @router.post("/refresh", response_model=RefreshOut)
-def refresh_token(payload: RefreshIn, db: Session = Depends(get_db)):
-    rt = db.query(RefreshToken).filter(RefreshToken.token == payload.refresh_token).first()
+async def refresh_token(payload: RefreshIn, db: AsyncSession = Depends(get_db)):
+    rt = (await db.execute(select(RefreshToken).where(RefreshToken.token == payload.refresh_token))).scalars().first()
     if not rt:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
-    user = db.query(User).filter(User.id == rt.user_id).first()
+    user = await db.get(User, rt.user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     access = create_access_token(subject=str(user.id))
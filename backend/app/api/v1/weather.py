@@ -2,17 +2,32 @@
 Weather API endpoints - Retrieve and manage weather data
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 from app.db.session import get_db
+from app.db.replicas import get_read_db
 from app.models.models import Farm, WeatherData, User
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_reader
+from app.core.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
 from app.services.weather_service import weather_service
-from app.services.agromonitoring_service import agromonitoring_service
-from app.schemas.schemas import WeatherDataOut, DistrictForecastOut
-from shapely.geometry import shape
-from geoalchemy2.shape import to_shape
+from app.services.weather_store import (
+    get_farm_center,
+    fetch_weather_bundle,
+    build_weather_row,
+    build_raw_payload_row,
+    store_weather_rows,
+)
+from app.services.weather_timeseries import get_history, resolution_for_days
+from app.services.weather_schedule import iter_farm_targets
+from app.services.weather_grid import cell_for
+from app.services.weather_interpolation import weather_interpolator
+from app.services.forecast_codec import decode_forecast
+from app.core.background_tasks import refresh_weather
+from app.schemas.schemas import WeatherDataOut, WeatherHistoryOut, DistrictForecastOut
 import logging
 
 logger = logging.getLogger(__name__)
@@ -37,28 +52,17 @@ async def get_district_forecast(
 
 
 
-def get_farm_center(farm: Farm) -> Tuple[Optional[float], Optional[float]]:
-    """Extract center coordinates from farm geometry"""
-    if farm.geom:
-        try:
-            geom = to_shape(farm.geom)
-            centroid = geom.centroid
-            return (centroid.x, centroid.y)  # (longitude, latitude)
-        except Exception as e:
-            logger.error(f"Error extracting farm center: {str(e)}")
-    return None, None
-
-
 @router.post("/fetch/{farm_id}", response_model=WeatherDataOut)
 async def fetch_weather_for_farm(
     farm_id: int,
+    forecast_format: str = Query(default="expanded", pattern="^(expanded|columnar)$"),
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Manually trigger weather data fetch for a specific farm
     """
-    farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+    farm = await _user_farm(db, farm_id, user)
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found")
     
@@ -66,178 +70,162 @@ async def fetch_weather_for_farm(
     if latitude is None or longitude is None:
         raise HTTPException(status_code=400, detail="Farm geometry not available")
     
-    # Fetch current weather
-    weather_data = await weather_service.get_current_weather(latitude, longitude)
-    if not weather_data:
+    cell = cell_for(latitude, longitude)
+    bundle = await fetch_weather_bundle(cell.latitude, cell.longitude)
+    if not bundle:
         raise HTTPException(status_code=503, detail="Weather service unavailable")
-    
-    # Fetch forecast
-    forecast_data = await weather_service.get_forecast(latitude, longitude, days=5)
-    
-    # Fetch agromonitoring data
-    agro_data = await agromonitoring_service.get_soil_data(latitude, longitude)
-    
-    # Store or update weather data
-    existing_weather = db.query(WeatherData).filter(
-        WeatherData.farm_id == farm_id
-    ).order_by(WeatherData.recorded_at.desc()).first()
-    
-    if existing_weather:
-        # Update existing record
-        existing_weather.temperature = weather_data.get("temperature")
-        existing_weather.humidity = weather_data.get("humidity")
-        existing_weather.pressure = weather_data.get("pressure")
-        existing_weather.wind_speed = weather_data.get("wind_speed")
-        existing_weather.wind_direction = weather_data.get("wind_direction")
-        existing_weather.precipitation = weather_data.get("precipitation")
-        existing_weather.visibility = weather_data.get("visibility")
-        existing_weather.weather_description = weather_data.get("weather_description")
-        existing_weather.weather_icon = weather_data.get("weather_icon")
-        existing_weather.forecast_data = forecast_data
-        existing_weather.agromonitoring_data = agro_data
-        existing_weather.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(existing_weather)
-        return existing_weather
-    else:
-        # Create new record
-        new_weather = WeatherData(
-            farm_id=farm_id,
-            latitude=latitude,
-            longitude=longitude,
-            temperature=weather_data.get("temperature"),
-            humidity=weather_data.get("humidity"),
-            pressure=weather_data.get("pressure"),
-            wind_speed=weather_data.get("wind_speed"),
-            wind_direction=weather_data.get("wind_direction"),
-            precipitation=weather_data.get("precipitation"),
-            visibility=weather_data.get("visibility"),
-            weather_description=weather_data.get("weather_description"),
-            weather_icon=weather_data.get("weather_icon"),
-            forecast_data=forecast_data,
-            agromonitoring_data=agro_data
-        )
-        db.add(new_weather)
-        db.commit()
-        db.refresh(new_weather)
-        return new_weather
+
+    await db.run_sync(
+        store_weather_rows,
+        [build_weather_row(cell, bundle)], {farm_id: cell.key}, [build_raw_payload_row(cell, bundle)],
+    )
+    await db.commit()
+    weather = await _weather_row(db, WeatherData.cell_key == cell.key)
+    return _farm_weather_out(weather, farm_id, forecast_format)
+
+
+async def _user_farm(db: AsyncSession, farm_id: int, user: User) -> Optional[Farm]:
+    return (await db.execute(select(Farm).where(Farm.id == farm_id, Farm.user_id == user.id))).scalars().first()
+
+
+async def _weather_row(db: AsyncSession, condition) -> Optional[WeatherData]:
+    return (await db.execute(select(WeatherData).where(condition))).scalars().first()
+
+
+def _farm_cell_key(farm: Farm) -> Optional[str]:
+    """The farm's weather cell, derived from its geometry if not assigned yet"""
+    if farm.weather_cell:
+        return farm.weather_cell
+    longitude, latitude = get_farm_center(farm)
+    if latitude is None or longitude is None:
+        return None
+    return cell_for(latitude, longitude).key
+
+
+def _farm_weather_out(weather: WeatherData, farm_id: int, forecast_format: str = "expanded") -> WeatherDataOut:
+    """
+    Cell rows are shared by farms; report them under the requesting farm.
+    Forecasts are stored columnar and expanded to the original list-of-dicts
+    shape unless the client asks for ``forecast_format=columnar``.
+    """
+    update = {"farm_id": farm_id}
+    if forecast_format != "columnar":
+        update["forecast_data"] = decode_forecast(weather.forecast_data)
+    return WeatherDataOut.model_validate(weather).model_copy(update=update)
+
+
+def _interpolated_weather_out(farm: Farm) -> Optional[WeatherDataOut]:
+    """Estimate weather for a farm from nearby reference points without any upstream call"""
+    longitude, latitude = get_farm_center(farm)
+    if latitude is None or longitude is None:
+        return None
+    estimate = weather_interpolator.estimate(latitude, longitude)
+    if not estimate:
+        return None
+    built_at = weather_interpolator.built_at_utc
+    return WeatherDataOut(
+        id=None,
+        farm_id=farm.id,
+        source="interpolated",
+        latitude=latitude,
+        longitude=longitude,
+        temperature=estimate["temperature"],
+        humidity=estimate["humidity"],
+        pressure=estimate["pressure"],
+        wind_speed=estimate["wind_speed"],
+        wind_direction=None,
+        precipitation=estimate["precipitation"],
+        uv_index=None,
+        visibility=None,
+        weather_description=None,
+        weather_icon=None,
+        forecast_data=None,
+        agromonitoring_data=None,
+        recorded_at=built_at,
+        updated_at=built_at,
+    )
 
 
 @router.get("/farm/{farm_id}", response_model=WeatherDataOut)
-def get_weather_for_farm(
+async def get_weather_for_farm(
     farm_id: int,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    forecast_format: str = Query(default="expanded", pattern="^(expanded|columnar)$"),
+    user: User = Depends(get_current_reader),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get latest weather data for a specific farm
+    Get latest weather data for a specific farm.
+    Farms without stored weather get an estimate interpolated from nearby
+    district centres and grid cells.
     """
-    farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+    farm = await _user_farm(db, farm_id, user)
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found")
     
-    weather = db.query(WeatherData).filter(
-        WeatherData.farm_id == farm_id
-    ).order_by(WeatherData.recorded_at.desc()).first()
+    cell_key = _farm_cell_key(farm)
+    weather = None
+    if cell_key:
+        weather = await _weather_row(db, WeatherData.cell_key == cell_key)
+    if not weather:
+        # Rows written before weather moved to grid cells
+        weather = await _weather_row(db, WeatherData.farm_id == farm_id)
     
     if not weather:
+        estimate = _interpolated_weather_out(farm)
+        if estimate:
+            return estimate
         raise HTTPException(status_code=404, detail="No weather data found for this farm")
     
-    return weather
+    return _farm_weather_out(weather, farm_id, forecast_format)
 
 
-@router.get("/farm/{farm_id}/history", response_model=List[WeatherDataOut])
-def get_weather_history(
+@router.get("/farm/{farm_id}/history", response_model=WeatherHistoryOut)
+async def get_weather_history(
     farm_id: int,
-    days: int = Query(default=7, ge=1, le=30),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    days: int = Query(default=7, ge=1, le=365),
+    limit: int = Query(default=1000, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    user: User = Depends(get_current_reader),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get weather history for a farm
+    Get weather history for a farm.
+    Short ranges are returned hourly, longer ranges daily (from pre-aggregated rollups),
+    oldest first; next_cursor continues a range longer than ``limit`` points.
     """
-    farm = db.query(Farm).filter(Farm.id == farm_id, Farm.user_id == user.id).first()
+    farm = await _user_farm(db, farm_id, user)
     if not farm:
         raise HTTPException(status_code=404, detail="Farm not found")
     
-    since_date = datetime.utcnow() - timedelta(days=days)
-    weather_records = db.query(WeatherData).filter(
-        WeatherData.farm_id == farm_id,
-        WeatherData.recorded_at >= since_date
-    ).order_by(WeatherData.recorded_at.desc()).all()
-    
-    return weather_records
+    after = decode_cursor(cursor, "weather_history", (datetime,))
+    cell_key = _farm_cell_key(farm)
+    if cell_key:
+        resolution, points, next_after = await db.run_sync(get_history, cell_key, days, limit, after[0] if after else None)
+    else:
+        resolution, points, next_after = resolution_for_days(days), [], None
+    next_cursor = encode_cursor("weather_history", (next_after,)) if next_after else None
+    return {"farm_id": farm_id, "resolution": resolution, "points": points, "next_cursor": next_cursor}
 
 
 @router.post("/fetch-all")
 async def fetch_weather_for_all_farms(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Manually trigger weather data fetch for all user's farms
     """
-    farms = db.query(Farm).filter(Farm.user_id == user.id).all()
-    if not farms:
+    def all_targets(session: Session):
+        return [
+            target
+            for chunk in iter_farm_targets(session, settings.WEATHER_SCHEDULER_CHUNK_SIZE, user_id=user.id)
+            for target in chunk
+        ]
+
+    targets = await db.run_sync(all_targets)
+    if not targets:
         return {"message": "No farms found", "updated": 0}
-    
-    updated_count = 0
-    for farm in farms:
-        try:
-            longitude, latitude = get_farm_center(farm)
-            if latitude is None or longitude is None:
-                continue
-            
-            # Fetch weather data
-            weather_data = await weather_service.get_current_weather(latitude, longitude)
-            if not weather_data:
-                continue
-            
-            forecast_data = await weather_service.get_forecast(latitude, longitude, days=5)
-            agro_data = await agromonitoring_service.get_soil_data(latitude, longitude)
-            
-            # Update or create weather record
-            existing_weather = db.query(WeatherData).filter(
-                WeatherData.farm_id == farm.id
-            ).order_by(WeatherData.recorded_at.desc()).first()
-            
-            if existing_weather:
-                existing_weather.temperature = weather_data.get("temperature")
-                existing_weather.humidity = weather_data.get("humidity")
-                existing_weather.pressure = weather_data.get("pressure")
-                existing_weather.wind_speed = weather_data.get("wind_speed")
-                existing_weather.wind_direction = weather_data.get("wind_direction")
-                existing_weather.precipitation = weather_data.get("precipitation")
-                existing_weather.visibility = weather_data.get("visibility")
-                existing_weather.weather_description = weather_data.get("weather_description")
-                existing_weather.weather_icon = weather_data.get("weather_icon")
-                existing_weather.forecast_data = forecast_data
-                existing_weather.agromonitoring_data = agro_data
-                existing_weather.updated_at = datetime.utcnow()
-            else:
-                new_weather = WeatherData(
-                    farm_id=farm.id,
-                    latitude=latitude,
-                    longitude=longitude,
-                    temperature=weather_data.get("temperature"),
-                    humidity=weather_data.get("humidity"),
-                    pressure=weather_data.get("pressure"),
-                    wind_speed=weather_data.get("wind_speed"),
-                    wind_direction=weather_data.get("wind_direction"),
-                    precipitation=weather_data.get("precipitation"),
-                    visibility=weather_data.get("visibility"),
-                    weather_description=weather_data.get("weather_description"),
-                    weather_icon=weather_data.get("weather_icon"),
-                    forecast_data=forecast_data,
-                    agromonitoring_data=agro_data
-                )
-                db.add(new_weather)
-            
-            updated_count += 1
-        except Exception as e:
-            logger.error(f"Error updating weather for farm {farm.id}: {str(e)}")
-            continue
-    
-    db.commit()
-    return {"message": f"Updated weather data for {updated_count} farms", "updated": updated_count}
 
+    stats = await refresh_weather(targets, db)
+    updated_count = stats["updated"]
+    return {"message": f"Updated weather data for {updated_count} farms", "updated": updated_count}
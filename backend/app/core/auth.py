@@ -3,24 +3,17 @@ from typing import Optional
 
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import decode_token
-from app.db.session import get_db
+from app.db.session import AsyncSessionLocal, get_db
+from app.db.replicas import get_read_db
 from app.models.models import User
 
 # This defines a Bearer auth security scheme for Swagger/OpenAPI
 bearer_scheme = HTTPBearer(auto_error=True)
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    """
-    Read JWT only from the Authorization: Bearer <token> header.
-    This also registers a proper HTTP Bearer security scheme in OpenAPI,
-    so Swagger shows the Authorize (lock) button.
-    """
+async def _authenticated_user(credentials: HTTPAuthorizationCredentials, db: AsyncSession) -> User:
     raw_token: str = credentials.credentials
 
     payload = decode_token(raw_token)
@@ -31,8 +24,34 @@ def get_current_user(
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = await db.get(User, int(user_id))
+    if not user and db.info.get("replica"):
+        # Registered moments ago and not replicated yet
+        async with AsyncSessionLocal() as primary:
+            user = await primary.get(User, int(user_id))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
+    # Commits on this session make the user's next reads stick to the primary
+    db.info["user_id"] = user.id
     return user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """
+    Read JWT only from the Authorization: Bearer <token> header.
+    This also registers a proper HTTP Bearer security scheme in OpenAPI,
+    so Swagger shows the Authorize (lock) button.
+    """
+    return await _authenticated_user(credentials, db)
+
+
+async def get_current_reader(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_read_db),
+) -> User:
+    """get_current_user for read-only endpoints: looks the user up on the request's read session"""
+    return await _authenticated_user(credentials, db)
@@ -2,135 +2,308 @@
 Background tasks for automatic weather data retrieval
 """
 import asyncio
+import time
 from datetime import datetime, timedelta
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, AsyncSessionLocal
 from app.models.models import Farm, WeatherData, User
-from app.services.weather_service import weather_service
-from app.services.agromonitoring_service import agromonitoring_service
+from app.services.weather_store import (
+    get_farm_center,
+    fetch_weather_bundle,
+    build_weather_row,
+    build_raw_payload_row,
+    store_weather_rows,
+)
+from app.services.weather_timeseries import ensure_observation_partitions, apply_retention
+from app.services.weather_schedule import RefreshTarget, seed_schedule, claim_due_targets, farm_targets_after
+from app.services.weather_grid import GridCell, cell_for, group_by_cell
+from app.services.farm_geometry import backfill_farm_geometry, recompute_farm_areas
 from app.core.config import settings
-from geoalchemy2.shape import to_shape
+from app.core.leader import scheduler_leader
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def get_farm_center(farm: Farm) -> Tuple[Optional[float], Optional[float]]:
-    """Extract center coordinates from farm geometry"""
-    if farm.geom:
-        try:
-            geom = to_shape(farm.geom)
-            centroid = geom.centroid
-            return (centroid.x, centroid.y)  # (longitude, latitude)
-        except Exception as e:
-            logger.error(f"Error extracting farm center: {str(e)}")
-    return None, None
+# (cell, farm ids in the cell, fetched bundle)
+CellResult = Tuple[GridCell, List[int], Dict[str, Any]]
 
 
-async def update_weather_for_farm(farm: Farm, db: Session):
+def save_weather_batch(db: Session, results: List[CellResult]) -> int:
+    """Upsert a batch of fetched cells in a single transaction; returns farms updated"""
+    rows = [build_weather_row(cell, bundle) for cell, _, bundle in results]
+    raw_rows = [build_raw_payload_row(cell, bundle) for cell, _, bundle in results]
+    farm_cells = {farm_id: cell.key for cell, farm_ids, _ in results for farm_id in farm_ids}
+    store_weather_rows(db, rows, farm_cells, raw_rows)
+    db.commit()
+    return len(farm_cells)
+
+
+async def update_weather_for_farm(farm: Farm, db: AsyncSession):
     """Update weather data for a single farm"""
+    farm_id = farm.id
     try:
         longitude, latitude = get_farm_center(farm)
         if latitude is None or longitude is None:
-            logger.warning(f"Farm {farm.id} has no valid geometry")
+            logger.warning(f"Farm {farm_id} has no valid geometry")
             return False
-        
-        # Fetch current weather
-        weather_data = await weather_service.get_current_weather(latitude, longitude)
-        if not weather_data:
-            logger.warning(f"Could not fetch weather for farm {farm.id}")
+
+        cell = cell_for(latitude, longitude)
+        bundle = await fetch_weather_bundle(cell.latitude, cell.longitude)
+        if not bundle:
+            logger.warning(f"Could not fetch weather for farm {farm_id}")
             return False
-        
-        # Fetch forecast
-        forecast_data = await weather_service.get_forecast(latitude, longitude, days=5)
-        
-        # Fetch agromonitoring data
-        agro_data = await agromonitoring_service.get_soil_data(latitude, longitude)
-        
-        # Update or create weather record
-        existing_weather = db.query(WeatherData).filter(
-            WeatherData.farm_id == farm.id
-        ).order_by(WeatherData.recorded_at.desc()).first()
-        
-        if existing_weather:
-            # Update existing record
-            existing_weather.temperature = weather_data.get("temperature")
-            existing_weather.humidity = weather_data.get("humidity")
-            existing_weather.pressure = weather_data.get("pressure")
-            existing_weather.wind_speed = weather_data.get("wind_speed")
-            existing_weather.wind_direction = weather_data.get("wind_direction")
-            existing_weather.precipitation = weather_data.get("precipitation")
-            existing_weather.visibility = weather_data.get("visibility")
-            existing_weather.weather_description = weather_data.get("weather_description")
-            existing_weather.weather_icon = weather_data.get("weather_icon")
-            existing_weather.forecast_data = forecast_data
-            existing_weather.agromonitoring_data = agro_data
-            existing_weather.updated_at = datetime.utcnow()
-        else:
-            # Create new record
-            new_weather = WeatherData(
-                farm_id=farm.id,
-                latitude=latitude,
-                longitude=longitude,
-                temperature=weather_data.get("temperature"),
-                humidity=weather_data.get("humidity"),
-                pressure=weather_data.get("pressure"),
-                wind_speed=weather_data.get("wind_speed"),
-                wind_direction=weather_data.get("wind_direction"),
-                precipitation=weather_data.get("precipitation"),
-                visibility=weather_data.get("visibility"),
-                weather_description=weather_data.get("weather_description"),
-                weather_icon=weather_data.get("weather_icon"),
-                forecast_data=forecast_data,
-                agromonitoring_data=agro_data
-            )
-            db.add(new_weather)
-        
-        db.commit()
-        logger.info(f"Successfully updated weather for farm {farm.id}")
+
+        await db.run_sync(save_weather_batch, [(cell, [farm_id], bundle)])
+        logger.info(f"Successfully updated weather for farm {farm_id}")
         return True
-        
+
     except Exception as e:
-        logger.error(f"Error updating weather for farm {farm.id}: {str(e)}")
-        db.rollback()
+        logger.error(f"Error updating weather for farm {farm_id}: {str(e)}")
+        await db.rollback()
         return False
 
 
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def refresh_weather(
+    targets: List[RefreshTarget],
+    db: AsyncSession,
+    concurrency: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Refresh weather for many farms with bounded parallelism.
+
+    Farms are grouped into weather grid cells and each cell is fetched once.
+    A fixed pool of workers fetches cells concurrently; fetched results are
+    buffered and written ``batch_size`` cells at a time; writes are serialized
+    because workers share one session. Returns sweep statistics (farm counts,
+    plus the number of cells fetched) and the raw per-cell fetch latencies
+    as ``latencies_s``, so callers refreshing in chunks can report
+    percentiles over the whole sweep (see _SweepStats).
+    """
+    concurrency = max(1, concurrency or settings.WEATHER_REFRESH_CONCURRENCY)
+    batch_size = max(1, batch_size or settings.WEATHER_REFRESH_BATCH_SIZE)
+
+    cells = group_by_cell(targets)
+    queue: asyncio.Queue = asyncio.Queue()
+    for cell_and_farms in cells.values():
+        queue.put_nowait(cell_and_farms)
+
+    latencies: List[float] = []
+    pending: List[CellResult] = []
+    counts = {"updated": 0, "failed": 0}
+    write_lock = asyncio.Lock()
+
+    async def flush():
+        batch = pending[:]
+        pending.clear()
+        if not batch:
+            return
+        async with write_lock:
+            try:
+                counts["updated"] += await db.run_sync(save_weather_batch, batch)
+            except Exception as e:
+                logger.error(f"Error writing weather batch of {len(batch)} cells: {str(e)}")
+                await db.rollback()
+                counts["failed"] += sum(len(farm_ids) for _, farm_ids, _ in batch)
+
+    async def worker():
+        while True:
+            try:
+                cell, farm_ids = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                bundle = await fetch_weather_bundle(cell.latitude, cell.longitude)
+            except Exception as e:
+                logger.error(f"Error fetching weather for cell {cell.key}: {str(e)}")
+                bundle = None
+            latencies.append(time.perf_counter() - started)
+
+            if not bundle:
+                counts["failed"] += len(farm_ids)
+                continue
+            pending.append((cell, farm_ids, bundle))
+            if len(pending) >= batch_size:
+                await flush()
+
+    sweep_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(cells)) or 1)))
+    await flush()
+    elapsed = time.perf_counter() - sweep_started
+
+    stats = _stats(len(targets), len(cells), counts["updated"], counts["failed"], elapsed, latencies)
+    return {**stats, "latencies_s": latencies}
+
+
+def _stats(farms: int, cells: int, updated: int, failed: int, elapsed: float, latencies: List[float]) -> Dict[str, Any]:
+    return {
+        "farms": farms,
+        "cells": cells,
+        "updated": updated,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 3),
+        "farms_per_s": round(farms / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_latency_s": round(_percentile(latencies, 50), 3),
+        "p95_latency_s": round(_percentile(latencies, 95), 3),
+    }
+
+
+class _SweepStats:
+    """Running statistics of a sweep refreshed in chunks; percentiles cover every chunk's samples"""
+
+    def __init__(self):
+        self.counts = {"farms": 0, "cells": 0, "updated": 0, "failed": 0}
+        self.elapsed = 0.0
+        self.latencies: List[float] = []
+
+    def add(self, chunk: Dict[str, Any]):
+        """Fold in one refresh_weather result"""
+        for key in self.counts:
+            self.counts[key] += chunk[key]
+        self.elapsed += chunk["elapsed_s"]
+        self.latencies.extend(chunk["latencies_s"])
+
+    def summary(self) -> Dict[str, Any]:
+        return _stats(elapsed=self.elapsed, latencies=self.latencies, **self.counts)
+
+
+async def run_scheduled_weather_refresh() -> Dict[str, Any]:
+    """
+    Refresh only the farms whose weather is due.
+
+    New farms are added to the schedule first; due farms are then claimed
+    and refreshed WEATHER_SCHEDULER_CHUNK_SIZE at a time until none are left,
+    or until this process stops being the scheduler leader.
+    """
+    db: AsyncSession = AsyncSessionLocal()
+    sweep = _SweepStats()
+    try:
+        seeded = await db.run_sync(seed_schedule)
+        if seeded:
+            logger.info(f"Added {seeded} farms to the weather refresh schedule")
+
+        chunk_size = max(1, settings.WEATHER_SCHEDULER_CHUNK_SIZE)
+        while True:
+            # Leadership can be lost during a long sweep; the new leader claims what is left
+            if not scheduler_leader.is_leader:
+                logger.warning("Lost scheduler leadership; stopping the weather refresh sweep")
+                break
+            targets = await db.run_sync(claim_due_targets, chunk_size)
+            if targets:
+                sweep.add(await refresh_weather(targets, db))
+            if len(targets) < chunk_size:
+                break
+
+        total = sweep.summary()
+        if total["farms"]:
+            logger.info(
+                f"Scheduled weather refresh: {total['updated']} of {total['farms']} due farms updated "
+                f"from {total['cells']} grid cells "
+                f"in {total['elapsed_s']}s ({total['farms_per_s']} farms/s, "
+                f"per-cell latency p50 {total['p50_latency_s']}s, p95 {total['p95_latency_s']}s)"
+            )
+        return total
+
+    except Exception as e:
+        logger.error(f"Error in scheduled weather refresh: {str(e)}")
+        await db.rollback()
+        return sweep.summary()
+    finally:
+        await db.close()
+
+
 async def update_all_weather_data():
     """
-    Background task to update weather data for all farms
-    This should be called periodically (e.g., every 6 hours)
+    Refresh weather for every farm regardless of its schedule.
+
+    Farms are streamed in chunks (id and centroid only) rather than loaded
+    all at once. The periodic scheduler uses run_scheduled_weather_refresh.
     """
-    db: Session = SessionLocal()
+    db: AsyncSession = AsyncSessionLocal()
+    sweep = _SweepStats()
     try:
-        logger.info("Starting automatic weather data update...")
-        
-        # Get all farms with valid geometry
-        farms = db.query(Farm).filter(Farm.geom.isnot(None)).all()
-        
-        if not farms:
+        logger.info("Starting full weather data update...")
+        await db.run_sync(ensure_observation_partitions)
+
+        chunk_size = max(1, settings.WEATHER_SCHEDULER_CHUNK_SIZE)
+        after_id = 0
+        while True:
+            targets = await db.run_sync(farm_targets_after, after_id, chunk_size)
+            if not targets:
+                break
+            sweep.add(await refresh_weather(targets, db))
+            if len(targets) < chunk_size:
+                break
+            after_id = targets[-1][0]
+
+        total = sweep.summary()
+        if not total["farms"]:
             logger.info("No farms found with valid geometry")
-            return
-        
-        updated_count = 0
-        failed_count = 0
-        
-        # Update weather for each farm (with rate limiting)
-        for farm in farms:
-            success = await update_weather_for_farm(farm, db)
-            if success:
-                updated_count += 1
-            else:
-                failed_count += 1
-            
-            # Small delay to avoid rate limiting
-            await asyncio.sleep(0.5)
-        
-        logger.info(f"Weather update completed: {updated_count} succeeded, {failed_count} failed")
-        
+            return total
+
+        logger.info(
+            f"Weather update completed: {total['updated']} succeeded, "
+            f"{total['failed']} failed in {total['elapsed_s']}s "
+            f"({total['farms_per_s']} farms/s, "
+            f"per-cell latency p50 {total['p50_latency_s']}s, p95 {total['p95_latency_s']}s)"
+        )
+        await db.run_sync(apply_retention)
+        return total
+
     except Exception as e:
         logger.error(f"Error in background weather update task: {str(e)}")
+        await db.rollback()
+        return sweep.summary()
+    finally:
+        await db.close()
+
+
+def maintain_weather_timeseries():
+    """Create upcoming observation partitions and apply retention (blocking; run in a thread)"""
+    db: Session = SessionLocal()
+    try:
+        ensure_observation_partitions(db)
+        apply_retention(db)
+    except Exception as e:
+        logger.error(f"Error maintaining weather time series: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def backfill_farm_geometry_columns():
+    """Fill stored centroid/bbox/area for farms that predate them (blocking; run in a thread)"""
+    db: Session = SessionLocal()
+    try:
+        backfill_farm_geometry(db)
+    except Exception as e:
+        logger.error(f"Error backfilling farm geometry columns: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def recompute_farm_areas_job():
+    """Recompute area_ha for every farm in chunks (blocking; run in a thread)"""
+    db: Session = SessionLocal()
+    try:
+        return recompute_farm_areas(db)
+    except Exception as e:
+        logger.error(f"Error recomputing farm areas: {str(e)}")
+        db.rollback()
     finally:
         db.close()
 
@@ -141,4 +314,3 @@ def run_weather_update_sync():
     This can be called from a scheduler
     """
     asyncio.run(update_all_weather_data())
-
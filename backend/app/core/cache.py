@@ -0,0 +1,151 @@
+"""
+In-memory TTL response cache with stale-while-revalidate
+
+Used to avoid repeating identical upstream weather calls for the same
+(rounded) coordinates within a short window.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(endpoint: str, latitude: float, longitude: float, *extra: Any) -> Tuple:
+    """Build a cache key from an endpoint name and rounded coordinates"""
+    decimals = settings.WEATHER_CACHE_COORD_DECIMALS
+    return (endpoint, round(latitude, decimals), round(longitude, decimals)) + extra
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at", "ttl", "stale_ttl")
+
+    def __init__(self, value: Any, fetched_at: float, ttl: float, stale_ttl: float):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after a per-entry TTL.
+
+    Once an entry is past its TTL but still inside its stale window, the
+    stale value is returned immediately and a single background refresh is
+    started for that key (stale-while-revalidate).
+    """
+
+    def __init__(self, max_entries: int, stale_if_error: float = 0.0):
+        self.max_entries = max_entries
+        self.stale_if_error = stale_if_error
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._misses_in_flight = SingleFlight()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.stale_on_error = 0
+
+    def set(self, key: Hashable, value: Any, ttl: float, stale_ttl: float = 0.0):
+        self._entries[key] = _Entry(value, time.monotonic(), ttl, stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Optional[Any]]],
+        ttl: float,
+        stale_ttl: float = 0.0,
+    ) -> Optional[Any]:
+        """
+        Return the cached value for ``key`` or call ``fetch`` to populate it.
+
+        ``None`` results are never cached, so failed upstream calls are
+        retried on the next request; meanwhile an expired entry younger than
+        ``stale_if_error`` seconds past its stale window is returned.
+        Concurrent misses for the same key share a single ``fetch`` call.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < entry.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < entry.ttl + entry.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, fetch, ttl, stale_ttl)
+                return entry.value
+
+        self.misses += 1
+        return await self._misses_in_flight.do(key, lambda: self._fetch_and_store(key, fetch, ttl, stale_ttl))
+
+    async def _fetch_and_store(self, key: Hashable, fetch, ttl: float, stale_ttl: float):
+        value = await fetch()
+        if value is not None:
+            self.set(key, value, ttl, stale_ttl)
+            return value
+
+        # Upstream failed (or its circuit is open): fall back to an expired entry
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.fetched_at < entry.ttl + entry.stale_ttl + self.stale_if_error:
+            self.stale_on_error += 1
+            return entry.value
+        return None
+
+    def _schedule_refresh(self, key: Hashable, fetch, ttl: float, stale_ttl: float):
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, fetch, ttl, stale_ttl))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: Hashable, fetch, ttl: float, stale_ttl: float):
+        self.refreshes += 1
+        try:
+            value = await fetch()
+        except Exception as e:
+            logger.error(f"Error refreshing cached entry {key}: {str(e)}")
+            return
+        if value is not None:
+            self.set(key, value, ttl, stale_ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            "coalesced_misses": self._misses_in_flight.coalesced,
+            "background_refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "served_stale_on_error": self.stale_on_error,
+        }
+
+
+# Shared cache for upstream weather/soil responses
+response_cache = TTLCache(
+    max_entries=settings.WEATHER_CACHE_MAX_ENTRIES,
+    stale_if_error=settings.WEATHER_CACHE_STALE_IF_ERROR_SECONDS,
+)
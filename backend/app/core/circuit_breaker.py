@@ -0,0 +1,98 @@
+"""
+Circuit breaker for upstream APIs
+
+After repeated failures an upstream is marked open and calls fail fast
+instead of waiting out the HTTP timeout. After a cool-down a limited number
+of trial calls are let through (half-open); one success closes the circuit,
+one failure opens it again. A trial that never reports back (cancelled, or
+failed with a non-HTTP error) frees its slot through ``release_trial``, and
+any trial older than the cool-down is treated as abandoned.
+"""
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_calls = 0
+        self._trial_started = 0.0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def check(self):
+        """Raise CircuitOpenError while the circuit is open and cooling down (takes no trial slot)"""
+        if self.state == OPEN and time.monotonic() - self._opened_at < self.recovery_seconds:
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError if the call must not reach the upstream.
+        Returns True if the call holds a half-open trial slot; it must then
+        end in record_success, record_failure or release_trial.
+        """
+        self.check()
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+            self._trial_calls = 0
+
+        if self.state != HALF_OPEN:
+            return False
+        now = time.monotonic()
+        if self._trial_calls >= self.half_open_max_calls:
+            if now - self._trial_started < self.recovery_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit for {self.name} is half-open; trial call in progress")
+            # The trials never reported back; let new ones through
+            self._trial_calls = 0
+        self._trial_calls += 1
+        self._trial_started = now
+        return True
+
+    def release_trial(self):
+        """Give back a trial slot whose call ended without a verdict on the upstream"""
+        if self.state == HALF_OPEN and self._trial_calls > 0:
+            self._trial_calls -= 1
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._trial_calls = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self._trial_calls = 0
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at)), 1)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected,
+            "retry_in_s": retry_in,
+        }
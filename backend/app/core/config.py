@@ -10,6 +10,34 @@ class Settings(BaseSettings):
     
     
     DATABASE_URL: str = "" 
+    # asyncpg URL for request handlers; derived from DATABASE_URL when empty
+    ASYNC_DATABASE_URL: str = ""
+    # Direct (non-PgBouncer) URL for the scheduler leader's advisory lock; empty uses DATABASE_URL
+    DATABASE_DIRECT_URL: str = ""
+
+    # Connection pools (per engine, per process). The statement timeout applies
+    # to the async engine only; 0 disables it
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    # DATABASE_URL points at PgBouncer in transaction pooling mode
+    DB_PGBOUNCER: bool = False
+
+    # Read replicas for read-only endpoints (comma-separated URLs; empty = primary only).
+    # A user's reads stay on the primary for REPLICA_STICKY_SECONDS after they write,
+    # and replicas lagging more than REPLICA_MAX_LAG_SECONDS are skipped
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_STICKY_SECONDS: float = 10.0
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_SECONDS: float = 5.0
+
+    # Per-request query stats: warn when one statement runs this many times in a
+    # request (likely N+1; 0 disables), and in DEBUG add X-DB-* response headers
+    DB_REPEATED_QUERY_THRESHOLD: int = 5
+    DEBUG: bool = False
 
     SECRET_KEY: str = "supersecretkeychangeme"
     ALGORITHM: str = "HS256"
@@ -19,6 +47,95 @@ class Settings(BaseSettings):
     OPENWEATHER_API_KEY: str = ""
     AGROMONITORING_API_KEY: str = ""
     WEATHER_UPDATE_INTERVAL_HOURS: int = 6
+    # Periodic refresh engine: farms fetched in parallel and rows written per batch
+    WEATHER_REFRESH_CONCURRENCY: int = 20
+    WEATHER_REFRESH_BATCH_SIZE: int = 100
+    # Farms are snapped to grid cells of this size (degrees, 0.01 ≈ 1.1 km) and
+    # weather is fetched and stored once per cell
+    WEATHER_GRID_CELL_DEG: float = 0.01
+    # Keep the full upstream payloads in weather_raw_payloads (weather_data only
+    # stores the compact columnar forecast and soil values)
+    WEATHER_STORE_RAW_PAYLOADS: bool = False
+    # Staleness-driven scheduler: due farms are claimed in chunks every tick and
+    # rescheduled WEATHER_UPDATE_INTERVAL_HOURS ahead, +/- the jitter fraction
+    WEATHER_SCHEDULER_TICK_SECONDS: int = 60
+    WEATHER_SCHEDULER_CHUNK_SIZE: int = 500
+    WEATHER_REFRESH_JITTER_FRACTION: float = 0.1
+    WEATHER_REFRESH_RETRY_MINUTES: int = 30
+    # Only the process holding this Postgres advisory lock runs the scheduler;
+    # followers retry and the leader checks its lock connection every heartbeat
+    SCHEDULER_LEADER_LOCK_KEY: int = 72_011_001
+    SCHEDULER_LEADER_HEARTBEAT_SECONDS: float = 5.0
+
+    # Weather time series: raw points are kept per monthly partition, rollups longer
+    WEATHER_RAW_RETENTION_DAYS: int = 90
+    WEATHER_HOURLY_ROLLUP_RETENTION_DAYS: int = 180
+    WEATHER_HISTORY_HOURLY_MAX_DAYS: int = 3
+
+    # Shared upstream HTTP clients (one pooled client per upstream host)
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 50
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_ENABLE_HTTP2: bool = False
+
+    # Per-upstream token-bucket limits (requests per minute, 0 disables)
+    OPENWEATHER_RATE_PER_MINUTE: float = 60
+    AGROMONITORING_RATE_PER_MINUTE: float = 60
+    OPEN_METEO_RATE_PER_MINUTE: float = 600
+    UPSTREAM_RATE_BURST: int = 10
+    UPSTREAM_MAX_RETRIES_ON_429: int = 2
+    UPSTREAM_MAX_RETRY_AFTER_SECONDS: float = 60.0
+
+    # Per-upstream circuit breaker
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 30.0
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+
+    # Upstream response cache (keyed by endpoint + rounded lat/lon)
+    WEATHER_CACHE_MAX_ENTRIES: int = 10000
+    WEATHER_CACHE_COORD_DECIMALS: int = 2
+    WEATHER_CACHE_TTL_CURRENT_SECONDS: int = 600
+    WEATHER_CACHE_TTL_FORECAST_SECONDS: int = 1800
+    WEATHER_CACHE_TTL_DAILY_SECONDS: int = 3600
+    WEATHER_CACHE_TTL_SOIL_SECONDS: int = 3600
+    WEATHER_CACHE_STALE_SECONDS: int = 900
+    # Expired entries may still be served this long when the upstream fails
+    WEATHER_CACHE_STALE_IF_ERROR_SECONDS: int = 21600
+
+    # Pre-warmed district forecast table: the leader refreshes the shared
+    # snapshot every REFRESH_MINUTES, workers check for a newer one every POLL_SECONDS
+    DISTRICT_FORECAST_REFRESH_MINUTES: int = 60
+    DISTRICT_FORECAST_POLL_SECONDS: int = 60
+    DISTRICT_FORECAST_MAX_AGE_MINUTES: int = 180
+
+    # Farm GeoJSON: decimals per coordinate (6 ≈ 0.1 m) and, for list views with
+    # ?zoom=, the simplification tolerance in screen pixels at that zoom
+    GEOJSON_COORD_PRECISION: int = 6
+    FARM_LIST_SIMPLIFY_PIXELS: float = 0.5
+
+    # Farm vector tiles: in-memory cache per process; writes invalidate the
+    # owner's tiles locally, other workers pick changes up within the TTL
+    FARM_TILE_CACHE_MAX_ENTRIES: int = 5000
+    FARM_TILE_CACHE_TTL_SECONDS: int = 300
+
+    # Bulk farm import (POST /farms/import, scripts/import_farms.py); features are
+    # validated in a process pool of FARM_IMPORT_WORKERS (0 = one per CPU) once
+    # an upload has at least FARM_IMPORT_PARALLEL_THRESHOLD of them
+    FARM_IMPORT_MAX_FEATURES: int = 50000
+    FARM_IMPORT_WORKERS: int = 0
+    FARM_IMPORT_PARALLEL_THRESHOLD: int = 500
+
+    # Recompute every farm's area_ha when this process becomes scheduler leader
+    # (after an area correction; scripts/recompute_farm_areas.py does it on demand)
+    FARM_AREA_RECOMPUTE_ON_STARTUP: bool = False
+
+    # Interpolated weather for farms without stored weather (district centres +
+    # grid cells refreshed within the max age), rebuilt with the district pre-warm
+    WEATHER_INTERPOLATION_NEIGHBOURS: int = 6
+    WEATHER_INTERPOLATION_POWER: float = 2.0
+    WEATHER_INTERPOLATION_MAX_DISTANCE_KM: float = 75.0
+    WEATHER_INTERPOLATION_MAX_AGE_HOURS: int = 12
 
     
     class Config:
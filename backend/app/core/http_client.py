@@ -0,0 +1,190 @@
+"""
+Shared, pooled HTTP clients for upstream APIs
+
+One long-lived httpx.AsyncClient is kept per upstream so that connections
+(and TLS sessions) are reused across calls instead of being opened per request.
+"""
+import importlib.util
+import logging
+from typing import Dict, Any, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.rate_limit import TokenBucket, parse_retry_after
+from app.core.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+OPENWEATHER = "openweather"
+AGROMONITORING = "agromonitoring"
+OPEN_METEO = "open_meteo"
+
+UPSTREAMS = (OPENWEATHER, AGROMONITORING, OPEN_METEO)
+
+
+def _rate_per_minute(name: str) -> float:
+    return {
+        OPENWEATHER: settings.OPENWEATHER_RATE_PER_MINUTE,
+        AGROMONITORING: settings.AGROMONITORING_RATE_PER_MINUTE,
+        OPEN_METEO: settings.OPEN_METEO_RATE_PER_MINUTE,
+    }.get(name, 0)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class UpstreamClient:
+    """Pooled, rate-limited client for a single upstream host, with a circuit breaker and usage counters"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._client: Optional[httpx.AsyncClient] = None
+        self.limiter = TokenBucket(_rate_per_minute(name) / 60.0, settings.UPSTREAM_RATE_BURST)
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=settings.CIRCUIT_BREAKER_RECOVERY_SECONDS,
+            half_open_max_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+        )
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = settings.HTTP_ENABLE_HTTP2
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        return httpx.AsyncClient(
+            timeout=settings.HTTP_TIMEOUT_SECONDS,
+            limits=limits,
+            http2=http2,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The underlying httpx client, created on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Issue a GET request through the shared connection pool.
+
+        Each attempt takes a token from the upstream's rate limiter. A 429
+        response slows the limiter down, honours Retry-After and is retried
+        up to UPSTREAM_MAX_RETRIES_ON_429 times before being returned.
+        While the upstream's circuit is open, CircuitOpenError (an
+        httpx.HTTPError) is raised immediately.
+        """
+        attempt = 0
+        while True:
+            # Fail fast before waiting for a token; the trial slot is taken in _send
+            self.breaker.check()
+            await self.limiter.acquire()
+            response = await self._send(url, **kwargs)
+            if response.status_code != 429:
+                self.limiter.on_success()
+                return response
+
+            retry_after = parse_retry_after(
+                response.headers.get("Retry-After"), settings.UPSTREAM_MAX_RETRY_AFTER_SECONDS
+            )
+            self.limiter.on_throttled(retry_after)
+            if attempt >= settings.UPSTREAM_MAX_RETRIES_ON_429:
+                return response
+            attempt += 1
+            logger.warning(f"{self.name} rate limited (429); retrying after {retry_after or 'backoff'}s")
+
+    async def _send(self, url: str, **kwargs) -> httpx.Response:
+        trial = self.breaker.before_call()
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await self.client.get(url, **kwargs)
+        except httpx.HTTPError:
+            self.errors += 1
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or failed locally: no verdict on the upstream
+            if trial:
+                self.breaker.release_trial()
+            raise
+        finally:
+            self.in_flight -= 1
+
+        # Server errors count towards opening the circuit; 4xx (incl. 429) do not
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Request counters plus connection pool usage (when available)"""
+        connections = idle = None
+        if self._client is not None and not self._client.is_closed:
+            # httpx does not expose pool state publicly; read it defensively
+            pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+            pool_connections = getattr(pool, "connections", None)
+            if pool_connections is not None:
+                connections = len(pool_connections)
+                idle = sum(1 for conn in pool_connections if conn.is_idle())
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "open_connections": connections,
+            "idle_connections": idle,
+            "max_connections": settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            "rate_limit": self.limiter.stats(),
+            "circuit": self.breaker.stats(),
+        }
+
+
+class HTTPClientRegistry:
+    """Holds one UpstreamClient per upstream name"""
+
+    def __init__(self):
+        self._clients: Dict[str, UpstreamClient] = {}
+
+    def get(self, name: str) -> UpstreamClient:
+        if name not in self._clients:
+            self._clients[name] = UpstreamClient(name)
+        return self._clients[name]
+
+    async def startup(self):
+        """Open the pooled clients (called from the app lifespan)"""
+        for name in UPSTREAMS:
+            self.get(name).client
+
+    async def aclose(self):
+        """Close all pooled clients (called from the app lifespan)"""
+        for client in self._clients.values():
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: client.stats() for name, client in self._clients.items()}
+
+
+# Singleton instance
+http_clients = HTTPClientRegistry()
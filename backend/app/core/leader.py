@@ -0,0 +1,121 @@
+"""
+Cluster-wide leader election for singleton background jobs
+
+Every uvicorn worker on every node runs the same lifespan, so jobs that
+must run once per cluster (the weather scheduler) are gated on holding a
+Postgres session-level advisory lock. The lock lives on a dedicated
+connection: if the leader process dies the connection closes and Postgres
+releases the lock at once; if the leader's host disappears, server-side TCP
+keepalives drop the connection within a few heartbeats. Followers retry the
+lock every heartbeat, so a new leader takes over within seconds.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.db.session import direct_engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    def __init__(self, lock_key: int, heartbeat_seconds: float):
+        self.lock_key = lock_key
+        self.heartbeat_seconds = max(1.0, heartbeat_seconds)
+        self._conn: Optional[Connection] = None
+        self._leader_since: Optional[float] = None
+        self.elections_won = 0
+        self.leadership_lost = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None
+
+    def _connect(self) -> Connection:
+        conn = direct_engine.connect()
+        # Have the server notice a vanished leader host within a few heartbeats
+        idle = int(self.heartbeat_seconds)
+        conn.execute(text(f"SET tcp_keepalives_idle = {idle}"))
+        conn.execute(text(f"SET tcp_keepalives_interval = {max(1, idle // 2)}"))
+        conn.execute(text("SET tcp_keepalives_count = 3"))
+        conn.commit()
+        return conn
+
+    def _try_acquire(self) -> bool:
+        """Blocking: try to take the lock on a fresh dedicated connection"""
+        conn = self._connect()
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def _heartbeat(self):
+        """Blocking: a session lock lives exactly as long as its connection, so a round-trip suffices"""
+        self._conn.execute(text("SELECT 1"))
+        self._conn.commit()
+
+    def _release(self):
+        """Blocking: drop the leader connection; closing it frees the lock"""
+        conn, self._conn = self._conn, None
+        self._leader_since = None
+        if conn is None:
+            return
+        try:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+            conn.commit()
+        except Exception:
+            pass
+        try:
+            conn.invalidate()
+        except Exception:
+            pass
+
+    def _step(self):
+        if self._conn is None:
+            if self._try_acquire():
+                self._leader_since = time.monotonic()
+                self.elections_won += 1
+                logger.info(f"Became scheduler leader (advisory lock {self.lock_key})")
+            return
+        try:
+            self._heartbeat()
+        except Exception as e:
+            self.leadership_lost += 1
+            logger.warning(f"Lost scheduler leadership: {str(e)}")
+            self._release()
+
+    async def run(self):
+        """Campaign for and hold leadership until cancelled"""
+        try:
+            while True:
+                try:
+                    await asyncio.to_thread(self._step)
+                except Exception as e:
+                    logger.error(f"Leader election error: {str(e)}")
+                await asyncio.sleep(self.heartbeat_seconds)
+        finally:
+            await asyncio.to_thread(self._release)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lock_key": self.lock_key,
+            "is_leader": self.is_leader,
+            "leader_for_s": round(time.monotonic() - self._leader_since, 1) if self._leader_since else None,
+            "elections_won": self.elections_won,
+            "leadership_lost": self.leadership_lost,
+        }
+
+
+scheduler_leader = LeaderElector(settings.SCHEDULER_LEADER_LOCK_KEY, settings.SCHEDULER_LEADER_HEARTBEAT_SECONDS)
@@ -0,0 +1,77 @@
+"""
+Keyset pagination - opaque cursors for list endpoints
+
+A page is read in index order starting after the last row of the previous
+page (``WHERE (sort_key, id) < (:sort_key, :id)``), with one extra row
+fetched to tell whether another page follows. Every page costs one index
+range scan of ``limit + 1`` rows, however far the client has paged, and
+rows inserted meanwhile neither repeat nor shift the next page.
+
+The cursor handed to clients is that last row's key as base64 JSON, tagged
+with the listing it belongs to. Array responses carry it in the
+``X-Next-Cursor`` header, object responses in a ``next_cursor`` field; it
+is absent on the last page.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, literal, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(kind: str, key: Sequence[Any]) -> str:
+    """Opaque cursor for the row with sort key ``key`` (datetimes, ints and floats) in listing ``kind``"""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    raw = json.dumps([kind, *values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _parse(kind: type, value: Any) -> Any:
+    if kind is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if kind is int and type(value) is int:
+        return value
+    if kind is float and type(value) in (int, float):
+        return float(value)
+    raise ValueError(f"expected {kind.__name__}")
+
+
+def decode_cursor(cursor: Optional[str], kind: str, types: Sequence[type]) -> Optional[List[Any]]:
+    """The key in a cursor from ``encode_cursor(kind, ...)``, None without a cursor; 400 if it is not one"""
+    if not cursor:
+        return None
+    try:
+        tag, *values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if tag != kind or len(values) != len(types):
+            raise ValueError("cursor from another listing")
+        return [_parse(t, value) for t, value in zip(types, values)]
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _key(columns: Sequence[Any], values: Sequence[Any]):
+    # Typed like the columns, so aware datetimes bind as timestamptz
+    return tuple_(*(literal(value, column.type) for column, value in zip(columns, values)))
+
+
+def newest_first(query: Select, sort_column, id_column, after: Optional[Sequence[Any]], limit: int) -> Select:
+    """``query`` ordered by (sort_column, id_column) descending from after the ``after`` key, one row over ``limit``"""
+    if after:
+        query = query.where(tuple_(sort_column, id_column) < _key((sort_column, id_column), after))
+    return query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def oldest_first(query: Select, sort_column, id_column, after: Optional[Sequence[Any]], limit: int) -> Select:
+    """``query`` ordered by (sort_column, id_column) ascending from after the ``after`` key, one row over ``limit``"""
+    if after:
+        query = query.where(tuple_(sort_column, id_column) > _key((sort_column, id_column), after))
+    return query.order_by(sort_column, id_column).limit(limit + 1)
+
+
+def set_next_cursor(response: Response, kind: str, key: Optional[Sequence[Any]]):
+    if key is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(kind, key)
@@ -0,0 +1,104 @@
+"""
+Adaptive token-bucket rate limiting for upstream APIs
+
+Each upstream gets one bucket shared by every caller in the process. The
+bucket halves its rate when the upstream answers 429, pauses for the
+Retry-After interval, and recovers gradually after successful calls.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+
+def parse_retry_after(value: Optional[str], max_seconds: float) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), max_seconds)
+
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts to upstream throttling.
+
+    ``rate_per_second`` <= 0 disables limiting.
+    """
+
+    MIN_RATE_FRACTION = 0.1
+    RECOVERY_FRACTION = 0.05
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.max_rate = rate_per_second
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self._updated) * self.rate)
+        self._updated = max(self._updated, now)
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        if self.max_rate <= 0:
+            return
+        started = time.monotonic()
+        # The lock keeps waiters in FIFO order instead of racing for tokens
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        self.acquired += 1
+        self.wait_seconds += time.monotonic() - started
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        """Upstream answered 429: halve the rate and pause before the next call"""
+        if self.max_rate <= 0:
+            return
+        self.throttled += 1
+        self.rate = max(self.max_rate * self.MIN_RATE_FRACTION, self.rate / 2)
+        pause = retry_after if retry_after is not None else 1.0 / self.rate
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        # One request may go out as soon as the pause ends; refill from there
+        self.tokens = 1.0
+        self._updated = self._paused_until
+
+    def on_success(self):
+        """Additively recover towards the configured rate"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.RECOVERY_FRACTION)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "configured_per_minute": round(self.max_rate * 60, 2),
+            "current_per_minute": round(self.rate * 60, 2),
+            "acquired": self.acquired,
+            "throttled_429": self.throttled,
+            "total_wait_s": round(self.wait_seconds, 3),
+            "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 3),
+        }
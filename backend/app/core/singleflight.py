@@ -0,0 +1,54 @@
+"""
+Single-flight request coalescing
+
+Concurrent callers asking for the same key share one in-flight call
+instead of each issuing an identical upstream request.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its result"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await ``fn()`` for ``key``, or join the call already running for it.
+
+        The shared call is shielded, so one caller being cancelled (e.g. a
+        client disconnect) does not cancel it for the others. Exceptions are
+        raised to every caller waiting on the key.
+        """
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.executions += 1
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+
+        def _forget(done: asyncio.Future):
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            if not done.cancelled():
+                # Mark the exception as retrieved even if every caller went away
+                done.exception()
+
+        future.add_done_callback(_forget)
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "upstream_calls": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,135 @@
+"""
+Database connection pools - Settings-driven engine options and live pool metrics
+
+Both engines (psycopg2 for scripts and maintenance, asyncpg for requests)
+use queue pools sized from Settings. The pool classes below count how often
+a checkout found the pool exhausted and had to wait, for how long, and how
+often it gave up, so the pool can be sized from real traffic.
+
+With DB_PGBOUNCER set, connections go through PgBouncer in transaction
+pooling mode: asyncpg's server-side prepared statement cache is disabled
+(consecutive transactions may land on different server connections) and no
+startup parameters are sent, since PgBouncer rejects unknown ones. Put the
+statement timeout on the database role instead
+(``ALTER ROLE app SET statement_timeout = '30s'``). Session-level state such
+as the scheduler's advisory lock does not survive transaction pooling, so
+the leader connects through DATABASE_DIRECT_URL when it is set.
+"""
+import threading
+import time
+from typing import Any, Dict
+from uuid import uuid4
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.config import settings
+
+
+class PoolWaitStats:
+    """Counters for checkouts that found no idle connection and no overflow room"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def begin(self):
+        with self._lock:
+            self.waiting += 1
+            self.waits += 1
+
+    def end(self, seconds: float, timed_out: bool):
+        with self._lock:
+            self.waiting -= 1
+            self.wait_seconds_total += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "waiting": self.waiting,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_seconds_total / self.waits * 1000, 2) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            }
+
+
+class _WaitTrackingMixin:
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self._limit = None if max_overflow < 0 else self.size() + max_overflow
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        exhausted = self._limit is not None and self.checkedin() == 0 and self.checkedout() >= self._limit
+        if not exhausted:
+            return super()._do_get()
+        self.wait_stats.begin()
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.end(time.perf_counter() - started, timed_out)
+
+
+class InstrumentedQueuePool(_WaitTrackingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitTrackingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def sync_engine_options() -> Dict[str, Any]:
+    """create_engine keyword arguments for the psycopg2 engine"""
+    # No statement timeout: this engine runs the long bulk and maintenance statements
+    return {**_pool_options(), "poolclass": InstrumentedQueuePool}
+
+
+def async_engine_options() -> Dict[str, Any]:
+    """create_async_engine keyword arguments for the asyncpg engine (requests and weather refreshes)"""
+    options = {**_pool_options(), "poolclass": InstrumentedAsyncQueuePool}
+    if settings.DB_PGBOUNCER:
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            # asyncpg still prepares every statement; unique names keep them
+            # from clashing on a server connection shared through PgBouncer
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    elif settings.DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+    return options
+
+
+def pool_stats(pool) -> Dict[str, Any]:
+    """Checked-out, idle and overflow connections plus checkout wait counters"""
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(wait_stats.snapshot())
+    return stats
@@ -0,0 +1,97 @@
+"""
+Query stats - count SQL statements per request and flag N+1 patterns
+
+Engine-wide cursor events record every statement executed while a tracker
+is active in the current context: its count, total time, and how often each
+statement text ran. A statement run again and again with different
+parameters (a lazy load or a query inside a loop) shows up as one text with
+a high count.
+
+The HTTP middleware tracks each request, logs a warning for statements
+repeated DB_REPEATED_QUERY_THRESHOLD times or more, and in DEBUG mode adds
+X-DB-Query-Count, X-DB-Query-Ms and X-DB-Repeated-Queries response headers.
+Tests use ``assert_max_queries`` to pin an endpoint's query budget. Trackers
+nest, so a test's tracker also sees the queries of the request it wraps.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+_trackers: ContextVar[Tuple["QueryStats", ...]] = ContextVar("query_stats", default=())
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """(statement, times) for statements run at least ``threshold`` times, most repeated first"""
+        return [(statement, times) for statement, times in self.statements.most_common() if times >= threshold]
+
+    def summary(self) -> str:
+        lines = [f"{self.count} queries in {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {times}x {statement}" for statement, times in self.statements.most_common()]
+        return "\n".join(lines)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect the statements executed in this context (including awaited run_sync and to_thread calls)"""
+    stats = QueryStats()
+    token = _trackers.set(_trackers.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _trackers.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """Fail if the block executes more than ``limit`` statements"""
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= limit, f"expected at most {limit} queries, got {stats.summary()}"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _trackers.get():
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    for stats in _trackers.get():
+        stats.record(statement, seconds)
+
+
+async def query_stats_middleware(request, call_next):
+    with track_queries() as stats:
+        response = await call_next(request)
+    repeated = stats.repeated(settings.DB_REPEATED_QUERY_THRESHOLD) if settings.DB_REPEATED_QUERY_THRESHOLD else []
+    for statement, times in repeated:
+        logger.warning(f"{request.method} {request.url.path} ran the same statement {times}x: {' '.join(statement.split())[:300]}")
+    if settings.DEBUG:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Query-Ms"] = f"{stats.seconds * 1000:.1f}"
+        response.headers["X-DB-Repeated-Queries"] = str(len(repeated))
+    return response
@@ -0,0 +1,223 @@
+"""
+Read-replica routing for read-only endpoints
+
+Read endpoints take their session from ``get_read_db`` instead of ``get_db``.
+It picks a streaming replica from DATABASE_REPLICA_URLS round-robin, unless:
+
+- the caller committed a write within REPLICA_STICKY_SECONDS
+  (read-your-writes: they keep reading from the primary for that window), or
+- no replica is healthy: each worker polls replay lag every
+  REPLICA_LAG_CHECK_SECONDS and skips replicas lagging more than
+  REPLICA_MAX_LAG_SECONDS, or ones it cannot reach.
+
+Stickiness travels with the client, so it holds whichever worker or node
+serves the next read. A response to a request that committed a write carries
+a signed "user id, read the primary until" token in the X-Read-Primary header
+and a cookie of the same name; reads that send either back, for the same
+user and before it expires, go to the primary.
+"""
+import asyncio
+import hashlib
+import hmac
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from fastapi import Depends, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.core.security import decode_token
+from app.db.pool import async_engine_options, pool_stats
+from app.db.session import AsyncSessionLocal, PrimarySession, async_database_url
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Replay lag; 0 when everything received has been replayed (an idle primary
+# leaves pg_last_xact_replay_timestamp() old without the replica being behind)
+LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0.0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+READ_PRIMARY_HEADER = "X-Read-Primary"
+READ_PRIMARY_COOKIE = "read_primary"
+
+# Users who committed a write in the current request (set by the middleware)
+_request_writers: ContextVar[Optional[List[int]]] = ContextVar("request_writers", default=None)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self.lag_seconds: Optional[float] = None
+        self.healthy = False
+        self.last_error: Optional[str] = None
+        self.reads = 0
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        replicas: List[Replica],
+        sticky_seconds: float,
+        max_lag_seconds: float,
+        check_seconds: float,
+        secret: str,
+    ):
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = max(1.0, check_seconds)
+        self._secret = secret.encode()
+        self._cycle = itertools.cycle(replicas) if replicas else None
+        self.primary_reads = {"sticky": 0, "no_healthy_replica": 0}
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self._secret, f"read-primary:{payload}".encode(), hashlib.sha256).hexdigest()
+
+    def sticky_token(self, user_id: int) -> str:
+        """Token that sends this user's reads to the primary for the sticky window"""
+        payload = f"{user_id}:{int((time.time() + self.sticky_seconds) * 1000)}"
+        return f"{payload}:{self._sign(payload)}"
+
+    def is_sticky(self, user_id: Optional[int], token: Optional[str]) -> bool:
+        """Whether ``token`` is a valid, unexpired sticky token for ``user_id``"""
+        if user_id is None or not token:
+            return False
+        payload, _, signature = token.rpartition(":")
+        token_user, _, until_ms = payload.partition(":")
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return False
+        try:
+            return int(token_user) == user_id and int(until_ms) > time.time() * 1000
+        except ValueError:
+            return False
+
+    def choose(self, user_id: Optional[int], sticky_token: Optional[str] = None) -> Optional[Replica]:
+        """Replica to serve a read, or None for the primary"""
+        if not self.replicas:
+            return None
+        if self.is_sticky(user_id, sticky_token):
+            self.primary_reads["sticky"] += 1
+            return None
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                replica.reads += 1
+                return replica
+        self.primary_reads["no_healthy_replica"] += 1
+        return None
+
+    async def check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                lag = (await conn.execute(LAG_SQL)).scalar()
+            replica.lag_seconds = float(lag) if lag is not None else None
+            replica.last_error = None
+            # NULL: not in recovery, i.e. not actually a replica
+            healthy = replica.lag_seconds is not None and replica.lag_seconds <= self.max_lag_seconds
+        except Exception as e:
+            replica.lag_seconds = None
+            replica.last_error = str(e)
+            healthy = False
+        if healthy != replica.healthy:
+            logger.info(f"Read replica {replica.name} {'in' if healthy else 'out of'} rotation (lag {replica.lag_seconds})")
+        replica.healthy = healthy
+
+    async def run(self):
+        """Poll replica lag until cancelled"""
+        if not self.replicas:
+            return
+        try:
+            while True:
+                await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+                await asyncio.sleep(self.check_seconds)
+        finally:
+            for replica in self.replicas:
+                await replica.engine.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "lag_s": replica.lag_seconds,
+                    "reads": replica.reads,
+                    "last_error": replica.last_error,
+                    "pool": pool_stats(replica.engine.pool),
+                }
+                for replica in self.replicas
+            ],
+            "primary_reads": dict(self.primary_reads),
+        }
+
+
+def _build_replicas() -> List[Replica]:
+    replicas = []
+    for url in filter(None, (u.strip() for u in settings.DATABASE_REPLICA_URLS.split(","))):
+        engine = create_async_engine(async_database_url(url), echo=False, **async_engine_options())
+        replicas.append(Replica(make_url(url).host or url, engine))
+    return replicas
+
+
+replica_router = ReplicaRouter(
+    _build_replicas(),
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_seconds=settings.REPLICA_LAG_CHECK_SECONDS,
+    secret=settings.SECRET_KEY,
+)
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _remember_write(session, *_):
+    # get_current_user tags request sessions with the caller's id
+    user_id = session.info.get("user_id")
+    writers = _request_writers.get()
+    if user_id is not None and writers is not None:
+        writers.append(user_id)
+
+
+async def read_your_writes_middleware(request, call_next):
+    """Hand a sticky token to clients whose request committed a write"""
+    writers: List[int] = []
+    token = _request_writers.set(writers)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_writers.reset(token)
+    if writers and replica_router.replicas:
+        sticky = replica_router.sticky_token(writers[-1])
+        response.headers[READ_PRIMARY_HEADER] = sticky
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, sticky, max_age=max(1, int(replica_router.sticky_seconds)), httponly=True, samesite="lax"
+        )
+    return response
+
+
+_bearer = HTTPBearer(auto_error=True)
+
+
+def _token_user_id(credentials: HTTPAuthorizationCredentials) -> Optional[int]:
+    payload = decode_token(credentials.credentials)
+    try:
+        return int(payload["sub"]) if payload else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+async def get_read_db(request: Request, credentials: HTTPAuthorizationCredentials = Depends(_bearer)):
+    """Session for a read-only request: a healthy replica, or the primary (see module docstring)"""
+    sticky = request.headers.get(READ_PRIMARY_HEADER) or request.cookies.get(READ_PRIMARY_COOKIE)
+    replica = replica_router.choose(_token_user_id(credentials), sticky)
+    sessionmaker = replica.sessionmaker if replica else AsyncSessionLocal
+    async with sessionmaker() as db:
+        db.info["replica"] = replica.name if replica else None
+        yield db
@@ -1,16 +1,47 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.core.config import settings
+from app.db.pool import async_engine_options, sync_engine_options
 
-engine = create_engine(settings.DATABASE_URL, echo=False)
+
+def async_database_url(url: str) -> str:
+    """The same database addressed through the asyncpg driver"""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+# Blocking engine: scripts, create_all, the leader lock connection and
+# bulk maintenance jobs that already run in worker threads
+engine = create_engine(settings.DATABASE_URL, echo=False, **sync_engine_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request handlers and the weather refresh loop run on the event loop with asyncpg.
+# Objects stay usable after commit: lazy refreshes are not possible in async code.
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL), echo=False, **async_engine_options()
+)
+
+
+class PrimarySession(Session):
+    """Sessions on the primary; commits feed read-replica stickiness (app/db/replicas.py)"""
+
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=PrimarySession, autoflush=False, expire_on_commit=False
+)
+
+# Connections that hold session-level state (the leader's advisory lock) must
+# reach Postgres directly, not through a transaction-pooling PgBouncer
+direct_engine = (
+    create_engine(settings.DATABASE_DIRECT_URL, echo=False, pool_size=1, max_overflow=1, pool_pre_ping=True)
+    if settings.DATABASE_DIRECT_URL
+    else engine
+)
+
 Base = declarative_base()
 
 # Dependency for FastAPI
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -3,11 +3,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
 import logging
+from datetime import datetime, timezone
 
 # Import routers
 from app.api.v1 import auth, farms, predict, device, token, sync, soil_samples, onboarding, weather
-from app.core.background_tasks import update_all_weather_data
+from app.core.background_tasks import (
+    run_scheduled_weather_refresh,
+    maintain_weather_timeseries,
+    backfill_farm_geometry_columns,
+    recompute_farm_areas_job,
+)
 from app.core.config import settings
+from app.core.http_client import http_clients
+from app.core.cache import response_cache
+from app.core.leader import scheduler_leader
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.services.weather_service import weather_service
+from app.services.district_forecast_table import district_forecast_table
+from app.services.district_forecast_snapshot import load_snapshot_after, snapshot_is_due, store_snapshot
+from app.services.weather_interpolation import weather_interpolator, load_cell_references
+from app.services.farm_tiles import farm_tile_cache
+from app.services.farm_import import farm_import_pool
+from app.db.session import SessionLocal, async_engine, engine
+from app.db.pool import pool_stats
+from app.db.query_stats import query_stats_middleware
+from app.db.replicas import READ_PRIMARY_HEADER, read_your_writes_middleware, replica_router
 
 logger = logging.getLogger(__name__)
 
@@ -16,36 +36,107 @@ async def lifespan(app: FastAPI):
     """
     Lifespan context manager for startup and shutdown events
     """
-    # Startup: Start background task for automatic weather updates
-    logger.info("Starting background weather update task...")
+    # Startup: Open pooled upstream HTTP clients
+    await http_clients.startup()
+    # Farm import validation processes, shared by all import requests
+    farm_import_pool.startup()
+
+    # Make sure this month's weather observation partitions exist before any write
+    await asyncio.to_thread(maintain_weather_timeseries)
+
+    # Start background task for automatic weather updates
+    logger.info("Starting background weather refresh scheduler...")
     
     async def periodic_weather_update():
-        """Periodically update weather data"""
+        """Refresh farms as their weather becomes due; fresh farms are left alone"""
+        last_maintenance = asyncio.get_running_loop().time()
+        backfilled = False
         while True:
             try:
-                await update_all_weather_data()
-                # Wait for the configured interval (convert hours to seconds)
-                await asyncio.sleep(settings.WEATHER_UPDATE_INTERVAL_HOURS * 3600)
+                # Every worker on every node runs this loop; only the leader does the work
+                if not scheduler_leader.is_leader:
+                    await asyncio.sleep(scheduler_leader.heartbeat_seconds)
+                    continue
+                if not backfilled:
+                    # Refreshes read the stored centroids; fill them once per leadership
+                    await asyncio.to_thread(backfill_farm_geometry_columns)
+                    if settings.FARM_AREA_RECOMPUTE_ON_STARTUP:
+                        await asyncio.to_thread(recompute_farm_areas_job)
+                    backfilled = True
+                await run_scheduled_weather_refresh()
+                # Partitions and retention only need attention about once an hour
+                if asyncio.get_running_loop().time() - last_maintenance >= 3600:
+                    await asyncio.to_thread(maintain_weather_timeseries)
+                    last_maintenance = asyncio.get_running_loop().time()
             except Exception as e:
                 logger.error(f"Error in periodic weather update: {str(e)}")
-                # Wait 1 hour before retrying on error
-                await asyncio.sleep(3600)
+            await asyncio.sleep(settings.WEATHER_SCHEDULER_TICK_SECONDS)
     
-    # Start the background task
+    def run_with_session(fn, *args):
+        db = SessionLocal()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    async def refresh_district_snapshot():
+        """Leader only: fetch the district forecasts when the shared snapshot is due"""
+        due = await asyncio.to_thread(run_with_session, snapshot_is_due, settings.DISTRICT_FORECAST_REFRESH_MINUTES)
+        if not due:
+            return
+        fetched_at = datetime.now(timezone.utc)
+        locations = await weather_service.fetch_district_locations()
+        if locations:
+            districts = list(weather_service.district_coords.keys())
+            await asyncio.to_thread(run_with_session, store_snapshot, districts, locations, fetched_at)
+
+    async def periodic_district_prewarm():
+        """
+        Keep the in-memory district forecast table and interpolation index warm.
+        One upstream call per cluster: the leader refreshes the shared snapshot
+        and every worker loads it once it changes.
+        """
+        applied_at = None
+        cells_rebuilt_at = None
+        while True:
+            try:
+                if scheduler_leader.is_leader:
+                    await refresh_district_snapshot()
+                snapshot = await asyncio.to_thread(run_with_session, load_snapshot_after, applied_at)
+                if snapshot:
+                    applied_at, districts, locations = snapshot
+                    weather_service.apply_district_locations(districts, locations, applied_at)
+            except Exception as e:
+                logger.error(f"Error in district forecast pre-warm: {str(e)}")
+            loop_time = asyncio.get_running_loop().time()
+            if cells_rebuilt_at is None or loop_time - cells_rebuilt_at >= settings.DISTRICT_FORECAST_REFRESH_MINUTES * 60:
+                try:
+                    await asyncio.to_thread(run_with_session, load_cell_references, weather_interpolator)
+                except Exception as e:
+                    logger.error(f"Error rebuilding weather interpolation index: {str(e)}")
+                cells_rebuilt_at = loop_time
+            await asyncio.sleep(settings.DISTRICT_FORECAST_POLL_SECONDS)
+
+    # Start the background tasks
+    leader_task = asyncio.create_task(scheduler_leader.run())
     task = asyncio.create_task(periodic_weather_update())
-    
-    # Also run an initial update
-    asyncio.create_task(update_all_weather_data())
+    prewarm_task = asyncio.create_task(periodic_district_prewarm())
+    replica_task = asyncio.create_task(replica_router.run())
     
     yield
     
     # Shutdown: Cancel the background task
     logger.info("Shutting down background weather update task...")
-    task.cancel()
-    try:
-        await task
-    except asyncio.CancelledError:
-        pass
+    for background_task in (task, prewarm_task, leader_task, replica_task):
+        background_task.cancel()
+        try:
+            await background_task
+        except asyncio.CancelledError:
+            pass
+
+    await http_clients.aclose()
+    await asyncio.to_thread(farm_import_pool.shutdown)
+    await async_engine.dispose()
 
 
 # 1. Initialize the App FIRST
@@ -62,7 +153,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, READ_PRIMARY_HEADER],
 )
+# Read-your-writes tokens for read-replica routing (app/db/replicas.py)
+app.middleware("http")(read_your_writes_middleware)
+# Statement counts per request; X-DB-* headers in DEBUG (app/db/query_stats.py)
+app.middleware("http")(query_stats_middleware)
 
 # 3. Include Routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
@@ -78,3 +174,27 @@ app.include_router(predict.router, prefix="/api/v1/predict", tags=["predict"])
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/db")
+def database_pool_health():
+    """Connection pool usage of this worker: checked out, idle, overflow and checkout waits, plus replica lag and routing"""
+    return {
+        "async_pool": pool_stats(async_engine.pool),
+        "sync_pool": pool_stats(engine.pool),
+        "pgbouncer": settings.DB_PGBOUNCER,
+        "replicas": replica_router.stats(),
+    }
+
+
+@app.get("/health/upstreams")
+def upstream_health():
+    """Usage statistics for the shared upstream HTTP clients and response cache"""
+    return {
+        "http_clients": http_clients.stats(),
+        "response_cache": response_cache.stats(),
+        "district_forecast_table": district_forecast_table.stats(),
+        "scheduler_leader": scheduler_leader.stats(),
+        "weather_interpolation": weather_interpolator.stats(),
+        "farm_tile_cache": farm_tile_cache.stats(),
+    }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from geoalchemy2 import Geometry
@@ -12,6 +12,8 @@ class User(Base):
     language_preference = Column(String, default="en")
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every farm write; part of the farm tile cache key (services/farm_tiles.py)
+    farm_tiles_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     devices = relationship("Device", back_populates="user")
     farms = relationship("Farm", back_populates="owner")
@@ -31,13 +33,27 @@ class Farm(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     name = Column(String, nullable=True)
     # store polygon in WKT/EPSG:4326
-    geom = Column(Geometry("POLYGON", srid=4326), nullable=True)
+    geom = Column(Geometry("POLYGON", srid=4326, spatial_index=False), nullable=True)
     area_ha = Column(Float, nullable=True)
+    # Derived from geom when it is written (see services/farm_geometry.py)
+    centroid_lon = Column(Float, nullable=True)
+    centroid_lat = Column(Float, nullable=True)
+    bbox_min_lon = Column(Float, nullable=True)
+    bbox_min_lat = Column(Float, nullable=True)
+    bbox_max_lon = Column(Float, nullable=True)
+    bbox_max_lat = Column(Float, nullable=True)
+    district = Column(String, nullable=True, index=True)  # nearest district centre (WeatherService.district_coords keys)
+    weather_cell = Column(String, nullable=True, index=True)  # WeatherData.cell_key this farm reads from
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     owner = relationship("User", back_populates="farms")
     soils = relationship("SoilSample", back_populates="farm")
     predictions = relationship("Prediction", back_populates="farm")
+    __table_args__ = (
+        Index("ix_farms_geom", "geom", postgresql_using="gist"),
+        # Keyset pagination of a user's farms (list and sync pull)
+        Index("ix_farms_user_created", "user_id", "created_at", "id"),
+    )
 
 class SoilSample(Base):
     __tablename__ = "soil_samples"
@@ -51,6 +67,7 @@ class SoilSample(Base):
     extra = Column(JSON, nullable=True)
 
     farm = relationship("Farm", back_populates="soils")
+    __table_args__ = (Index("ix_soil_samples_farm_date", "farm_id", "sample_date", "id"),)
 
 class Prediction(Base):
     __tablename__ = "predictions"
@@ -63,6 +80,7 @@ class Prediction(Base):
     inputs = Column(JSON, nullable=True)
 
     farm = relationship("Farm", back_populates="predictions")
+    __table_args__ = (Index("ix_predictions_farm_date_run", "farm_id", "date_run", "id"),)
 
 # Add these toward the end of models.py (after Prediction)
 from sqlalchemy import UniqueConstraint
@@ -89,7 +107,8 @@ class RefreshToken(Base):
 class WeatherData(Base):
     __tablename__ = "weather_data"
     id = Column(Integer, primary_key=True, index=True)
-    farm_id = Column(Integer, ForeignKey("farms.id"), nullable=True, index=True)
+    farm_id = Column(Integer, ForeignKey("farms.id"), nullable=True)  # legacy per-farm rows only
+    cell_key = Column(String, nullable=True)  # one latest row per weather grid cell
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     temperature = Column(Float, nullable=True)  # in Celsius
@@ -108,4 +127,72 @@ class WeatherData(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     farm = relationship("Farm", backref="weather_records")
+    __table_args__ = (
+        UniqueConstraint("farm_id", name="uq_weather_data_farm"),
+        UniqueConstraint("cell_key", name="uq_weather_data_cell"),
+    )
 
+
+from sqlalchemy import PrimaryKeyConstraint
+
+class WeatherObservation(Base):
+    """Append-only raw weather points per grid cell, range-partitioned by month on observed_at"""
+    __tablename__ = "weather_observations"
+    cell_key = Column(String, nullable=False)
+    observed_at = Column(DateTime(timezone=True), nullable=False)
+    temperature = Column(Float, nullable=True)
+    humidity = Column(Float, nullable=True)
+    pressure = Column(Float, nullable=True)
+    wind_speed = Column(Float, nullable=True)
+    precipitation = Column(Float, nullable=True)
+    __table_args__ = (
+        PrimaryKeyConstraint("cell_key", "observed_at", name="pk_weather_observations"),
+        {"postgresql_partition_by": "RANGE (observed_at)"},
+    )
+
+class WeatherRollup(Base):
+    """Hourly and daily aggregates of WeatherObservation, maintained on write"""
+    __tablename__ = "weather_rollups"
+    cell_key = Column(String, nullable=False)
+    resolution = Column(String, nullable=False)  # "hour" or "day"
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    samples = Column(Integer, nullable=False, default=0)
+    # Readings that had each averaged field; *_avg = *_sum / *_samples
+    temperature_samples = Column(Integer, nullable=False, default=0)
+    humidity_samples = Column(Integer, nullable=False, default=0)
+    pressure_samples = Column(Integer, nullable=False, default=0)
+    wind_speed_samples = Column(Integer, nullable=False, default=0)
+    temperature_sum = Column(Float, nullable=True)
+    temperature_min = Column(Float, nullable=True)
+    temperature_max = Column(Float, nullable=True)
+    humidity_sum = Column(Float, nullable=True)
+    pressure_sum = Column(Float, nullable=True)
+    wind_speed_sum = Column(Float, nullable=True)
+    wind_speed_max = Column(Float, nullable=True)
+    precipitation_sum = Column(Float, nullable=True)  # mm: largest 1h amount for an hour, sum of hours for a day
+    __table_args__ = (
+        PrimaryKeyConstraint("cell_key", "resolution", "bucket_start", name="pk_weather_rollups"),
+    )
+
+class WeatherRefreshSchedule(Base):
+    """When each farm's weather is next due for refresh"""
+    __tablename__ = "weather_refresh_schedule"
+    farm_id = Column(Integer, ForeignKey("farms.id", ondelete="CASCADE"), primary_key=True)
+    next_due_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    last_refreshed_at = Column(DateTime(timezone=True), nullable=True)
+
+class WeatherRawPayload(Base):
+    """Full upstream payloads for the latest refresh of each grid cell (optional, see WEATHER_STORE_RAW_PAYLOADS)"""
+    __tablename__ = "weather_raw_payloads"
+    cell_key = Column(String, primary_key=True)
+    weather = Column(JSON, nullable=True)
+    agromonitoring = Column(JSON, nullable=True)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class DistrictForecastSnapshot(Base):
+    """Latest multi-location district forecast response, fetched by the scheduler leader for every worker"""
+    __tablename__ = "district_forecast_snapshots"
+    name = Column(String, primary_key=True)
+    locations = Column(JSON, nullable=False)  # one Open-Meteo location object per district, in district order
+    districts = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime(timezone=True), nullable=False)
@@ -45,6 +45,24 @@ class FarmOut(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class FarmLocationOut(BaseModel):
+    id: int
+    name: Optional[str]
+    area_ha: Optional[float]
+    district: Optional[str]
+    centroid_lat: Optional[float]
+    centroid_lon: Optional[float]
+    distance_m: Optional[float] = None  # only for /near
+
+class FarmImportError(BaseModel):
+    index: int  # position in the FeatureCollection's features array
+    error: str
+
+class FarmImportOut(BaseModel):
+    imported: int
+    failed: int
+    errors: List[FarmImportError]
+
 # --- Soil Sample ---
 class SoilSampleIn(BaseModel):
     farm_id: int
@@ -159,8 +177,10 @@ class PushOut(BaseModel):
 
 # --- Weather Data ---
 class WeatherDataOut(BaseModel):
-    id: int
+    id: Optional[int]  # None for interpolated estimates
     farm_id: Optional[int]
+    cell_key: Optional[str] = None
+    source: str = "observed"  # "observed" or "interpolated"
     latitude: float
     longitude: float
     temperature: Optional[float]
@@ -180,6 +200,24 @@ class WeatherDataOut(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class WeatherHistoryPointOut(BaseModel):
+    bucket_start: datetime
+    samples: int
+    temperature_avg: Optional[float]
+    temperature_min: Optional[float]
+    temperature_max: Optional[float]
+    humidity_avg: Optional[float]
+    pressure_avg: Optional[float]
+    wind_speed_avg: Optional[float]
+    wind_speed_max: Optional[float]
+    precipitation_total: Optional[float]
+
+class WeatherHistoryOut(BaseModel):
+    farm_id: int
+    resolution: str  # "hour" or "day"
+    points: List[WeatherHistoryPointOut]
+    next_cursor: Optional[str] = None
+
 class WeatherDataCreate(BaseModel):
     farm_id: Optional[int] = None
     latitude: float
@@ -4,6 +4,8 @@ Agromonitoring Service - Fetches agricultural monitoring data
 import httpx
 from typing import Dict, Any, Optional
 from app.core.config import settings
+from app.core.cache import response_cache, cache_key
+from app.core.http_client import http_clients, AGROMONITORING
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,7 +29,18 @@ class AgromonitoringService:
         if not self.api_key:
             logger.warning("Agromonitoring API key not configured")
             return None
-        
+
+        data = await response_cache.get_or_fetch(
+            cache_key("soil", latitude, longitude),
+            lambda: self._fetch_soil_data(latitude, longitude),
+            ttl=settings.WEATHER_CACHE_TTL_SOIL_SECONDS,
+            stale_ttl=settings.WEATHER_CACHE_STALE_SECONDS,
+        )
+        # Return mock data if API fails (for development)
+        return data if data is not None else self._get_mock_soil_data()
+
+    async def _fetch_soil_data(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+        """Call Agromonitoring soil endpoint; None on failure so errors are not cached"""
         try:
             # Agromonitoring API endpoint for soil data
             url = f"{self.base_url}/soil"
@@ -37,24 +50,22 @@ class AgromonitoringService:
                 "appid": self.api_key
             }
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            response = await http_clients.get(AGROMONITORING).get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
                 
-                return {
-                    "soil_temperature": data.get("t0", {}).get("value"),
-                    "soil_moisture": data.get("moisture", {}).get("value"),
-                    "raw_data": data
-                }
+            return {
+                "soil_temperature": data.get("t0", {}).get("value"),
+                "soil_moisture": data.get("moisture", {}).get("value"),
+                "raw_data": data
+            }
                 
         except httpx.HTTPError as e:
             logger.error(f"Error fetching agromonitoring soil data: {str(e)}")
-            # Return mock data if API fails (for development)
-            return self._get_mock_soil_data()
+            return None
         except Exception as e:
             logger.error(f"Unexpected error in agromonitoring service: {str(e)}")
-            return self._get_mock_soil_data()
+            return None
     
     async def get_satellite_imagery(self, latitude: float, longitude: float, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
         """
@@ -84,15 +95,14 @@ class AgromonitoringService:
                 "appid": self.api_key
             }
             
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            response = await http_clients.get(AGROMONITORING).get(url, params=params, timeout=15.0)
+            response.raise_for_status()
+            data = response.json()
                 
-                return {
-                    "images": data,
-                    "count": len(data) if isinstance(data, list) else 0
-                }
+            return {
+                "images": data,
+                "count": len(data) if isinstance(data, list) else 0
+            }
                 
         except httpx.HTTPError as e:
             logger.error(f"Error fetching satellite imagery: {str(e)}")
@@ -125,15 +135,14 @@ class AgromonitoringService:
                 "appid": self.api_key
             }
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            response = await http_clients.get(AGROMONITORING).get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
                 
-                return {
-                    "ndvi": data.get("ndvi"),
-                    "raw_data": data
-                }
+            return {
+                "ndvi": data.get("ndvi"),
+                "raw_data": data
+            }
                 
         except httpx.HTTPError as e:
             logger.error(f"Error fetching NDVI data: {str(e)}")
@@ -0,0 +1,49 @@
+"""
+District Forecast Snapshot - One upstream pre-warm call per cluster
+
+Only the scheduler leader sends the multi-location Open-Meteo request. It
+stores the response in ``district_forecast_snapshots`` and every worker on
+every node loads the newest stored response into its in-memory district
+table and interpolation index. Polling costs one primary-key lookup per
+worker per minute; the payload is read only when a newer snapshot exists.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.models import DistrictForecastSnapshot
+
+SNAPSHOT_NAME = "odisha-districts"
+
+
+def snapshot_fetched_at(db: Session) -> Optional[datetime]:
+    """When the stored snapshot was fetched, or None if there is none"""
+    return db.query(DistrictForecastSnapshot.fetched_at).filter(
+        DistrictForecastSnapshot.name == SNAPSHOT_NAME
+    ).scalar()
+
+
+def snapshot_is_due(db: Session, refresh_minutes: float) -> bool:
+    fetched_at = snapshot_fetched_at(db)
+    return fetched_at is None or datetime.now(timezone.utc) - fetched_at >= timedelta(minutes=refresh_minutes)
+
+
+def store_snapshot(db: Session, districts: List[str], locations: List[Dict[str, Any]], fetched_at: datetime):
+    values = {"name": SNAPSHOT_NAME, "districts": districts, "locations": locations, "fetched_at": fetched_at}
+    stmt = insert(DistrictForecastSnapshot).values(values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[DistrictForecastSnapshot.name],
+        set_={key: stmt.excluded[key] for key in ("districts", "locations", "fetched_at")},
+    ))
+    db.commit()
+
+
+def load_snapshot_after(
+    db: Session, after: Optional[datetime]
+) -> Optional[Tuple[datetime, List[str], List[Dict[str, Any]]]]:
+    """(fetched_at, districts, locations) of the stored snapshot if it is newer than ``after``"""
+    fetched_at = snapshot_fetched_at(db)
+    if fetched_at is None or (after is not None and fetched_at <= after):
+        return None
+    row = db.get(DistrictForecastSnapshot, SNAPSHOT_NAME)
+    return row.fetched_at, row.districts, row.locations
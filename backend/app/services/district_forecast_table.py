@@ -0,0 +1,113 @@
+"""
+District Forecast Table - Pre-warmed in-memory daily forecasts for Odisha districts
+
+The table is filled in the background from one multi-location Open-Meteo call
+and stores each forecast variable as one flat column (district-major), so a
+district-forecast request only slices a few arrays in memory.
+"""
+import math
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+_MISSING_CODE = -1
+
+
+class DistrictForecastTable:
+    def __init__(self):
+        self.dates: List[str] = []
+        self._date_index: Dict[str, int] = {}
+        self._rows: Dict[str, int] = {}
+        self._temp_max = array("d")
+        self._temp_min = array("d")
+        self._precip = array("d")
+        self._codes = array("h")
+        self.loaded_at: Optional[float] = None
+        self.loaded_at_utc: Optional[datetime] = None
+
+    def load(self, districts: List[str], dailies: List[Dict[str, Any]], fetched_at: Optional[datetime] = None):
+        """
+        Replace the table contents.
+
+        Args:
+            districts: District keys, in the same order as ``dailies``
+            dailies: Open-Meteo ``daily`` objects, one per district
+            fetched_at: When the forecasts were fetched (default: now); the table ages from then
+        """
+        dates = list(dailies[0].get("time", [])) if dailies else []
+        n_days = len(dates)
+
+        def column(values: List[Any], typecode: str, missing: Any) -> array:
+            padded = [missing if v is None else v for v in values[:n_days]]
+            padded.extend([missing] * (n_days - len(padded)))
+            return array(typecode, padded)
+
+        temp_max, temp_min, precip, codes = array("d"), array("d"), array("d"), array("h")
+        for daily in dailies:
+            temp_max.extend(column(daily.get("temperature_2m_max", []), "d", math.nan))
+            temp_min.extend(column(daily.get("temperature_2m_min", []), "d", math.nan))
+            precip.extend(column(daily.get("precipitation_sum", []), "d", 0.0))
+            codes.extend(column(daily.get("weathercode", []), "h", _MISSING_CODE))
+
+        # Swap everything at once so readers never see a half-built table
+        self._temp_max, self._temp_min, self._precip, self._codes = temp_max, temp_min, precip, codes
+        self._rows = {name: idx for idx, name in enumerate(districts)}
+        self._date_index = {date: idx for idx, date in enumerate(dates)}
+        self.dates = dates
+        now = datetime.now(timezone.utc)
+        fetched_at = fetched_at or now
+        self.loaded_at = time.monotonic() - max(0.0, (now - fetched_at).total_seconds())
+        self.loaded_at_utc = fetched_at
+
+    def lookup(
+        self,
+        district: str,
+        days: int,
+        max_age_seconds: float,
+        describe: Callable[[Optional[int]], str],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return ``days`` daily forecasts starting today (IST) for a district.
+
+        Returns None when the table is empty, older than ``max_age_seconds``,
+        or does not cover the requested range, so the caller can fall back
+        to an upstream request.
+        """
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > max_age_seconds:
+            return None
+        row = self._rows.get(district)
+        start = self._date_index.get(datetime.now(IST).date().isoformat())
+        if row is None or start is None or start + days > len(self.dates):
+            return None
+
+        base = row * len(self.dates)
+        forecast: List[Dict[str, Any]] = []
+        for day in range(start, start + days):
+            code = self._codes[base + day]
+            code = None if code == _MISSING_CODE else code
+            temp_max = self._temp_max[base + day]
+            temp_min = self._temp_min[base + day]
+            forecast.append({
+                "date": self.dates[day],
+                "condition": describe(code),
+                "temp_max_c": None if math.isnan(temp_max) else temp_max,
+                "temp_min_c": None if math.isnan(temp_min) else temp_min,
+                "precipitation_mm": self._precip[base + day],
+                "weather_code": code,
+            })
+        return forecast
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "districts": len(self._rows),
+            "days": len(self.dates),
+            "first_date": self.dates[0] if self.dates else None,
+            "loaded_at": self.loaded_at_utc.isoformat() if self.loaded_at_utc else None,
+        }
+
+
+# Singleton instance
+district_forecast_table = DistrictForecastTable()
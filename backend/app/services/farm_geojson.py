@@ -0,0 +1,67 @@
+"""
+Farm GeoJSON - Serialize farm geometry in PostGIS
+
+ST_AsGeoJSON writes the geometry with a fixed number of decimals, so rows
+never pass through WKB -> Shapely -> mapping() in Python. List pages are
+joined from per-farm JSON built in SQL and can use a topology-preserving
+simplification sized to the map zoom; detail responses keep full geometry.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+EMPTY_POLYGON = '{"type": "Polygon", "coordinates": []}'
+
+
+def simplify_tolerance_deg(zoom: int) -> float:
+    """Tolerance in degrees equal to FARM_LIST_SIMPLIFY_PIXELS pixels of a 256px web-mercator tile at ``zoom``"""
+    return settings.FARM_LIST_SIMPLIFY_PIXELS * 360.0 / (256 * 2 ** zoom)
+
+
+def _geojson_sql(zoom: Optional[int]) -> str:
+    geom = "geom" if zoom is None else "ST_SimplifyPreserveTopology(geom, :tolerance)"
+    return f"COALESCE(ST_AsGeoJSON({geom}, :precision)::json, CAST(:empty AS json))"
+
+
+def _params(zoom: Optional[int]) -> Dict[str, Any]:
+    params = {"precision": settings.GEOJSON_COORD_PRECISION, "empty": EMPTY_POLYGON}
+    if zoom is not None:
+        params["tolerance"] = simplify_tolerance_deg(zoom)
+    return params
+
+
+def farm_list_page(
+    db: Session, user_id: int, zoom: Optional[int], limit: int, after: Optional[Sequence[Any]] = None
+) -> Tuple[str, Optional[Tuple[datetime, int]]]:
+    """
+    A page of a user's farms, newest first, as a serialized JSON array of
+    FarmOut objects, and the (created_at, id) key of its last farm if more follow
+    """
+    keyset = " AND (created_at, id) < (:after_created_at, :after_id)" if after else ""
+    params = {"user_id": user_id, "limit": limit + 1, **_params(zoom)}
+    if after:
+        params.update(after_created_at=after[0], after_id=after[1])
+    rows = db.execute(text(
+        "SELECT id, created_at, json_build_object("
+        f"    'id', id, 'name', name, 'area_ha', area_ha, 'geom', {_geojson_sql(zoom)}"
+        ")::text AS farm "
+        f"FROM farms WHERE user_id = :user_id{keyset} "
+        "ORDER BY created_at DESC, id DESC LIMIT :limit"
+    ), params).all()
+    page = rows[:limit]
+    next_key = (page[-1].created_at, page[-1].id) if len(rows) > limit else None
+    return "[" + ",".join(row.farm for row in page) + "]", next_key
+
+
+def farm_detail(db: Session, farm_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+    """One farm as a FarmOut dict with full-detail geometry, or None if not the user's"""
+    row = db.execute(
+        text(
+            f"SELECT id, name, area_ha, {_geojson_sql(None)} AS geom "
+            "FROM farms WHERE id = :farm_id AND user_id = :user_id"
+        ),
+        {"farm_id": farm_id, "user_id": user_id, **_params(None)},
+    ).first()
+    return dict(row._mapping) if row else None
@@ -0,0 +1,193 @@
+"""
+Farm Geometry - Derived geometry columns stored with each farm
+
+Centroid, bounding box, geodesic area and district are computed once when
+a farm's polygon is written, so weather refreshes and spatial lookups read plain
+columns instead of parsing WKB and recomputing them on every call.
+"""
+import math
+import numpy as np
+import shapely
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from geoalchemy2.shape import from_shape
+from shapely.geometry.base import BaseGeometry
+from app.models.models import Farm
+from app.services.weather_service import weather_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Radius of the sphere with the same surface area as the WGS84 ellipsoid
+AUTHALIC_RADIUS_M = 6371007.2
+
+# Farms updated per backfill statement
+BACKFILL_CHUNK_SIZE = 1000
+
+# Farms read, recomputed and written back per area recompute transaction
+AREA_RECOMPUTE_CHUNK_SIZE = 5000
+
+# Farms farther than this from every district centre get no district
+DISTRICT_MAX_DISTANCE_KM = 150.0
+
+
+def ring_areas_m2(lons: np.ndarray, lats: np.ndarray, ring_index: np.ndarray, n_rings: int) -> np.ndarray:
+    """
+    Absolute area of many closed lon/lat rings on the authalic sphere (spherical excess).
+
+    ``lons``/``lats`` hold the vertices of all rings back to back, each ring closed
+    (last vertex == first), and ``ring_index`` gives the ring of every vertex.
+    """
+    if len(lons) == 0:
+        return np.zeros(n_rings)
+    lon = np.radians(lons)
+    sin_lat = np.sin(np.radians(lats))
+    # Edge terms between consecutive vertices of the same ring
+    same_ring = ring_index[1:] == ring_index[:-1]
+    terms = (lon[1:] - lon[:-1]) * (2 + sin_lat[:-1] + sin_lat[1:])
+    totals = np.bincount(ring_index[1:][same_ring], weights=terms[same_ring], minlength=n_rings)
+    return np.abs(totals) * AUTHALIC_RADIUS_M * AUTHALIC_RADIUS_M / 2.0
+
+
+def geodesic_areas_ha(geoms) -> np.ndarray:
+    """Areas of many lon/lat polygons in hectares (holes excluded); NaN for anything else"""
+    geoms = np.asarray(geoms, dtype=object)
+    areas = np.full(len(geoms), np.nan)
+    is_polygon = (shapely.get_type_id(geoms) == 3) & ~shapely.is_empty(geoms)
+    polygons = geoms[is_polygon]
+    if not len(polygons):
+        return areas
+
+    rings, polygon_index = shapely.get_rings(polygons, return_index=True)
+    coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+    ring_m2 = ring_areas_m2(coords[:, 0], coords[:, 1], ring_index, len(rings))
+    # get_rings lists each polygon's exterior first, then its holes
+    is_exterior = np.ones(len(rings), dtype=bool)
+    is_exterior[1:] = polygon_index[1:] != polygon_index[:-1]
+    signed = np.where(is_exterior, ring_m2, -ring_m2)
+    areas[is_polygon] = np.round(np.bincount(polygon_index, weights=signed, minlength=len(polygons)) / 10000.0, 2)
+    return areas
+
+
+def geodesic_area_ha(geom: BaseGeometry) -> Optional[float]:
+    """Area of a lon/lat polygon in hectares, holes excluded"""
+    area = geodesic_areas_ha([geom])[0]
+    return None if np.isnan(area) else float(area)
+
+
+def nearest_district(latitude: float, longitude: float) -> Optional[str]:
+    """
+    District whose centre is nearest to a point.
+
+    Only district centres are available (WeatherService.district_coords), so
+    membership is the nearest-centre (Voronoi) approximation of the boundary.
+    """
+    best, best_km = None, DISTRICT_MAX_DISTANCE_KM
+    cos_lat = math.cos(math.radians(latitude))
+    for name, (lat, lon) in weather_service.district_coords.items():
+        km = 111.195 * math.hypot(lat - latitude, (lon - longitude) * cos_lat)
+        if km <= best_km:
+            best, best_km = name, km
+    return best
+
+
+def derived_columns(geom: BaseGeometry) -> Dict[str, Any]:
+    """Farm column values derived from a lon/lat polygon (everything except geom itself)"""
+    centroid = geom.centroid
+    min_lon, min_lat, max_lon, max_lat = geom.bounds
+    return {
+        "centroid_lon": centroid.x,
+        "centroid_lat": centroid.y,
+        "bbox_min_lon": min_lon,
+        "bbox_min_lat": min_lat,
+        "bbox_max_lon": max_lon,
+        "bbox_max_lat": max_lat,
+        "area_ha": geodesic_area_ha(geom),
+        "district": nearest_district(centroid.y, centroid.x),
+    }
+
+
+def geometry_columns(geom: BaseGeometry) -> Dict[str, Any]:
+    """Farm column values for a lon/lat polygon, including geom"""
+    return {"geom": from_shape(geom, srid=4326), **derived_columns(geom)}
+
+
+def set_farm_geometry(farm: Farm, geom: BaseGeometry):
+    """Assign a polygon and its derived columns to a farm"""
+    for name, value in geometry_columns(geom).items():
+        setattr(farm, name, value)
+    # The farm may now lie in a different weather cell
+    farm.weather_cell = None
+
+
+def _district_values_sql() -> str:
+    return ", ".join(
+        f"('{name}', {lat}, {lon})" for name, (lat, lon) in weather_service.district_coords.items()
+    )
+
+
+def backfill_farm_geometry(db: Session) -> int:
+    """Fill derived columns for farms written before they existed (computed in PostGIS)"""
+    updated = 0
+    while True:
+        result = db.execute(text(
+            "UPDATE farms SET "
+            "    centroid_lon = ST_X(ST_Centroid(geom)), "
+            "    centroid_lat = ST_Y(ST_Centroid(geom)), "
+            "    bbox_min_lon = ST_XMin(geom), "
+            "    bbox_min_lat = ST_YMin(geom), "
+            "    bbox_max_lon = ST_XMax(geom), "
+            "    bbox_max_lat = ST_YMax(geom), "
+            # Sphere, not spheroid, to agree with geodesic_areas_ha
+            "    area_ha = round((ST_Area(geom::geography, false) / 10000.0)::numeric, 2), "
+            "    district = ("
+            f"       SELECT d.name FROM (VALUES {_district_values_sql()}) AS d(name, lat, lon) "
+            "        WHERE ST_DistanceSphere(ST_Centroid(geom), ST_MakePoint(d.lon, d.lat)) <= :max_m "
+            "        ORDER BY ST_DistanceSphere(ST_Centroid(geom), ST_MakePoint(d.lon, d.lat)) LIMIT 1"
+            "    ) "
+            "WHERE id IN ("
+            "    SELECT id FROM farms WHERE geom IS NOT NULL AND centroid_lat IS NULL LIMIT :limit"
+            ")"
+        ), {"limit": BACKFILL_CHUNK_SIZE, "max_m": DISTRICT_MAX_DISTANCE_KM * 1000})
+        db.commit()
+        updated += result.rowcount or 0
+        if (result.rowcount or 0) < BACKFILL_CHUNK_SIZE:
+            break
+    if updated:
+        logger.info(f"Backfilled derived geometry columns for {updated} farms")
+    return updated
+
+
+def recompute_farm_areas(db: Session, chunk_size: int = AREA_RECOMPUTE_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Recompute ``area_ha`` for every farm with geodesic_areas_ha, one chunk per transaction.
+
+    Walks the table by id (keyset), decodes each chunk's WKB in one vectorized
+    call and writes only the rows whose stored area changed.
+    """
+    scanned = updated = 0
+    last_id = 0
+    while True:
+        rows = db.execute(text(
+            "SELECT id, ST_AsBinary(geom) FROM farms "
+            "WHERE id > :last_id AND geom IS NOT NULL ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": chunk_size}).all()
+        if not rows:
+            break
+        ids = [row[0] for row in rows]
+        areas = geodesic_areas_ha(shapely.from_wkb([bytes(row[1]) for row in rows]))
+        result = db.execute(text(
+            "UPDATE farms SET area_ha = v.area_ha "
+            "FROM (SELECT unnest(CAST(:ids AS integer[])) AS id, "
+            "             unnest(CAST(:areas AS double precision[])) AS area_ha) AS v "
+            "WHERE farms.id = v.id AND farms.area_ha IS DISTINCT FROM v.area_ha"
+        ), {"ids": ids, "areas": [None if np.isnan(a) else float(a) for a in areas]})
+        db.commit()
+        scanned += len(ids)
+        updated += result.rowcount or 0
+        last_id = ids[-1]
+        if len(ids) < chunk_size:
+            break
+    logger.info(f"Recomputed farm areas: {updated} of {scanned} farms changed")
+    return {"scanned": scanned, "updated": updated}
@@ -0,0 +1,196 @@
+"""
+Farm Import - Bulk load farms from a GeoJSON FeatureCollection
+
+Features are validated and their derived columns (area, centroid, bbox,
+district) computed in a process pool, then every valid row is streamed into
+``farms`` with a single asyncpg COPY in the caller's transaction. Invalid features
+are skipped and reported by index; they never abort the rest of the import.
+
+The API shares one long-lived pool per worker (``farm_import_pool``, opened
+in the app lifespan). Its processes are started by a forkserver rather than
+forked from the multithreaded server, whose locks (logging, connection pools)
+another thread may be holding at fork time.
+"""
+import asyncio
+import csv
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from shapely import set_srid, to_wkb
+from shapely.geometry import shape
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.services.farm_geometry import derived_columns
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns written by COPY, in order; created_at and weather_cell use their defaults
+COPY_COLUMNS = (
+    "user_id", "name", "geom", "area_ha",
+    "centroid_lon", "centroid_lat",
+    "bbox_min_lon", "bbox_min_lat", "bbox_max_lon", "bbox_max_lat",
+    "district",
+)
+
+# Features handed to a worker process at a time
+POOL_CHUNK_SIZE = 256
+
+PreparedFeature = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def prepare_feature(index: int, feature: Any) -> PreparedFeature:
+    """
+    Validate one feature and build its farm columns.
+
+    Returns ``(index, row, None)`` on success or ``(index, None, error)``.
+    The row carries the polygon as hex EWKB, which PostGIS accepts as COPY text input.
+    """
+    if not isinstance(feature, dict) or feature.get("type") != "Feature":
+        return index, None, "Not a GeoJSON Feature"
+    geometry = feature.get("geometry")
+    if not geometry:
+        return index, None, "Missing geometry"
+    try:
+        geom = shape(geometry)
+    except Exception as e:
+        return index, None, f"Invalid geometry: {e}"
+    if geom.geom_type != "Polygon":
+        return index, None, "Geometry must be a Polygon"
+    if geom.is_empty:
+        return index, None, "Geometry is empty"
+    min_lon, min_lat, max_lon, max_lat = geom.bounds
+    if min_lon < -180 or max_lon > 180 or min_lat < -90 or max_lat > 90:
+        return index, None, "Coordinates must be lon/lat (EPSG:4326)"
+    if not geom.is_valid:
+        return index, None, "Polygon is not valid (self-intersecting or badly formed rings)"
+
+    properties = feature.get("properties") or {}
+    name = properties.get("name")
+    row = {
+        "name": str(name) if name is not None else None,
+        "geom": to_wkb(set_srid(geom, 4326), hex=True, include_srid=True),
+        **derived_columns(geom),
+    }
+    return index, row, None
+
+
+def _prepare_many(items: List[Tuple[int, Any]]) -> List[PreparedFeature]:
+    return [prepare_feature(index, feature) for index, feature in items]
+
+
+def _default_workers() -> int:
+    return settings.FARM_IMPORT_WORKERS or os.cpu_count() or 1
+
+
+def _process_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _chunks(items: List[Tuple[int, Any]]) -> List[List[Tuple[int, Any]]]:
+    return [items[i:i + POOL_CHUNK_SIZE] for i in range(0, len(items), POOL_CHUNK_SIZE)]
+
+
+def prepare_features(features: List[Any], workers: Optional[int] = None) -> List[PreparedFeature]:
+    """Run prepare_feature over all features, in a short-lived process pool for large inputs (scripts)"""
+    items = list(enumerate(features))
+    workers = workers if workers is not None else _default_workers()
+    if workers <= 1 or len(items) < settings.FARM_IMPORT_PARALLEL_THRESHOLD:
+        return _prepare_many(items)
+
+    chunks = _chunks(items)
+    results: List[PreparedFeature] = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=_process_context()) as pool:
+        for prepared in pool.map(_prepare_many, chunks):
+            results.extend(prepared)
+    return results
+
+
+class FarmImportPool:
+    """Validation processes shared by every import request of this worker"""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def startup(self, workers: Optional[int] = None):
+        workers = workers if workers is not None else _default_workers()
+        if workers > 1 and self._executor is None:
+            # Processes are started on demand, so an idle pool costs nothing
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=_process_context())
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def prepare(self, features: List[Any]) -> List[PreparedFeature]:
+        """prepare_features off the event loop, in the shared pool for large inputs"""
+        items = list(enumerate(features))
+        if self._executor is None or len(items) < settings.FARM_IMPORT_PARALLEL_THRESHOLD:
+            return await asyncio.to_thread(_prepare_many, items)
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _prepare_many, chunk) for chunk in _chunks(items)
+        ))
+        return [prepared for chunk in chunks for prepared in chunk]
+
+
+farm_import_pool = FarmImportPool()
+
+
+def farm_rows_csv(user_id: int, rows: List[Dict[str, Any]]) -> bytes:
+    """COPY ... (FORMAT csv) input for farm rows, columns in COPY_COLUMNS order"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # None is written as an empty unquoted field, which COPY CSV reads as NULL
+        writer.writerow([user_id] + [row[name] for name in COPY_COLUMNS[1:]])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def copy_farm_rows(db: AsyncSession, user_id: int, rows: List[Dict[str, Any]]) -> int:
+    """Stream farm rows into ``farms`` with COPY on the session's connection (caller commits)"""
+    if not rows:
+        return 0
+    data = farm_rows_csv(user_id, rows)
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_to_table(
+        "farms", source=io.BytesIO(data), columns=list(COPY_COLUMNS), format="csv"
+    )
+    return len(rows)
+
+
+async def import_feature_collection(
+    db: AsyncSession,
+    user_id: int,
+    collection: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Import every valid polygon of a FeatureCollection for one user.
+
+    Returns ``{"imported", "failed", "errors": [{"index", "error"}]}``. Rows are
+    written but not committed, so the caller decides the transaction boundary.
+    Validation uses ``farm_import_pool`` when it has been started.
+    """
+    if not isinstance(collection, dict) or collection.get("type") != "FeatureCollection":
+        raise ValueError("Body must be a GeoJSON FeatureCollection")
+    features = collection.get("features")
+    if not isinstance(features, list):
+        raise ValueError("FeatureCollection has no features array")
+    if len(features) > settings.FARM_IMPORT_MAX_FEATURES:
+        raise ValueError(f"At most {settings.FARM_IMPORT_MAX_FEATURES} features can be imported at once")
+
+    rows, errors = [], []
+    for index, row, error in await farm_import_pool.prepare(features):
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            rows.append(row)
+
+    imported = await copy_farm_rows(db, user_id, rows)
+    logger.info(f"Imported {imported} farms for user {user_id} ({len(errors)} features rejected)")
+    return {"imported": imported, "failed": len(errors), "errors": errors}
@@ -0,0 +1,139 @@
+"""
+Farm Spatial Queries - Farms near a point, inside a bounding box or in a district
+
+All lookups run in PostGIS against the GiST index on ``farms.geom`` (the
+``&&`` bounding-box operator) or the ``district`` column, and return stored
+centroid/area columns rather than polygons.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Metres per degree of latitude on the mean-radius sphere
+_M_PER_DEG = 111_195.0
+
+_COLUMNS = "id, name, area_ha, district, centroid_lat, centroid_lon"
+
+
+def _page(result, limit: int, key_columns: Sequence[str]) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, ...]]]:
+    """The first ``limit`` rows, and the key of the last one if more follow"""
+    rows = [dict(row._mapping) for row in result]
+    page = rows[:limit]
+    next_key = tuple(page[-1][column] for column in key_columns) if len(rows) > limit else None
+    return page, next_key
+
+
+def farms_near(
+    db: Session,
+    user_id: int,
+    latitude: float,
+    longitude: float,
+    radius_m: float,
+    limit: int,
+    after: Optional[Sequence[Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[float, int]]]:
+    """
+    Farms whose polygon lies within ``radius_m`` metres of a point, nearest
+    first, starting after the ``after`` (distance_m, id) key; plus the key of
+    the last farm if more follow.
+
+    The ``&&`` pre-filter against a degree envelope is answered by the GiST
+    index; ST_DWithin on geography then applies the exact metre radius.
+    Farms are ordered by the same geographic distance they report: ``<->``
+    measures planar degrees, which at Odisha latitudes stretch east-west
+    less than north-south and can disagree with ``distance_m``.
+    """
+    lat_deg = radius_m / _M_PER_DEG
+    lon_deg = radius_m / (_M_PER_DEG * max(math.cos(math.radians(latitude)), 0.01))
+    keyset = (
+        "WHERE (distance_m, id) > (CAST(:after_distance AS double precision), CAST(:after_id AS integer)) "
+        if after else ""
+    )
+    result = db.execute(text(
+        "SELECT * FROM ("
+        f"    SELECT {_COLUMNS}, "
+        "           ST_Distance(geom::geography, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography) AS distance_m "
+        "    FROM farms "
+        "    WHERE user_id = :user_id "
+        "    AND geom && ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, 4326) "
+        "    AND ST_DWithin(geom::geography, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography, :radius_m)"
+        f") AS nearby {keyset}"
+        "ORDER BY distance_m, id LIMIT :limit"
+    ), {
+        "user_id": user_id,
+        "lat": latitude,
+        "lon": longitude,
+        # Envelope computed here: asyncpg cannot infer types for ":lon - :lon_deg"
+        "min_lon": longitude - lon_deg,
+        "min_lat": latitude - lat_deg,
+        "max_lon": longitude + lon_deg,
+        "max_lat": latitude + lat_deg,
+        "radius_m": radius_m,
+        "limit": limit + 1,
+        **({"after_distance": after[0], "after_id": after[1]} if after else {}),
+    })
+    return _page(result, limit, ("distance_m", "id"))
+
+
+def farms_in_bbox(
+    db: Session,
+    user_id: int,
+    min_lon: float,
+    min_lat: float,
+    max_lon: float,
+    max_lat: float,
+    limit: int,
+    after: Optional[Sequence[Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int]]]:
+    """Farms whose polygon intersects a lon/lat bounding box, by id after the ``after`` (id,) key"""
+    keyset = " AND id > :after_id" if after else ""
+    result = db.execute(text(
+        f"SELECT {_COLUMNS} FROM farms "
+        "WHERE user_id = :user_id "
+        "AND geom && ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, 4326) "
+        f"AND ST_Intersects(geom, ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, 4326)){keyset} "
+        "ORDER BY id LIMIT :limit"
+    ), {
+        "user_id": user_id,
+        "min_lon": min_lon,
+        "min_lat": min_lat,
+        "max_lon": max_lon,
+        "max_lat": max_lat,
+        "limit": limit + 1,
+        **({"after_id": after[0]} if after else {}),
+    })
+    return _page(result, limit, ("id",))
+
+
+def farms_in_district(
+    db: Session,
+    user_id: int,
+    district: str,
+    limit: int,
+    after: Optional[Sequence[Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int]]]:
+    """Farms assigned to a district (see farm_geometry.nearest_district), by id after the ``after`` (id,) key"""
+    keyset = " AND id > :after_id" if after else ""
+    result = db.execute(text(
+        f"SELECT {_COLUMNS} FROM farms "
+        f"WHERE user_id = :user_id AND district = :district{keyset} "
+        "ORDER BY id LIMIT :limit"
+    ), {
+        "user_id": user_id,
+        "district": district.strip().lower(),
+        "limit": limit + 1,
+        **({"after_id": after[0]} if after else {}),
+    })
+    return _page(result, limit, ("id",))
+
+
+def parse_bbox(value: str) -> Optional[List[float]]:
+    """Parse "min_lon,min_lat,max_lon,max_lat"; None if malformed"""
+    try:
+        parts = [float(p) for p in value.split(",")]
+    except ValueError:
+        return None
+    if len(parts) != 4 or parts[0] > parts[2] or parts[1] > parts[3]:
+        return None
+    return parts
@@ -0,0 +1,62 @@
+"""
+Farm Tiles - Mapbox Vector Tiles of farm boundaries built in PostGIS
+
+Tiles are rendered with ST_AsMVT from the caller's own farms only and kept
+in an in-memory TTL cache. Every create, update or delete bumps the owner's
+``users.farm_tiles_version`` in the same transaction, and each tile request
+reads it (a primary-key lookup) into the cache key. Every worker on every
+node therefore stops serving stale tiles as soon as the write commits; the
+old entries age out of the LRU.
+"""
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.models import User
+
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+
+farm_tile_cache = TTLCache(settings.FARM_TILE_CACHE_MAX_ENTRIES)
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+async def invalidate_user_tiles(db: AsyncSession, user_id: int):
+    """Retire every cached tile of a user's farms; call in the transaction of any farm write, before commit"""
+    await db.execute(
+        update(User).where(User.id == user_id).values(farm_tiles_version=User.farm_tiles_version + 1),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def render_farm_tile(db: Session, user_id: int, z: int, x: int, y: int) -> bytes:
+    """Build one MVT tile with a "farms" layer (id, name, area_ha, district)"""
+    tile = db.execute(text(
+        "WITH bounds AS ("
+        "    SELECT ST_TileEnvelope(:z, :x, :y) AS merc, "
+        "           ST_Transform(ST_TileEnvelope(:z, :x, :y), 4326) AS lonlat"
+        "), features AS ("
+        "    SELECT f.id, f.name, f.area_ha, f.district, "
+        "           ST_AsMVTGeom(ST_Transform(f.geom, 3857), bounds.merc, :extent, :buffer, true) AS geom "
+        "    FROM farms f, bounds "
+        "    WHERE f.user_id = :user_id AND f.geom && bounds.lonlat"
+        ") "
+        "SELECT ST_AsMVT(features, 'farms', :extent, 'geom') FROM features WHERE geom IS NOT NULL"
+    ), {"z": z, "x": x, "y": y, "user_id": user_id, "extent": MVT_EXTENT, "buffer": MVT_BUFFER}).scalar()
+    return bytes(tile) if tile is not None else b""
+
+
+async def get_farm_tile(db: AsyncSession, user_id: int, z: int, x: int, y: int) -> bytes:
+    """Cached tile for a user's farms; rendered on the request's session on a miss"""
+    version = await db.scalar(select(User.farm_tiles_version).where(User.id == user_id))
+    key = ("farm-tile", user_id, version, z, x, y)
+    return await farm_tile_cache.get_or_fetch(
+        key,
+        lambda: db.run_sync(render_farm_tile, user_id, z, x, y),
+        ttl=settings.FARM_TILE_CACHE_TTL_SECONDS,
+    )
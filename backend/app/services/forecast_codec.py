@@ -0,0 +1,75 @@
+"""
+Forecast Codec - Compact columnar encoding for stored forecast JSON
+
+``WeatherService.get_forecast`` returns one dict per 3-hour slot with the
+same keys repeated 40 times. Stored rows use parallel arrays instead:
+evenly spaced timestamps collapse to (start, step), and the few distinct
+weather descriptions are stored once and referenced by index. Rows written
+before this format existed have no "format" key and decode unchanged.
+"""
+from typing import Any, Dict, List, Optional
+
+FORECAST_FORMAT = "columnar-v1"
+
+# Numeric per-slot fields, stored as parallel arrays
+_SERIES = ("temperature", "humidity", "pressure", "wind_speed", "precipitation")
+
+
+def encode_forecast(forecast: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Convert a get_forecast result to the columnar format"""
+    if not forecast or forecast.get("format") == FORECAST_FORMAT:
+        return forecast
+    slots: List[Dict[str, Any]] = forecast.get("forecast") or []
+    times = [slot.get("datetime") for slot in slots]
+
+    encoded: Dict[str, Any] = {
+        "format": FORECAST_FORMAT,
+        "city": forecast.get("city", ""),
+        "country": forecast.get("country", ""),
+    }
+    steps = {b - a for a, b in zip(times, times[1:])} if all(isinstance(t, int) for t in times) else None
+    if times and steps is not None and len(steps) <= 1:
+        encoded["start"] = times[0]
+        encoded["step"] = steps.pop() if steps else 0
+        encoded["count"] = len(times)
+    else:
+        encoded["time"] = times
+
+    for name in _SERIES:
+        encoded[name] = [slot.get(name) for slot in slots]
+
+    descriptions: Dict[str, int] = {}
+    encoded["weather"] = [
+        descriptions.setdefault(slot.get("weather_description", ""), len(descriptions)) for slot in slots
+    ]
+    encoded["weather_descriptions"] = list(descriptions)
+    encoded["weather_icon"] = [slot.get("weather_icon", "") for slot in slots]
+    return encoded
+
+
+def decode_forecast(stored: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Expand a stored forecast to the original list-of-dicts shape"""
+    if not stored or stored.get("format") != FORECAST_FORMAT:
+        return stored
+    if "time" in stored:
+        times = stored["time"]
+    else:
+        times = [stored["start"] + i * stored["step"] for i in range(stored["count"])]
+
+    descriptions = stored.get("weather_descriptions", [])
+    slots = []
+    for i, dt in enumerate(times):
+        slot = {"datetime": dt}
+        for name in _SERIES:
+            slot[name] = stored[name][i]
+        slot["weather_description"] = descriptions[stored["weather"][i]]
+        slot["weather_icon"] = stored["weather_icon"][i]
+        slots.append(slot)
+    return {"forecast": slots, "city": stored.get("city", ""), "country": stored.get("country", "")}
+
+
+def strip_raw(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Drop the full upstream payload kept under "raw_data" by the services"""
+    if not data or "raw_data" not in data:
+        return data
+    return {key: value for key, value in data.items() if key != "raw_data"}
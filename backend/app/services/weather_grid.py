@@ -0,0 +1,38 @@
+"""
+Weather Grid - Fixed-degree grid cells shared by nearby farms
+
+Farm centroids are snapped to a WEATHER_GRID_CELL_DEG grid. Weather is
+fetched once per cell at the cell centre and stored once per cell; farms
+reference their cell through ``Farm.weather_cell``. The cell size is part of
+the key, so changing it simply starts a new set of cells.
+"""
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from app.core.config import settings
+
+
+class GridCell(NamedTuple):
+    key: str
+    latitude: float
+    longitude: float
+
+
+def cell_for(latitude: float, longitude: float, cell_deg: Optional[float] = None) -> GridCell:
+    """Snap a point to its grid cell; the cell's weather is fetched at its centre"""
+    size = cell_deg or settings.WEATHER_GRID_CELL_DEG
+    row = math.floor(latitude / size)
+    col = math.floor(longitude / size)
+    return GridCell(
+        key=f"{size:g}:{row}:{col}",
+        latitude=round((row + 0.5) * size, 6),
+        longitude=round((col + 0.5) * size, 6),
+    )
+
+
+def group_by_cell(targets: Iterable[Tuple[int, float, float]]) -> Dict[str, Tuple[GridCell, List[int]]]:
+    """Group (farm_id, longitude, latitude) targets into cell key -> (cell, farm ids)"""
+    cells: Dict[str, Tuple[GridCell, List[int]]] = {}
+    for farm_id, longitude, latitude in targets:
+        cell = cell_for(latitude, longitude)
+        cells.setdefault(cell.key, (cell, []))[1].append(farm_id)
+    return cells
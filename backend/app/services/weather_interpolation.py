@@ -0,0 +1,176 @@
+"""
+Weather Interpolation - Estimate current weather for farms from reference points
+
+Reference points are the district centres (current conditions from the
+district pre-warm call) and every recently refreshed weather grid cell.
+They are indexed once per rebuild; estimates for any number of farms are
+one vectorized inverse-distance-weighted lookup with no upstream calls.
+
+Points are placed on the unit sphere so straight-line (chord) distance
+orders neighbours exactly like great-circle distance, and neighbours are
+found with a scipy cKDTree.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import WeatherData
+import logging
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Interpolated fields, in column order
+FIELDS = ("temperature", "humidity", "pressure", "wind_speed", "precipitation")
+
+
+def to_unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """(n,) degrees -> (n, 3) points on the unit sphere"""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Unit-sphere chord length -> great-circle distance in km"""
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+
+
+def idw(
+    distances_km: np.ndarray,
+    neighbour_values: np.ndarray,
+    power: float,
+    max_distance_km: float,
+) -> np.ndarray:
+    """
+    Inverse-distance-weighted average per query point.
+
+    Args:
+        distances_km: (n, k) distances to each query's k nearest references
+        neighbour_values: (n, k, f) field values at those references (NaN = missing)
+        power: distance exponent; 0 averages, large values approach nearest-neighbour
+        max_distance_km: references farther than this are ignored
+
+    Returns:
+        (n, f) estimates; NaN where no usable reference was in range
+    """
+    usable = (distances_km <= max_distance_km)[:, :, None] & ~np.isnan(neighbour_values)
+    with np.errstate(divide="ignore"):
+        weights = 1.0 / np.power(np.maximum(distances_km, 1e-9), power)
+    weights = np.where(usable, weights[:, :, None], 0.0)
+    # A reference at (almost) zero distance dominates on its own
+    exact = usable & (distances_km < 1e-6)[:, :, None]
+    weights = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), weights)
+
+    total = weights.sum(axis=1)
+    values = np.where(usable, neighbour_values, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (weights * values).sum(axis=1) / total, np.nan)
+
+
+class _Index:
+    """Reference points frozen for one rebuild"""
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, values: np.ndarray):
+        self.points = to_unit_vectors(latitudes, longitudes)
+        self.values = values
+        self.tree = cKDTree(self.points)
+
+    def query(self, points: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(self.values))
+        chord, idx = self.tree.query(points, k=k)
+        return chord.reshape(len(points), k), idx.reshape(len(points), k)
+
+
+class WeatherInterpolator:
+    def __init__(self):
+        self._sources: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._index: Optional[_Index] = None
+        self.built_at: Optional[float] = None
+        self.built_at_utc: Optional[datetime] = None
+        self.estimates = 0
+
+    def set_source(self, name: str, latitudes: Sequence[float], longitudes: Sequence[float], rows: Sequence[Dict[str, Any]]):
+        """Replace one set of reference points (e.g. "districts" or "cells") and rebuild the index"""
+        values = np.array(
+            [[np.nan if row.get(f) is None else float(row[f]) for f in FIELDS] for row in rows],
+            dtype=float,
+        ).reshape(len(rows), len(FIELDS))
+        self._sources[name] = (np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float), values)
+        self._rebuild()
+
+    def _rebuild(self):
+        lats = np.concatenate([s[0] for s in self._sources.values()])
+        lons = np.concatenate([s[1] for s in self._sources.values()])
+        values = np.vstack([s[2] for s in self._sources.values()])
+        # Swap in one assignment so readers never see a half-built index
+        self._index = _Index(lats, lons, values) if len(values) else None
+        self.built_at = time.monotonic()
+        self.built_at_utc = datetime.now(timezone.utc)
+
+    def estimate_many(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Estimate FIELDS at many points at once.
+
+        Returns (values (n, f) with NaN where unknown, distance in km to the
+        nearest reference (n,)). All NaN when there are no references.
+        """
+        n = len(latitudes)
+        index = self._index
+        if index is None or n == 0:
+            return np.full((n, len(FIELDS)), np.nan), np.full(n, np.inf)
+
+        chord, idx = index.query(to_unit_vectors(latitudes, longitudes), settings.WEATHER_INTERPOLATION_NEIGHBOURS)
+        distances = chord_to_km(chord)
+        values = idw(
+            distances,
+            index.values[idx],
+            settings.WEATHER_INTERPOLATION_POWER,
+            settings.WEATHER_INTERPOLATION_MAX_DISTANCE_KM,
+        )
+        self.estimates += n
+        return values, distances.min(axis=1)
+
+    def estimate(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+        """Estimate current weather at one point, or None when no reference is in range"""
+        values, nearest = self.estimate_many([latitude], [longitude])
+        if np.isnan(values[0]).all():
+            return None
+        result = {f: (None if np.isnan(v) else round(float(v), 2)) for f, v in zip(FIELDS, values[0])}
+        result["nearest_reference_km"] = round(float(nearest[0]), 2)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            "reference_points": {name: len(src[2]) for name, src in self._sources.items()},
+            "kd_tree": index is not None and index.tree is not None,
+            "built_at": self.built_at_utc.isoformat() if self.built_at_utc else None,
+            "estimates": self.estimates,
+        }
+
+
+def load_cell_references(db: Session, interpolator: "WeatherInterpolator"):
+    """Use every grid cell refreshed within WEATHER_INTERPOLATION_MAX_AGE_HOURS as a reference point"""
+    since = datetime.now(timezone.utc) - timedelta(hours=settings.WEATHER_INTERPOLATION_MAX_AGE_HOURS)
+    rows = db.query(
+        WeatherData.latitude, WeatherData.longitude, *(getattr(WeatherData, f) for f in FIELDS)
+    ).filter(WeatherData.cell_key.isnot(None), WeatherData.updated_at >= since).all()
+    interpolator.set_source(
+        "cells",
+        [r[0] for r in rows],
+        [r[1] for r in rows],
+        [dict(zip(FIELDS, r[2:])) for r in rows],
+    )
+    logger.info(f"Weather interpolation index rebuilt with {len(rows)} grid cells")
+
+
+# Singleton instance
+weather_interpolator = WeatherInterpolator()
@@ -0,0 +1,146 @@
+"""
+Weather Refresh Schedule - Per-farm next-due times for the weather scheduler
+
+Each farm with geometry has one row in ``weather_refresh_schedule``. The
+scheduler claims due rows in chunks (id and stored centroid only), and every
+successful write pushes the farm's next due time one refresh interval ahead
+with jitter so refreshes spread out instead of arriving as one sweep.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import WeatherRefreshSchedule
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (farm_id, longitude, latitude)
+RefreshTarget = Tuple[int, float, float]
+
+# Rows per INSERT statement (keeps bind parameters well under the Postgres limit)
+CHUNK_SIZE = 1000
+
+
+def refresh_interval_seconds() -> float:
+    return settings.WEATHER_UPDATE_INTERVAL_HOURS * 3600.0
+
+
+def next_due_time(
+    refreshed_at: datetime,
+    interval_seconds: float,
+    jitter_fraction: float,
+    rng: random.Random = random,
+) -> datetime:
+    """Next refresh time: one interval after ``refreshed_at``, spread by +/- jitter_fraction"""
+    jitter = max(0.0, min(jitter_fraction, 1.0))
+    return refreshed_at + timedelta(seconds=interval_seconds * rng.uniform(1 - jitter, 1 + jitter))
+
+
+def seed_schedule(db: Session) -> int:
+    """
+    Add schedule rows for farms that do not have one yet.
+
+    Farms whose stored weather is still fresh are scheduled one interval
+    after their last update, so a restart does not refetch them; farms
+    without weather are due immediately.
+    """
+    result = db.execute(text(
+        "INSERT INTO weather_refresh_schedule (farm_id, next_due_at, last_refreshed_at) "
+        "SELECT f.id, "
+        "       COALESCE(w.updated_at + make_interval(secs => :interval * (1 + :jitter * (2 * random() - 1))), now()), "
+        "       w.updated_at "
+        "FROM farms f "
+        "LEFT JOIN weather_data w ON w.cell_key = f.weather_cell "
+        "WHERE f.geom IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM weather_refresh_schedule s WHERE s.farm_id = f.id)"
+    ), {"interval": refresh_interval_seconds(), "jitter": settings.WEATHER_REFRESH_JITTER_FRACTION})
+    db.commit()
+    return result.rowcount or 0
+
+
+def claim_due_targets(db: Session, limit: int) -> List[RefreshTarget]:
+    """
+    Claim up to ``limit`` due farms and return their centroids.
+
+    Claimed rows are pushed WEATHER_REFRESH_RETRY_MINUTES ahead, so a farm
+    whose refresh fails is retried later instead of on the next tick, and
+    concurrent schedulers skip rows another one already holds.
+    """
+    rows = db.execute(text(
+        "WITH due AS ("
+        "    SELECT farm_id FROM weather_refresh_schedule "
+        "    WHERE next_due_at <= now() "
+        "    ORDER BY next_due_at "
+        "    LIMIT :limit "
+        "    FOR UPDATE SKIP LOCKED"
+        "), claimed AS ("
+        "    UPDATE weather_refresh_schedule s "
+        "    SET next_due_at = now() + make_interval(mins => :retry_minutes) "
+        "    FROM due WHERE s.farm_id = due.farm_id "
+        "    RETURNING s.farm_id"
+        ") "
+        "SELECT f.id, "
+        "       COALESCE(f.centroid_lon, ST_X(ST_Centroid(f.geom))), "
+        "       COALESCE(f.centroid_lat, ST_Y(ST_Centroid(f.geom))) "
+        "FROM claimed JOIN farms f ON f.id = claimed.farm_id "
+        "WHERE f.geom IS NOT NULL"
+    ), {"limit": limit, "retry_minutes": settings.WEATHER_REFRESH_RETRY_MINUTES}).all()
+    db.commit()
+    return [(farm_id, longitude, latitude) for farm_id, longitude, latitude in rows]
+
+
+def farm_targets_after(
+    db: Session, after_id: int, limit: int, user_id: Optional[int] = None
+) -> List[RefreshTarget]:
+    """(id, centroid) of up to ``limit`` farms with geometry and an id above ``after_id``, by id"""
+    rows = db.execute(text(
+        "SELECT id, "
+        "       COALESCE(centroid_lon, ST_X(ST_Centroid(geom))), "
+        "       COALESCE(centroid_lat, ST_Y(ST_Centroid(geom))) "
+        "FROM farms "
+        "WHERE geom IS NOT NULL AND id > :after_id "
+        "AND (CAST(:user_id AS INTEGER) IS NULL OR user_id = :user_id) "
+        "ORDER BY id LIMIT :limit"
+    ), {"after_id": after_id, "user_id": user_id, "limit": limit}).all()
+    return [(farm_id, longitude, latitude) for farm_id, longitude, latitude in rows]
+
+
+def iter_farm_targets(db: Session, chunk_size: int, user_id: Optional[int] = None) -> Iterator[List[RefreshTarget]]:
+    """Stream (id, centroid) for every farm with geometry in chunks, keyset-paginated by id"""
+    after_id = 0
+    while True:
+        targets = farm_targets_after(db, after_id, chunk_size, user_id)
+        if not targets:
+            return
+        yield targets
+        if len(targets) < chunk_size:
+            return
+        after_id = targets[-1][0]
+
+
+def mark_refreshed(db: Session, farm_ids: Iterable[int], refreshed_at: Optional[datetime] = None):
+    """
+    Record a successful refresh and schedule the next one.
+
+    The caller owns the transaction and must commit.
+    """
+    refreshed_at = refreshed_at or datetime.now(timezone.utc)
+    interval = refresh_interval_seconds()
+    values = [
+        {
+            "farm_id": farm_id,
+            "next_due_at": next_due_time(refreshed_at, interval, settings.WEATHER_REFRESH_JITTER_FRACTION),
+            "last_refreshed_at": refreshed_at,
+        }
+        for farm_id in set(farm_ids)
+    ]
+    for start in range(0, len(values), CHUNK_SIZE):
+        stmt = insert(WeatherRefreshSchedule).values(values[start:start + CHUNK_SIZE])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[WeatherRefreshSchedule.farm_id],
+            set_={"next_due_at": stmt.excluded.next_due_at, "last_refreshed_at": stmt.excluded.last_refreshed_at},
+        ))
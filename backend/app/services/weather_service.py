@@ -4,11 +4,41 @@ Weather Service - Fetches weather data from OpenWeatherMap API
 import httpx
 from typing import Dict, Any, Optional, List, Tuple
 from app.core.config import settings
+from app.core.cache import response_cache, cache_key
+from app.services.district_forecast_table import district_forecast_table
+from app.services.weather_interpolation import weather_interpolator
+from app.core.http_client import http_clients, OPENWEATHER, OPEN_METEO
 import logging
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+WEATHER_CODE_DESCRIPTIONS: Dict[int, str] = {
+    0: "Clear sky",
+    1: "Mainly clear",
+    2: "Partly cloudy",
+    3: "Overcast",
+    45: "Fog",
+    48: "Depositing rime fog",
+    51: "Light drizzle",
+    53: "Moderate drizzle",
+    55: "Dense drizzle",
+    61: "Slight rain",
+    63: "Moderate rain",
+    65: "Heavy rain",
+    66: "Light freezing rain",
+    67: "Heavy freezing rain",
+    71: "Slight snow fall",
+    73: "Moderate snow fall",
+    75: "Heavy snow fall",
+    80: "Rain showers",
+    81: "Heavy rain showers",
+    82: "Violent rain showers",
+    95: "Thunderstorm",
+    96: "Thunderstorm with hail",
+    99: "Severe thunderstorm with hail",
+}
+
 class WeatherService:
     def __init__(self):
         self.api_key = settings.OPENWEATHER_API_KEY
@@ -60,7 +90,16 @@ class WeatherService:
         if not self.api_key:
             logger.warning("OpenWeatherMap API key not configured")
             return None
-        
+
+        return await response_cache.get_or_fetch(
+            cache_key("current", latitude, longitude),
+            lambda: self._fetch_current_weather(latitude, longitude),
+            ttl=settings.WEATHER_CACHE_TTL_CURRENT_SECONDS,
+            stale_ttl=settings.WEATHER_CACHE_STALE_SECONDS,
+        )
+
+    async def _fetch_current_weather(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+        """Call OpenWeatherMap current weather endpoint"""
         try:
             url = f"{self.base_url}/weather"
             params = {
@@ -70,31 +109,30 @@ class WeatherService:
                 "units": "metric"  # Get temperature in Celsius
             }
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            response = await http_clients.get(OPENWEATHER).get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
                 
-                # Extract relevant weather information
-                weather_info = {
-                    "temperature": data.get("main", {}).get("temp"),
-                    "feels_like": data.get("main", {}).get("feels_like"),
-                    "humidity": data.get("main", {}).get("humidity"),
-                    "pressure": data.get("main", {}).get("pressure"),
-                    "wind_speed": data.get("wind", {}).get("speed"),
-                    "wind_direction": data.get("wind", {}).get("deg"),
-                    "visibility": data.get("visibility"),
-                    "uv_index": None,  # UV index requires separate API call
-                    "precipitation": data.get("rain", {}).get("1h", 0) or data.get("rain", {}).get("3h", 0),
-                    "weather_description": data.get("weather", [{}])[0].get("description", ""),
-                    "weather_icon": data.get("weather", [{}])[0].get("icon", ""),
-                    "clouds": data.get("clouds", {}).get("all", 0),
-                    "sunrise": data.get("sys", {}).get("sunrise"),
-                    "sunset": data.get("sys", {}).get("sunset"),
-                    "raw_data": data  # Store full response for reference
-                }
+            # Extract relevant weather information
+            weather_info = {
+                "temperature": data.get("main", {}).get("temp"),
+                "feels_like": data.get("main", {}).get("feels_like"),
+                "humidity": data.get("main", {}).get("humidity"),
+                "pressure": data.get("main", {}).get("pressure"),
+                "wind_speed": data.get("wind", {}).get("speed"),
+                "wind_direction": data.get("wind", {}).get("deg"),
+                "visibility": data.get("visibility"),
+                "uv_index": None,  # UV index requires separate API call
+                "precipitation": data.get("rain", {}).get("1h", 0) or data.get("rain", {}).get("3h", 0),
+                "weather_description": data.get("weather", [{}])[0].get("description", ""),
+                "weather_icon": data.get("weather", [{}])[0].get("icon", ""),
+                "clouds": data.get("clouds", {}).get("all", 0),
+                "sunrise": data.get("sys", {}).get("sunrise"),
+                "sunset": data.get("sys", {}).get("sunset"),
+                "raw_data": data  # Store full response for reference
+            }
                 
-                return weather_info
+            return weather_info
                 
         except httpx.HTTPError as e:
             logger.error(f"Error fetching weather data: {str(e)}")
@@ -118,7 +156,16 @@ class WeatherService:
         if not self.api_key:
             logger.warning("OpenWeatherMap API key not configured")
             return None
-        
+
+        return await response_cache.get_or_fetch(
+            cache_key("forecast", latitude, longitude, days),
+            lambda: self._fetch_forecast(latitude, longitude, days),
+            ttl=settings.WEATHER_CACHE_TTL_FORECAST_SECONDS,
+            stale_ttl=settings.WEATHER_CACHE_STALE_SECONDS,
+        )
+
+    async def _fetch_forecast(self, latitude: float, longitude: float, days: int) -> Optional[Dict[str, Any]]:
+        """Call OpenWeatherMap 5 day / 3 hour forecast endpoint"""
         try:
             url = f"{self.base_url}/forecast"
             params = {
@@ -129,30 +176,29 @@ class WeatherService:
                 "cnt": days * 8  # 8 forecasts per day (3-hour intervals)
             }
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            response = await http_clients.get(OPENWEATHER).get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
                 
-                # Process forecast list
-                forecast_list = []
-                for item in data.get("list", [])[:days * 8]:
-                    forecast_list.append({
-                        "datetime": item.get("dt"),
-                        "temperature": item.get("main", {}).get("temp"),
-                        "humidity": item.get("main", {}).get("humidity"),
-                        "pressure": item.get("main", {}).get("pressure"),
-                        "wind_speed": item.get("wind", {}).get("speed"),
-                        "precipitation": item.get("rain", {}).get("3h", 0),
-                        "weather_description": item.get("weather", [{}])[0].get("description", ""),
-                        "weather_icon": item.get("weather", [{}])[0].get("icon", "")
-                    })
+            # Process forecast list
+            forecast_list = []
+            for item in data.get("list", [])[:days * 8]:
+                forecast_list.append({
+                    "datetime": item.get("dt"),
+                    "temperature": item.get("main", {}).get("temp"),
+                    "humidity": item.get("main", {}).get("humidity"),
+                    "pressure": item.get("main", {}).get("pressure"),
+                    "wind_speed": item.get("wind", {}).get("speed"),
+                    "precipitation": item.get("rain", {}).get("3h", 0),
+                    "weather_description": item.get("weather", [{}])[0].get("description", ""),
+                    "weather_icon": item.get("weather", [{}])[0].get("icon", "")
+                })
                 
-                return {
-                    "forecast": forecast_list,
-                    "city": data.get("city", {}).get("name", ""),
-                    "country": data.get("city", {}).get("country", "")
-                }
+            return {
+                "forecast": forecast_list,
+                "city": data.get("city", {}).get("name", ""),
+                "country": data.get("city", {}).get("country", "")
+            }
                 
         except httpx.HTTPError as e:
             logger.error(f"Error fetching weather forecast: {str(e)}")
@@ -165,6 +211,15 @@ class WeatherService:
         """
         Fetch daily forecast using Open-Meteo (no API key required)
         """
+        return await response_cache.get_or_fetch(
+            cache_key("daily", latitude, longitude, days),
+            lambda: self._fetch_daily_forecast(latitude, longitude, days),
+            ttl=settings.WEATHER_CACHE_TTL_DAILY_SECONDS,
+            stale_ttl=settings.WEATHER_CACHE_STALE_SECONDS,
+        )
+
+    async def _fetch_daily_forecast(self, latitude: float, longitude: float, days: int) -> Optional[List[Dict[str, Any]]]:
+        """Call Open-Meteo daily forecast endpoint"""
         try:
             url = "https://api.open-meteo.com/v1/forecast"
             params = {
@@ -175,10 +230,9 @@ class WeatherService:
                 "timezone": "Asia/Kolkata",
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
+            response = await http_clients.get(OPEN_METEO).get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
 
             daily = data.get("daily", {})
             times = daily.get("time", [])
@@ -219,6 +273,21 @@ class WeatherService:
             return None
 
         latitude, longitude = coord
+        forecast = district_forecast_table.lookup(
+            district.strip().lower(),
+            days,
+            max_age_seconds=settings.DISTRICT_FORECAST_MAX_AGE_MINUTES * 60,
+            describe=self._map_weather_code,
+        )
+        if forecast:
+            return {
+                "district": district.title(),
+                "latitude": latitude,
+                "longitude": longitude,
+                "forecast": forecast,
+            }
+
+        # Not pre-warmed yet: the response cache coalesces identical concurrent misses
         forecast = await self.get_daily_forecast(latitude, longitude, days)
         if not forecast:
             return None
@@ -230,35 +299,69 @@ class WeatherService:
             "forecast": forecast,
         }
 
+    async def fetch_district_locations(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetch 16-day forecasts and current conditions for every district with
+        a single multi-location Open-Meteo request. Returns one location object
+        per district, in ``district_coords`` order, or None on failure.
+        """
+        districts = list(self.district_coords.keys())
+        try:
+            url = "https://api.open-meteo.com/v1/forecast"
+            params = {
+                "latitude": ",".join(str(self.district_coords[d][0]) for d in districts),
+                "longitude": ",".join(str(self.district_coords[d][1]) for d in districts),
+                "daily": "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum",
+                "current": "temperature_2m,relative_humidity_2m,surface_pressure,wind_speed_10m,precipitation",
+                "wind_speed_unit": "ms",
+                "forecast_days": 16,
+                "timezone": "Asia/Kolkata",
+            }
+
+            response = await http_clients.get(OPEN_METEO).get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"Error pre-warming district forecasts: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error pre-warming district forecasts: {str(e)}")
+            return None
+
+        # Open-Meteo returns a list with one entry per requested location
+        locations = data if isinstance(data, list) else [data]
+        if len(locations) != len(districts):
+            logger.error(f"District pre-warm returned {len(locations)} locations, expected {len(districts)}")
+            return None
+        return locations
+
+    def apply_district_locations(self, districts: List[str], locations: List[Dict[str, Any]], fetched_at: datetime):
+        """Load a district pre-warm response into the forecast table and the interpolation index"""
+        district_forecast_table.load(districts, [loc.get("daily", {}) for loc in locations], fetched_at)
+        # Current conditions at the district centres seed the interpolation index
+        coords = [self.district_coords.get(d) for d in districts]
+        known = [(coord, loc.get("current", {})) for coord, loc in zip(coords, locations) if coord]
+        weather_interpolator.set_source(
+            "districts",
+            [coord[0] for coord, _ in known],
+            [coord[1] for coord, _ in known],
+            [
+                {
+                    "temperature": c.get("temperature_2m"),
+                    "humidity": c.get("relative_humidity_2m"),
+                    "pressure": c.get("surface_pressure"),
+                    "wind_speed": c.get("wind_speed_10m"),
+                    "precipitation": c.get("precipitation"),
+                }
+                for _, c in known
+            ],
+        )
+        logger.info(f"Loaded district forecasts for {len(districts)} districts fetched at {fetched_at.isoformat()}")
+
     def _map_weather_code(self, code: Optional[int]) -> str:
-        mapping = {
-            0: "Clear sky",
-            1: "Mainly clear",
-            2: "Partly cloudy",
-            3: "Overcast",
-            45: "Fog",
-            48: "Depositing rime fog",
-            51: "Light drizzle",
-            53: "Moderate drizzle",
-            55: "Dense drizzle",
-            61: "Slight rain",
-            63: "Moderate rain",
-            65: "Heavy rain",
-            66: "Light freezing rain",
-            67: "Heavy freezing rain",
-            71: "Slight snow fall",
-            73: "Moderate snow fall",
-            75: "Heavy snow fall",
-            80: "Rain showers",
-            81: "Heavy rain showers",
-            82: "Violent rain showers",
-            95: "Thunderstorm",
-            96: "Thunderstorm with hail",
-            99: "Severe thunderstorm with hail",
-        }
         if code is None:
             return "Unknown"
-        return mapping.get(code, "Mixed conditions")
+        return WEATHER_CODE_DESCRIPTIONS.get(code, "Mixed conditions")
 
 # Singleton instance
 weather_service = WeatherService()
@@ -0,0 +1,180 @@
+"""
+Weather Store - Shared fetch and persistence path for farm weather data
+
+Used by both the background refresh and the manual fetch endpoints so that
+every write goes through one INSERT ... ON CONFLICT upsert keyed by weather
+grid cell, plus an append to the weather time series, the farms' cell
+references and a refresh-schedule update.
+"""
+import asyncio
+from typing import Dict, Any, Optional, List, Tuple
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from geoalchemy2.shape import to_shape
+from app.core.config import settings
+from app.models.models import Farm, WeatherData, WeatherRawPayload
+from app.services.weather_service import weather_service
+from app.services.agromonitoring_service import agromonitoring_service
+from app.services.weather_timeseries import append_observations
+from app.services.weather_schedule import mark_refreshed
+from app.services.weather_grid import GridCell
+from app.services.forecast_codec import encode_forecast, strip_raw
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement (keeps bind parameters well under the Postgres limit)
+UPSERT_CHUNK_SIZE = 1000
+
+_UPDATABLE_COLUMNS = (
+    "latitude",
+    "longitude",
+    "temperature",
+    "humidity",
+    "pressure",
+    "wind_speed",
+    "wind_direction",
+    "precipitation",
+    "visibility",
+    "weather_description",
+    "weather_icon",
+    "forecast_data",
+    "agromonitoring_data",
+)
+
+
+def get_farm_center(farm: Farm) -> Tuple[Optional[float], Optional[float]]:
+    """Farm centre (longitude, latitude), from the stored centroid when available"""
+    if farm.centroid_lon is not None and farm.centroid_lat is not None:
+        return farm.centroid_lon, farm.centroid_lat
+    if farm.geom:
+        try:
+            geom = to_shape(farm.geom)
+            centroid = geom.centroid
+            return (centroid.x, centroid.y)  # (longitude, latitude)
+        except Exception as e:
+            logger.error(f"Error extracting farm center: {str(e)}")
+    return None, None
+
+
+async def fetch_weather_bundle(latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+    """
+    Fetch current weather, forecast and agromonitoring data for one location.
+
+    The three upstream calls are independent, so they run concurrently.
+    Returns None when current weather is unavailable.
+    """
+    weather_data, forecast_data, agro_data = await asyncio.gather(
+        weather_service.get_current_weather(latitude, longitude),
+        weather_service.get_forecast(latitude, longitude, days=5),
+        agromonitoring_service.get_soil_data(latitude, longitude),
+    )
+    if not weather_data:
+        return None
+    return {"weather": weather_data, "forecast": forecast_data, "agro": agro_data}
+
+
+def build_weather_row(cell: GridCell, bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a bundle fetched at a cell centre to WeatherData column values.
+
+    The forecast is stored in the compact columnar format and upstream raw
+    payloads are left out (see build_raw_payload_row).
+    """
+    weather_data = bundle["weather"]
+    return {
+        "cell_key": cell.key,
+        "latitude": cell.latitude,
+        "longitude": cell.longitude,
+        "temperature": weather_data.get("temperature"),
+        "humidity": weather_data.get("humidity"),
+        "pressure": weather_data.get("pressure"),
+        "wind_speed": weather_data.get("wind_speed"),
+        "wind_direction": weather_data.get("wind_direction"),
+        "precipitation": weather_data.get("precipitation"),
+        "visibility": weather_data.get("visibility"),
+        "weather_description": weather_data.get("weather_description"),
+        "weather_icon": weather_data.get("weather_icon"),
+        "forecast_data": encode_forecast(bundle["forecast"]),
+        "agromonitoring_data": strip_raw(bundle["agro"]),
+    }
+
+
+def build_raw_payload_row(cell: GridCell, bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a bundle's full upstream payloads to WeatherRawPayload column values"""
+    return {
+        "cell_key": cell.key,
+        "weather": (bundle["weather"] or {}).get("raw_data"),
+        "agromonitoring": (bundle["agro"] or {}).get("raw_data"),
+    }
+
+
+def upsert_weather_rows(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """
+    Insert or update the latest weather row for each grid cell.
+
+    One statement is issued per UPSERT_CHUNK_SIZE rows. The caller owns the
+    transaction and must commit. If a cell appears more than once, the last
+    row wins.
+    """
+    if not rows:
+        return 0
+
+    # ON CONFLICT cannot touch the same row twice within one statement
+    latest_by_cell = {row["cell_key"]: row for row in rows}
+    unique_rows = list(latest_by_cell.values())
+
+    for start in range(0, len(unique_rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(WeatherData).values(unique_rows[start:start + UPSERT_CHUNK_SIZE])
+        update_columns = {name: stmt.excluded[name] for name in _UPDATABLE_COLUMNS}
+        update_columns["updated_at"] = func.now()
+        db.execute(stmt.on_conflict_do_update(index_elements=[WeatherData.cell_key], set_=update_columns))
+
+    return len(unique_rows)
+
+
+def upsert_raw_payloads(db: Session, rows: List[Dict[str, Any]]):
+    """Keep the latest raw upstream payloads per cell. The caller must commit."""
+    unique_rows = list({row["cell_key"]: row for row in rows}.values())
+    for start in range(0, len(unique_rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(WeatherRawPayload).values(unique_rows[start:start + UPSERT_CHUNK_SIZE])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[WeatherRawPayload.cell_key],
+            set_={"weather": stmt.excluded.weather, "agromonitoring": stmt.excluded.agromonitoring, "fetched_at": func.now()},
+        ))
+
+
+def assign_farm_cells(db: Session, farm_cells: Dict[int, str]):
+    """Point each farm at its weather cell (bulk UPDATE by primary key)"""
+    if farm_cells:
+        db.execute(update(Farm), [{"id": farm_id, "weather_cell": key} for farm_id, key in farm_cells.items()])
+
+
+def store_weather_rows(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    farm_cells: Dict[int, str],
+    raw_rows: Optional[List[Dict[str, Any]]] = None,
+) -> int:
+    """
+    Upsert the latest cell weather rows, append them to the time series,
+    point ``farm_cells`` (farm id -> cell key) at their cells and schedule the
+    next refresh of every farm in those cells. ``raw_rows`` are stored only
+    when WEATHER_STORE_RAW_PAYLOADS is enabled.
+
+    Returns the number of cells written. The caller owns the transaction
+    and must commit.
+    """
+    written = upsert_weather_rows(db, rows)
+    latest_rows = list({row["cell_key"]: row for row in rows}.values())
+    append_observations(db, latest_rows)
+    assign_farm_cells(db, farm_cells)
+    if raw_rows and settings.WEATHER_STORE_RAW_PAYLOADS:
+        upsert_raw_payloads(db, raw_rows)
+
+    # Farms already in these cells were refreshed too, even if they were not due yet
+    cell_keys = [row["cell_key"] for row in latest_rows]
+    neighbours = db.query(Farm.id).filter(Farm.weather_cell.in_(cell_keys)).all() if cell_keys else []
+    mark_refreshed(db, set(farm_cells) | {farm_id for (farm_id,) in neighbours})
+    return written
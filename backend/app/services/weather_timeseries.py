@@ -0,0 +1,303 @@
+"""
+Weather Time Series - Append-only observations with hourly/daily rollups
+
+Raw points go to ``weather_observations``, one series per weather grid
+cell, in a table range-partitioned by month. Hourly and daily aggregates in ``weather_rollups`` are updated in
+the same transaction as each batch arrives. Old raw partitions are dropped
+whole by the retention policy; history reads come from the rollups.
+
+Rollup buckets are hours and days in India Standard Time, the same days as
+the district forecasts, so a daily bucket starts at 18:30 UTC.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import case, func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import WeatherObservation, WeatherRollup
+from app.services.district_forecast_table import IST
+import logging
+
+logger = logging.getLogger(__name__)
+
+HOUR = "hour"
+DAY = "day"
+
+# Rows per INSERT statement (keeps bind parameters well under the Postgres limit)
+CHUNK_SIZE = 1000
+
+_OBSERVED_FIELDS = ("temperature", "humidity", "pressure", "wind_speed", "precipitation")
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month_start: datetime) -> datetime:
+    return (month_start + timedelta(days=32)).replace(day=1)
+
+
+def _partition_name(month_start: datetime) -> str:
+    return f"weather_observations_y{month_start.year:04d}m{month_start.month:02d}"
+
+
+def ensure_observation_partitions(db: Session, months_ahead: int = 1):
+    """Create monthly partitions for the current month and ``months_ahead`` following months"""
+    month = _month_start(datetime.now(timezone.utc))
+    for _ in range(months_ahead + 1):
+        upper = _next_month(month)
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} "
+            f"PARTITION OF weather_observations "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        month = upper
+    db.commit()
+
+
+def apply_retention(db: Session):
+    """
+    Drop raw partitions that lie entirely before the raw retention window
+    and delete hourly rollups older than the hourly retention window.
+    Daily rollups are kept.
+    """
+    now = datetime.now(timezone.utc)
+    raw_cutoff = now - timedelta(days=settings.WEATHER_RAW_RETENTION_DAYS)
+
+    partitions = db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'weather_observations'"
+    )).scalars().all()
+
+    for name in partitions:
+        try:
+            year, month = int(name[-7:-3]), int(name[-2:])
+        except ValueError:
+            continue
+        upper = _next_month(datetime(year, month, 1, tzinfo=timezone.utc))
+        if upper <= raw_cutoff:
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            logger.info(f"Dropped expired weather partition {name}")
+
+    hourly_cutoff = now - timedelta(days=settings.WEATHER_HOURLY_ROLLUP_RETENTION_DAYS)
+    db.query(WeatherRollup).filter(
+        WeatherRollup.resolution == HOUR,
+        WeatherRollup.bucket_start < hourly_cutoff,
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def _bucket(moment: datetime, resolution: str) -> datetime:
+    local = moment.astimezone(IST)
+    if resolution == HOUR:
+        return local.replace(minute=0, second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add(total: Optional[float], value: Optional[float]) -> Optional[float]:
+    if value is None:
+        return total
+    return value if total is None else total + value
+
+
+def _pick(current: Optional[float], value: Optional[float], chooser) -> Optional[float]:
+    if value is None:
+        return current
+    return value if current is None else chooser(current, value)
+
+
+# Fields averaged per bucket; each keeps its own sample count so missing values do not drag the mean
+_AVERAGED_FIELDS = ("temperature", "humidity", "pressure", "wind_speed")
+
+
+def _aggregate(observations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Pre-aggregate observations per (cell, resolution, bucket) so each rollup row is touched once.
+    Hourly precipitation is the largest amount seen in the hour; daily amounts are filled in by
+    _add_daily_precipitation.
+    """
+    buckets: Dict[Tuple[str, str, datetime], Dict[str, Any]] = {}
+    for row in observations:
+        for resolution in (HOUR, DAY):
+            key = (row["cell_key"], resolution, _bucket(row["observed_at"], resolution))
+            agg = buckets.setdefault(key, {
+                "cell_key": key[0],
+                "resolution": key[1],
+                "bucket_start": key[2],
+                "samples": 0,
+                **{f"{field}_samples": 0 for field in _AVERAGED_FIELDS},
+                "temperature_sum": None,
+                "temperature_min": None,
+                "temperature_max": None,
+                "humidity_sum": None,
+                "pressure_sum": None,
+                "wind_speed_sum": None,
+                "wind_speed_max": None,
+                "precipitation_sum": None,
+            })
+            agg["samples"] += 1
+            for field in _AVERAGED_FIELDS:
+                if row.get(field) is not None:
+                    agg[f"{field}_samples"] += 1
+                    agg[f"{field}_sum"] = _add(agg[f"{field}_sum"], row[field])
+            agg["temperature_min"] = _pick(agg["temperature_min"], row.get("temperature"), min)
+            agg["temperature_max"] = _pick(agg["temperature_max"], row.get("temperature"), max)
+            agg["wind_speed_max"] = _pick(agg["wind_speed_max"], row.get("wind_speed"), max)
+            if resolution == HOUR:
+                agg["precipitation_sum"] = _pick(agg["precipitation_sum"], row.get("precipitation"), max)
+    return list(buckets.values())
+
+
+def _stored_hourly_precipitation(db: Session, hourly: List[Dict[str, Any]]) -> Dict[Tuple[str, datetime], Optional[float]]:
+    """
+    Current precipitation of the hourly rollups about to be updated.
+
+    Row locks cannot cover an hour whose rollup does not exist yet, so two
+    writers of the same cell would both add the whole hour to its day. A
+    per-cell advisory lock, held until commit and taken in key order so
+    batches cannot deadlock, makes the second writer read the first one's hour.
+    """
+    keys = [(agg["cell_key"], agg["bucket_start"]) for agg in hourly if agg["precipitation_sum"] is not None]
+    if not keys:
+        return {}
+    db.execute(
+        text(
+            "SELECT pg_advisory_xact_lock(hashtext('weather_rollups'), hashtext(k)) "
+            "FROM (SELECT k FROM unnest(CAST(:cell_keys AS text[])) AS k ORDER BY k) AS cells"
+        ),
+        {"cell_keys": sorted({cell_key for cell_key, _ in keys})},
+    )
+    rows = db.execute(
+        select(WeatherRollup.cell_key, WeatherRollup.bucket_start, WeatherRollup.precipitation_sum)
+        .where(WeatherRollup.resolution == HOUR, tuple_(WeatherRollup.cell_key, WeatherRollup.bucket_start).in_(keys))
+    ).all()
+    return {(row.cell_key, row.bucket_start): row.precipitation_sum for row in rows}
+
+
+def _add_daily_precipitation(aggregates: List[Dict[str, Any]], stored: Dict[Tuple[str, datetime], Optional[float]]):
+    """
+    Add to each daily aggregate what its hours' precipitation grows by. Upstream
+    precipitation is the amount over the past hour, so several readings in one
+    hour describe the same rain: the hour keeps the largest, and a day is the
+    sum of its hours however often the cell was refreshed.
+    """
+    daily = {(agg["cell_key"], agg["bucket_start"]): agg for agg in aggregates if agg["resolution"] == DAY}
+    for agg in aggregates:
+        if agg["resolution"] != HOUR or agg["precipitation_sum"] is None:
+            continue
+        previous = stored.get((agg["cell_key"], agg["bucket_start"])) or 0.0
+        if agg["precipitation_sum"] > previous:
+            day = daily[(agg["cell_key"], _bucket(agg["bucket_start"], DAY))]
+            day["precipitation_sum"] = _add(day["precipitation_sum"], agg["precipitation_sum"] - previous)
+
+
+def append_observations(db: Session, rows: List[Dict[str, Any]], observed_at: Optional[datetime] = None) -> int:
+    """
+    Append one observation per row and fold it into the hourly and daily rollups.
+
+    ``rows`` are WeatherData column dicts (see weather_store.build_weather_row).
+    An observation already stored for the same cell and time (a retried
+    chunk) is skipped and not folded in again. Returns the number of new
+    observations. The caller owns the transaction and must commit.
+    """
+    if not rows:
+        return 0
+    observed_at = observed_at or datetime.now(timezone.utc)
+
+    appended = 0
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        observations = [
+            {"cell_key": row["cell_key"], "observed_at": observed_at, **{f: row.get(f) for f in _OBSERVED_FIELDS}}
+            for row in chunk
+        ]
+        inserted = db.execute(
+            insert(WeatherObservation).values(observations).on_conflict_do_nothing()
+            .returning(*WeatherObservation.__table__.c)
+        ).mappings().all()
+        if inserted:
+            aggregates = _aggregate(inserted)
+            hourly = [agg for agg in aggregates if agg["resolution"] == HOUR]
+            _add_daily_precipitation(aggregates, _stored_hourly_precipitation(db, hourly))
+            _upsert_rollups(db, aggregates)
+            appended += len(inserted)
+    return appended
+
+
+def _upsert_rollups(db: Session, aggregates: List[Dict[str, Any]]):
+    stmt = insert(WeatherRollup).values(aggregates)
+    current = WeatherRollup.__table__.c
+    excluded = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[current.cell_key, current.resolution, current.bucket_start],
+        set_={
+            "samples": current.samples + excluded.samples,
+            **{
+                f"{field}_samples": current[f"{field}_samples"] + excluded[f"{field}_samples"]
+                for field in _AVERAGED_FIELDS
+            },
+            "temperature_sum": func.coalesce(current.temperature_sum, 0) + func.coalesce(excluded.temperature_sum, 0),
+            "temperature_min": func.least(current.temperature_min, excluded.temperature_min),
+            "temperature_max": func.greatest(current.temperature_max, excluded.temperature_max),
+            "humidity_sum": func.coalesce(current.humidity_sum, 0) + func.coalesce(excluded.humidity_sum, 0),
+            "pressure_sum": func.coalesce(current.pressure_sum, 0) + func.coalesce(excluded.pressure_sum, 0),
+            "wind_speed_sum": func.coalesce(current.wind_speed_sum, 0) + func.coalesce(excluded.wind_speed_sum, 0),
+            "wind_speed_max": func.greatest(current.wind_speed_max, excluded.wind_speed_max),
+            # Hours keep their largest reading; days add what their hours grew by
+            "precipitation_sum": case(
+                (current.resolution == HOUR, func.greatest(current.precipitation_sum, excluded.precipitation_sum)),
+                else_=func.coalesce(current.precipitation_sum, 0) + func.coalesce(excluded.precipitation_sum, 0),
+            ),
+        },
+    ))
+
+
+def resolution_for_days(days: int) -> str:
+    """Pick the rollup that matches a requested history range"""
+    return HOUR if days <= settings.WEATHER_HISTORY_HOURLY_MAX_DAYS else DAY
+
+
+def get_history(
+    db: Session, cell_key: str, days: int, limit: int, after: Optional[datetime] = None
+) -> Tuple[str, List[Dict[str, Any]], Optional[datetime]]:
+    """
+    Return (resolution, points, next_after) for a grid cell over the last
+    ``days`` days, oldest first, at most ``limit`` points starting after the
+    ``after`` bucket. ``next_after`` is the last bucket returned if more follow.
+    """
+    resolution = resolution_for_days(days)
+    since = _bucket(datetime.now(timezone.utc) - timedelta(days=days), resolution)
+    query = db.query(WeatherRollup).filter(
+        WeatherRollup.cell_key == cell_key,
+        WeatherRollup.resolution == resolution,
+        WeatherRollup.bucket_start >= since,
+    )
+    if after is not None:
+        query = query.filter(WeatherRollup.bucket_start > after)
+    # Range scan of pk_weather_rollups (cell_key, resolution, bucket_start)
+    rollups = query.order_by(WeatherRollup.bucket_start).limit(limit + 1).all()
+    next_after = rollups[limit - 1].bucket_start if len(rollups) > limit else None
+    rollups = rollups[:limit]
+
+    def avg(total: Optional[float], samples: int) -> Optional[float]:
+        return round(total / samples, 2) if total is not None and samples else None
+
+    points = [
+        {
+            "bucket_start": r.bucket_start,
+            "samples": r.samples,
+            "temperature_avg": avg(r.temperature_sum, r.temperature_samples),
+            "temperature_min": r.temperature_min,
+            "temperature_max": r.temperature_max,
+            "humidity_avg": avg(r.humidity_sum, r.humidity_samples),
+            "pressure_avg": avg(r.pressure_sum, r.pressure_samples),
+            "wind_speed_avg": avg(r.wind_speed_sum, r.wind_speed_samples),
+            "wind_speed_max": r.wind_speed_max,
+            "precipitation_total": r.precipitation_sum,
+        }
+        for r in rollups
+    ]
+    return resolution, points, next_after
@@ -0,0 +1,117 @@
+"""
+Compare request concurrency of the three ways a handler can reach the database.
+
+Each simulated request runs one query that takes --query-ms on the server
+(pg_sleep), with --concurrency requests in flight at a time:
+
+  blocking    sync Session called inside ``async def`` (the event loop waits)
+  threadpool  sync Session in a worker thread (FastAPI ``def`` endpoints)
+  async       AsyncSession on asyncpg (the current request path)
+
+For each mode it prints throughput, p50/p95 latency and the longest
+event-loop stall seen by a 10 ms ticker. Stalls are what every other
+in-flight request on the worker (health checks, upstream calls) waits for.
+Both engines use their configured pool, so throughput is capped by the pool
+size; raise it to see the async path scale further.
+
+Usage (from backend/):
+    python scripts/bench_db_concurrency.py --requests 400 --concurrency 50 --query-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anyio import to_thread  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine, engine  # noqa: E402
+
+QUERY = text("SELECT pg_sleep(:seconds)")
+
+
+def sync_query(seconds: float):
+    db = SessionLocal()
+    try:
+        db.execute(QUERY, {"seconds": seconds})
+    finally:
+        db.close()
+
+
+async def blocking(seconds: float):
+    sync_query(seconds)
+
+
+async def threadpool(seconds: float):
+    await to_thread.run_sync(sync_query, seconds)
+
+
+async def async_session(seconds: float):
+    async with AsyncSessionLocal() as db:
+        await db.execute(QUERY, {"seconds": seconds})
+
+
+async def ticker(stalls: list, stop: asyncio.Event):
+    """Record how late a 10 ms sleep wakes up"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(0.01)
+        stalls.append(loop.time() - started - 0.01)
+
+
+async def run_mode(handler, requests: int, concurrency: int, seconds: float) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(seconds)
+            latencies.append(time.perf_counter() - started)
+
+    stalls: list = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(stalls, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+
+    latencies.sort()
+    return {
+        "req_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "max_loop_stall_ms": round(max(stalls, default=0.0) * 1000, 1),
+    }
+
+
+async def main_async(args):
+    seconds = args.query_ms / 1000.0
+    # Warm both pools so connection setup is not measured
+    await run_mode(async_session, args.concurrency, args.concurrency, 0)
+    await run_mode(threadpool, args.concurrency, args.concurrency, 0)
+    try:
+        for name, handler in (("blocking", blocking), ("threadpool", threadpool), ("async", async_session)):
+            print(f"{name:>10}: {await run_mode(handler, args.requests, args.concurrency, seconds)}")
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-ms", type=float, default=20.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark the farm spatial queries against a synthetic data set.
+
+Creates a throw-away user owning N square farms scattered over Odisha
+(generated server-side), runs each query from random points, prints the
+latency percentiles and the query plan, then removes the data again.
+
+Usage (from backend/):
+    python scripts/bench_farm_spatial.py --farms 100000 --runs 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.services.farm_geometry import backfill_farm_geometry  # noqa: E402
+from app.services.farm_spatial import farms_near, farms_in_bbox, farms_in_district  # noqa: E402
+
+# Odisha bounding box
+MIN_LON, MIN_LAT, MAX_LON, MAX_LAT = 81.4, 17.8, 87.5, 22.6
+BENCH_PHONE = "bench-farm-spatial"
+
+
+def seed(db, farms: int) -> int:
+    user_id = db.execute(text(
+        "INSERT INTO users (name, phone, hashed_password) VALUES ('bench', :phone, '-') RETURNING id"
+    ), {"phone": BENCH_PHONE}).scalar()
+    # ~1-4 ha squares; derived columns are filled the same way the app backfills them
+    db.execute(text(
+        "INSERT INTO farms (user_id, name, geom) "
+        "SELECT :user_id, 'bench ' || g, "
+        "       ST_Expand(ST_SetSRID(ST_MakePoint(:min_lon + random() * (:max_lon - :min_lon), "
+        "                                         :min_lat + random() * (:max_lat - :min_lat)), 4326), "
+        "                 0.0005 + random() * 0.0005) "
+        "FROM generate_series(1, :farms) AS g"
+    ), {"user_id": user_id, "farms": farms, "min_lon": MIN_LON, "min_lat": MIN_LAT, "max_lon": MAX_LON, "max_lat": MAX_LAT})
+    db.commit()
+    backfill_farm_geometry(db)
+    db.execute(text("ANALYZE farms"))
+    db.commit()
+    return user_id
+
+
+def cleanup(db):
+    db.execute(text("DELETE FROM farms WHERE user_id IN (SELECT id FROM users WHERE phone = :phone)"), {"phone": BENCH_PHONE})
+    db.execute(text("DELETE FROM users WHERE phone = :phone"), {"phone": BENCH_PHONE})
+    db.commit()
+
+
+def timed(fn, runs: int):
+    samples, rows = [], 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows += len(fn())
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 2),
+        "avg_rows": round(rows / runs, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--farms", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--radius-m", type=float, default=5000)
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic farms afterwards")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    rng = random.Random(42)
+    try:
+        cleanup(db)
+        started = time.perf_counter()
+        user_id = seed(db, args.farms)
+        print(f"Seeded {args.farms} farms in {time.perf_counter() - started:.1f}s")
+
+        def point():
+            return rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(MIN_LON, MAX_LON)
+
+        def near():
+            lat, lon = point()
+            return farms_near(db, user_id, lat, lon, args.radius_m, limit=100)[0]
+
+        def bbox():
+            lat, lon = point()
+            return farms_in_bbox(db, user_id, lon, lat, lon + 0.1, lat + 0.1, limit=100)[0]
+
+        def district():
+            return farms_in_district(db, user_id, rng.choice(["khordha", "cuttack", "puri", "ganjam"]), limit=100)[0]
+
+        for name, fn in (("near", near), ("within", bbox), ("district", district)):
+            print(f"{name:>9}: {timed(fn, args.runs)}")
+
+        lat, lon = point()
+        plan = db.execute(text(
+            "EXPLAIN SELECT id FROM farms WHERE user_id = :u "
+            "AND geom && ST_MakeEnvelope(:lon, :lat, :lon + 0.1, :lat + 0.1, 4326)"
+        ), {"u": user_id, "lat": lat, "lon": lon}).scalars().all()
+        print("\nbbox plan:\n  " + "\n  ".join(plan))
+    finally:
+        if not args.keep:
+            db.rollback()
+            cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
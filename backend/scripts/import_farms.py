@@ -0,0 +1,78 @@
+"""
+Bulk-import farms for a user from a GeoJSON FeatureCollection file.
+
+Runs the same validation and COPY load as POST /api/v1/farms/import in one
+transaction, prints the count and per-feature errors, and exits non-zero if
+any feature was rejected. Use --dry-run to validate without writing.
+
+Usage (from backend/):
+    python scripts/import_farms.py farms.geojson --phone 9876543210
+    python scripts/import_farms.py farms.geojson --user-id 42 --workers 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+
+from app.db.session import AsyncSessionLocal  # noqa: E402
+from app.models.models import User  # noqa: E402
+from app.services.farm_import import farm_import_pool, import_feature_collection, prepare_features  # noqa: E402
+from app.services.farm_tiles import invalidate_user_tiles  # noqa: E402
+
+
+async def import_for_user(collection, user_id, phone, workers):
+    async with AsyncSessionLocal() as db:
+        if user_id:
+            user = await db.get(User, user_id)
+        else:
+            user = (await db.execute(select(User).where(User.phone == phone))).scalars().first()
+        if not user:
+            sys.exit("User not found")
+        farm_import_pool.startup(workers)
+        try:
+            result = await import_feature_collection(db, user.id, collection)
+        finally:
+            farm_import_pool.shutdown()
+        if result["imported"]:
+            await invalidate_user_tiles(db, user.id)
+        await db.commit()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="GeoJSON FeatureCollection file")
+    owner = parser.add_mutually_exclusive_group(required=True)
+    owner.add_argument("--user-id", type=int)
+    owner.add_argument("--phone")
+    parser.add_argument("--workers", type=int, default=None, help="validation processes (default: FARM_IMPORT_WORKERS)")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    started = time.perf_counter()
+    if args.dry_run:
+        prepared = prepare_features(collection.get("features") or [], args.workers)
+        errors = [{"index": index, "error": error} for index, _, error in prepared if error]
+        result = {"imported": 0, "failed": len(errors), "errors": errors}
+        print(f"Validated {len(prepared) - len(errors)} features")
+    else:
+        result = asyncio.run(import_for_user(collection, args.user_id, args.phone, args.workers))
+        print(f"Imported {result['imported']} farms")
+
+    for error in result["errors"]:
+        print(f"  feature {error['index']}: {error['error']}")
+    print(f"{result['failed']} rejected, {time.perf_counter() - started:.2f}s")
+    sys.exit(1 if result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Recompute area_ha for every farm with the vectorized geodesic area engine.
+
+Reads farms in id order, chunk by chunk, and writes back only areas that
+changed, committing each chunk. Safe to interrupt and re-run.
+
+Usage (from backend/):
+    python scripts/recompute_farm_areas.py --chunk-size 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.services.farm_geometry import AREA_RECOMPUTE_CHUNK_SIZE, recompute_farm_areas  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=AREA_RECOMPUTE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        result = recompute_farm_areas(db, args.chunk_size)
+    finally:
+        db.close()
+    print(f"{result['updated']} of {result['scanned']} farms changed in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from app.core import background_tasks
+from app.core.background_tasks import _SweepStats, run_scheduled_weather_refresh, update_all_weather_data
+from app.core.leader import scheduler_leader
+
+
+def chunk(farms, elapsed_s, latency):
+    return {
+        "farms": farms, "cells": farms, "updated": farms, "failed": 0,
+        "elapsed_s": elapsed_s, "latencies_s": [latency] * farms,
+    }
+
+
+def test_sweep_stats_cover_the_whole_sweep():
+    sweep = _SweepStats()
+
+    # A fast chunk of 90 cells, then a slow chunk of 10
+    sweep.add(chunk(90, 2.0, 0.1))
+    sweep.add(chunk(10, 8.0, 3.0))
+    total = sweep.summary()
+    assert (total["farms"], total["updated"], total["elapsed_s"]) == (100, 100, 10.0)
+    assert total["farms_per_s"] == 10.0
+    assert (total["p50_latency_s"], total["p95_latency_s"]) == (0.1, 3.0)
+    assert "latencies_s" not in total
+
+    # Another fast chunk: 5% of all cells were slow, so the slow chunk's own p95 is no longer the sweep's
+    sweep.add(chunk(100, 5.0, 0.1))
+    assert (sweep.summary()["p50_latency_s"], sweep.summary()["p95_latency_s"]) == (0.1, 0.1)
+
+
+class FakeSession:
+    def __init__(self):
+        self.claims = 0
+
+    async def run_sync(self, fn, *args):
+        if fn is background_tasks.claim_due_targets:
+            self.claims += 1
+            return [(self.claims, 20.3, 85.8)] * args[0]
+        return 0
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+async def test_sweep_stops_claiming_once_leadership_is_lost(monkeypatch):
+    db = FakeSession()
+    monkeypatch.setattr(background_tasks, "AsyncSessionLocal", lambda: db)
+    monkeypatch.setattr(scheduler_leader, "_conn", object())
+
+    async def refresh(targets, db):
+        # The leader connection drops while the second chunk is refreshed
+        if db.claims == 2:
+            monkeypatch.setattr(scheduler_leader, "_conn", None)
+        return chunk(len(targets), 1.0, 0.2)
+
+    monkeypatch.setattr(background_tasks, "refresh_weather", refresh)
+    total = await run_scheduled_weather_refresh()
+    assert db.claims == 2
+    assert total["updated"] == 2 * background_tasks.settings.WEATHER_SCHEDULER_CHUNK_SIZE
+
+
+async def test_full_update_returns_its_stats_when_it_fails(monkeypatch):
+    db = FakeSession()
+    monkeypatch.setattr(background_tasks, "AsyncSessionLocal", lambda: db)
+
+    async def run_sync(fn, *args):
+        if fn is background_tasks.farm_targets_after:
+            raise RuntimeError("connection lost")
+        return None
+
+    monkeypatch.setattr(db, "run_sync", run_sync)
+    total = await update_all_weather_data()
+    assert (total["farms"], total["updated"], total["p95_latency_s"]) == (0, 0, 0.0)
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.http_client import UpstreamClient
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+def test_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker("openweather", failure_threshold=3, recovery_seconds=60)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected_calls"] == 1
+
+
+def test_half_open_allows_one_trial_then_closes_on_success():
+    breaker = CircuitBreaker("openweather", failure_threshold=1, recovery_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_circuit():
+    breaker = CircuitBreaker("openweather", failure_threshold=1, recovery_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_abandoned_trial_frees_its_slot():
+    breaker = CircuitBreaker("openweather", failure_threshold=1, recovery_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.before_call() is True
+    breaker.release_trial()
+    assert breaker.before_call() is True
+
+    # A trial that never reports back stops blocking after the cool-down
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.06)
+    assert breaker.before_call() is True
+
+
+async def test_cancelled_half_open_trial_does_not_wedge_the_client():
+    started = asyncio.Event()
+
+    async def handler(request):
+        if request.url.path == "/slow":
+            started.set()
+            await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    client = UpstreamClient("test")
+    client.breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=0.01)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.breaker.record_failure()
+    await asyncio.sleep(0.02)
+
+    trial = asyncio.create_task(client.get("http://upstream/slow"))
+    await started.wait()
+    assert client.breaker.state == HALF_OPEN
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    response = await client.get("http://upstream/ok")
+    assert response.status_code == 200
+    assert client.breaker.state == CLOSED
+    assert client.in_flight == 0
+    await client.aclose()
@@ -0,0 +1,31 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.db.pool import InstrumentedQueuePool, pool_stats
+
+
+def test_pool_stats_count_checkouts_waits_and_timeouts():
+    engine = create_engine(
+        "sqlite://", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.2
+    )
+    first, second = engine.connect(), engine.connect()
+    stats = pool_stats(engine.pool)
+    assert (stats["checked_out"], stats["idle"], stats["overflow"], stats["waits"]) == (2, 0, 1, 0)
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    stats = pool_stats(engine.pool)
+    assert (stats["waits"], stats["timeouts"], stats["waiting"]) == (1, 1, 0)
+    assert stats["max_wait_ms"] >= 150
+
+    # A waiter that gets a connection back is counted as a wait, not a timeout
+    threading.Timer(0.01, second.close).start()
+    third = engine.connect()
+    stats = pool_stats(engine.pool)
+    assert (stats["waits"], stats["timeouts"]) == (2, 1)
+
+    for conn in (first, third):
+        conn.close()
+    assert pool_stats(engine.pool)["checked_out"] == 0
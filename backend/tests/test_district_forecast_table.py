@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.district_forecast_table import IST, DistrictForecastTable
+
+
+def daily(days):
+    start = datetime.now(IST).date()
+    return {
+        "time": [(start + timedelta(days=i)).isoformat() for i in range(days)],
+        "temperature_2m_max": [33.0] * days,
+        "temperature_2m_min": [None] * days,
+        "precipitation_sum": [1.5] * days,
+        "weathercode": [61] * days,
+    }
+
+
+def test_table_ages_from_when_the_snapshot_was_fetched():
+    table = DistrictForecastTable()
+    hour = 3600
+
+    table.load(["puri"], [daily(3)], datetime.now(timezone.utc) - timedelta(hours=2))
+    forecast = table.lookup("puri", 2, max_age_seconds=3 * hour, describe=str)
+    assert [day["temp_max_c"] for day in forecast] == [33.0, 33.0]
+    assert forecast[0]["temp_min_c"] is None
+
+    # A worker loading a snapshot fetched long ago does not treat it as fresh
+    table.load(["puri"], [daily(3)], datetime.now(timezone.utc) - timedelta(hours=4))
+    assert table.lookup("puri", 2, max_age_seconds=3 * hour, describe=str) is None
+    assert table.lookup("puri", 4, max_age_seconds=5 * hour, describe=str) is None
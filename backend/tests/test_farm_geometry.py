@@ -0,0 +1,61 @@
+from shapely.geometry import Polygon
+
+from app.services.farm_geometry import geodesic_area_ha, geometry_columns
+
+
+def test_geodesic_area_of_a_small_square_near_bhubaneswar():
+    # 0.01 deg x 0.01 deg at 20.3 N: ~1112 m x ~1043 m
+    square = Polygon([(85.82, 20.30), (85.83, 20.30), (85.83, 20.31), (85.82, 20.31)])
+    assert abs(geodesic_area_ha(square) - 116.0) < 1.0
+
+
+def test_holes_are_excluded_and_orientation_does_not_matter():
+    outer = [(85.0, 20.0), (85.02, 20.0), (85.02, 20.02), (85.0, 20.02)]
+    hole = [(85.005, 20.005), (85.015, 20.005), (85.015, 20.015), (85.005, 20.015)]
+    solid = geodesic_area_ha(Polygon(outer))
+    assert geodesic_area_ha(Polygon(list(reversed(outer)))) == solid
+    assert abs(geodesic_area_ha(Polygon(outer, [hole])) - solid * 0.75) < 0.1
+
+
+def test_geometry_columns_include_centroid_and_bbox():
+    columns = geometry_columns(Polygon([(85.0, 20.0), (85.2, 20.0), (85.2, 20.1), (85.0, 20.1)]))
+    assert abs(columns["centroid_lon"] - 85.1) < 1e-9 and abs(columns["centroid_lat"] - 20.05) < 1e-9
+    assert (columns["bbox_min_lon"], columns["bbox_max_lat"]) == (85.0, 20.1)
+    assert columns["area_ha"] > 0
+
+
+def test_nearest_district_and_bbox_parsing():
+    from app.services.farm_geometry import nearest_district
+    from app.services.farm_spatial import parse_bbox
+
+    assert nearest_district(20.19, 85.62) == "khordha"
+    assert nearest_district(28.6, 77.2) is None  # Delhi: no Odisha district nearby
+    assert parse_bbox("85.0,20.0,85.5,20.5") == [85.0, 20.0, 85.5, 20.5]
+    assert parse_bbox("85.5,20.0,85.0,20.5") is None
+    assert parse_bbox("a,b,c,d") is None
+
+
+def test_list_simplification_tolerance_halves_per_zoom_level():
+    from app.services.farm_geojson import simplify_tolerance_deg
+
+    assert simplify_tolerance_deg(0) == 0.5 * 360.0 / 256
+    assert simplify_tolerance_deg(15) * 2 == simplify_tolerance_deg(14)
+
+
+def test_vectorized_areas_match_per_polygon_areas():
+    import numpy as np
+    from app.services.farm_geometry import geodesic_areas_ha
+
+    outer = [(85.0, 20.0), (85.02, 20.0), (85.02, 20.02), (85.0, 20.02)]
+    hole = [(85.005, 20.005), (85.015, 20.005), (85.015, 20.015), (85.005, 20.015)]
+    polygons = [
+        Polygon(outer),
+        Polygon(outer, [hole]),
+        Polygon([(86.1, 21.3), (86.13, 21.31), (86.12, 21.35)]),
+        None,
+        Polygon(),
+    ]
+    areas = geodesic_areas_ha(polygons)
+    assert [geodesic_area_ha(p) for p in polygons[:3]] == list(areas[:3])
+    assert np.isnan(areas[3]) and np.isnan(areas[4])
+    assert abs(areas[1] - areas[0] * 0.75) < 0.1
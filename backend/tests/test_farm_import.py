@@ -0,0 +1,68 @@
+from shapely import from_wkb, get_srid
+from shapely.geometry import shape
+
+from app.services.farm_import import FarmImportPool, prepare_feature, prepare_features
+
+SQUARE = {
+    "type": "Polygon",
+    "coordinates": [[[85.82, 20.30], [85.83, 20.30], [85.83, 20.31], [85.82, 20.31], [85.82, 20.30]]],
+}
+
+
+def feature(geometry, **properties):
+    return {"type": "Feature", "geometry": geometry, "properties": properties}
+
+
+def test_valid_polygon_becomes_a_row_with_hex_ewkb():
+    index, row, error = prepare_feature(3, feature(SQUARE, name="North plot"))
+    assert (index, error) == (3, None)
+    assert row["name"] == "North plot"
+    assert get_srid(from_wkb(row["geom"])) == 4326
+    assert from_wkb(row["geom"]).equals(shape(SQUARE))
+    assert abs(row["area_ha"] - 116.0) < 1.0
+    assert row["district"] is not None
+
+
+def test_invalid_features_are_reported_not_raised():
+    bowtie = {"type": "Polygon", "coordinates": [[[85.0, 20.0], [85.1, 20.1], [85.1, 20.0], [85.0, 20.1], [85.0, 20.0]]]}
+    projected = {"type": "Polygon", "coordinates": [[[500000, 2200000], [501000, 2200000], [501000, 2201000], [500000, 2200000]]]}
+    cases = [
+        {"type": "Polygon"},
+        feature(None),
+        feature({"type": "Point", "coordinates": [85.0, 20.0]}),
+        feature(bowtie),
+        feature(projected),
+        feature({"type": "Polygon", "coordinates": "nope"}),
+    ]
+    for index, item in enumerate(cases):
+        _, row, error = prepare_feature(index, item)
+        assert row is None and error, item
+
+
+def test_prepare_features_keeps_order_in_the_process_pool(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "FARM_IMPORT_PARALLEL_THRESHOLD", 1)
+    features = [feature(SQUARE, name=str(i)) if i % 7 else feature(None) for i in range(600)]
+    prepared = prepare_features(features, workers=2)
+    assert [index for index, _, _ in prepared] == list(range(600))
+    assert sum(1 for _, row, _ in prepared if row is None) == len(range(0, 600, 7))
+    assert prepared[1][1]["name"] == "1"
+
+
+async def test_shared_pool_keeps_order(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "FARM_IMPORT_PARALLEL_THRESHOLD", 1)
+    features = [feature(SQUARE, name=str(i)) if i % 7 else feature(None) for i in range(600)]
+    pool = FarmImportPool()
+    pool.startup(workers=2)
+    try:
+        prepared = await pool.prepare(features)
+    finally:
+        pool.shutdown()
+    assert [index for index, _, _ in prepared] == list(range(600))
+    assert prepared[1][1]["name"] == "1"
+
+    # Not started (one worker, or outside the app): validated in a thread
+    assert [index for index, _, _ in await FarmImportPool().prepare(features[:3])] == [0, 1, 2]
@@ -0,0 +1,50 @@
+from app.services import farm_tiles
+
+
+class FakeSession:
+    """Stands in for AsyncSession on a database shared by every worker: ``versions`` is users.farm_tiles_version"""
+
+    def __init__(self, versions):
+        self.versions = versions
+
+    async def run_sync(self, fn, *args):
+        return fn(None, *args)
+
+    async def scalar(self, stmt):
+        (user_id,) = stmt.compile().params.values()
+        return self.versions.get(user_id, 0)
+
+    async def execute(self, stmt, execution_options=None):
+        user_id = next(value for key, value in stmt.compile().params.items() if key.startswith("id"))
+        self.versions[user_id] = self.versions.get(user_id, 0) + 1
+
+
+def test_tile_coordinates_are_bounded_by_zoom():
+    assert farm_tiles.valid_tile(0, 0, 0)
+    assert farm_tiles.valid_tile(14, 11900, 7200)
+    assert not farm_tiles.valid_tile(2, 4, 0)
+    assert not farm_tiles.valid_tile(23, 0, 0)
+
+
+async def test_farm_writes_invalidate_only_the_owners_tiles(monkeypatch):
+    renders = []
+
+    def render(db, user_id, z, x, y):
+        renders.append(user_id)
+        return b"tile-%d-%d" % (user_id, len(renders))
+
+    monkeypatch.setattr(farm_tiles, "render_farm_tile", render)
+    farm_tiles.farm_tile_cache.clear()
+    versions = {}
+    db = FakeSession(versions)
+
+    first = await farm_tiles.get_farm_tile(db, 1, 10, 1, 1)
+    other = await farm_tiles.get_farm_tile(db, 2, 10, 1, 1)
+    assert await farm_tiles.get_farm_tile(db, 1, 10, 1, 1) == first
+    assert renders == [1, 2]
+
+    # The write is handled by another worker: only the shared version changes
+    await farm_tiles.invalidate_user_tiles(FakeSession(versions), 1)
+    assert await farm_tiles.get_farm_tile(db, 1, 10, 1, 1) != first
+    assert await farm_tiles.get_farm_tile(db, 2, 10, 1, 1) == other
+    assert renders == [1, 2, 1]
@@ -0,0 +1,54 @@
+import json
+
+from app.services.forecast_codec import FORECAST_FORMAT, decode_forecast, encode_forecast, strip_raw
+
+
+def _forecast(n=40):
+    return {
+        "forecast": [
+            {
+                "datetime": 1717200000 + i * 10800,
+                "temperature": 30.0 + i % 5,
+                "humidity": 60 + i % 7,
+                "pressure": 1005,
+                "wind_speed": 3.2,
+                "precipitation": 0,
+                "weather_description": "light rain" if i % 3 else "overcast clouds",
+                "weather_icon": "10d",
+            }
+            for i in range(n)
+        ],
+        "city": "Bhubaneswar",
+        "country": "IN",
+    }
+
+
+def test_round_trip_restores_the_original_shape():
+    original = _forecast()
+    encoded = encode_forecast(original)
+
+    assert encoded["format"] == FORECAST_FORMAT
+    assert encoded["step"] == 10800 and "time" not in encoded
+    assert encoded["weather_descriptions"] == ["overcast clouds", "light rain"]
+    assert decode_forecast(encoded) == original
+    assert len(json.dumps(encoded)) < len(json.dumps(original)) / 2
+
+
+def test_irregular_timestamps_are_kept_explicitly():
+    original = _forecast(3)
+    original["forecast"][2]["datetime"] += 60
+    encoded = encode_forecast(original)
+    assert encoded["time"] == [slot["datetime"] for slot in original["forecast"]]
+    assert decode_forecast(encoded) == original
+
+
+def test_legacy_rows_and_missing_forecasts_pass_through():
+    legacy = _forecast(2)
+    assert decode_forecast(legacy) is legacy
+    assert encode_forecast(None) is None
+    assert decode_forecast(None) is None
+
+
+def test_strip_raw_drops_only_the_upstream_payload():
+    assert strip_raw({"soil_moisture": 0.3, "raw_data": {"big": "payload"}}) == {"soil_moisture": 0.3}
+    assert strip_raw(None) is None
@@ -1,6 +1,7 @@
 import pytest
 from httpx import AsyncClient, ASGITransport
 from app.main import app
+from app.db.query_stats import assert_max_queries
 
 # Test Data
 USER_DATA = {"name": "Test Auto", "phone": "9999900000", "password": "testpassword"}
@@ -38,7 +39,8 @@ async def test_full_backend_flow():
         farm_id = resp.json()["id"]
         
         # 4. List Farms
-        resp = await ac.get("/api/v1/farms/", headers=headers)
+        with assert_max_queries(2):
+            resp = await ac.get("/api/v1/farms/", headers=headers)
         assert resp.status_code == 200
         assert len(resp.json()) >= 1
         # Check that our farm is in the list
@@ -57,23 +59,27 @@ async def test_full_backend_flow():
         sample_id = resp.json()["id"]
         
         # 7. Update Soil Sample
-        resp = await ac.put(f"/api/v1/soil_samples/{sample_id}", json={"ph": 7.5}, headers=headers)
+        with assert_max_queries(4):
+            resp = await ac.put(f"/api/v1/soil_samples/{sample_id}", json={"ph": 7.5}, headers=headers)
         assert resp.status_code == 200
         assert resp.json()["ph"] == 7.5
         
         # 8. Run Prediction
         predict_data = {"farm_id": farm_id, "crop": "wheat"}
-        resp = await ac.post("/api/v1/predict/", json=predict_data, headers=headers)
+        with assert_max_queries(5):
+            resp = await ac.post("/api/v1/predict/", json=predict_data, headers=headers)
         assert resp.status_code == 200
         assert "predicted_yield" in resp.json()
         
         # 9. Get Farm Predictions History
-        resp = await ac.get(f"/api/v1/predict/farm/{farm_id}", headers=headers)
+        with assert_max_queries(3):
+            resp = await ac.get(f"/api/v1/predict/farm/{farm_id}", headers=headers)
         assert resp.status_code == 200
         assert len(resp.json()) >= 1
         
         # 10. Delete Soil Sample
-        resp = await ac.delete(f"/api/v1/soil_samples/{sample_id}", headers=headers)
+        with assert_max_queries(3):
+            resp = await ac.delete(f"/api/v1/soil_samples/{sample_id}", headers=headers)
         assert resp.status_code == 200 # or 204
         
         # 11. Delete Farm
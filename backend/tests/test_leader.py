@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app.core.leader import LeaderElector
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeConnection:
+    """Dedicated leader connection; ``server`` maps each advisory lock key to the connection holding it"""
+
+    def __init__(self, server):
+        self.server = server
+        self.statements = []
+        self.broken = False
+        self.closed = False
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if self.broken:
+            raise ConnectionError("server closed the connection unexpectedly")
+        if "pg_try_advisory_lock" in sql:
+            if self.server.get(params["key"]) in (None, self):
+                self.server[params["key"]] = self
+                return FakeResult(True)
+            return FakeResult(False)
+        if "pg_advisory_unlock" in sql:
+            self.server.pop(params["key"], None)
+        return FakeResult(1)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def invalidate(self):
+        # Closing the leader's connection frees its session lock
+        self.closed = True
+        for key in [key for key, holder in self.server.items() if holder is self]:
+            del self.server[key]
+
+
+@pytest.fixture
+def server():
+    return {}
+
+
+def elector(monkeypatch, server):
+    candidate = LeaderElector(lock_key=42, heartbeat_seconds=1)
+    connections = []
+
+    def connect():
+        connections.append(FakeConnection(server))
+        return connections[-1]
+
+    monkeypatch.setattr(candidate, "_connect", connect)
+    return candidate, connections
+
+
+def test_first_candidate_wins_and_the_other_is_refused(monkeypatch, server):
+    leader, leader_conns = elector(monkeypatch, server)
+    follower, follower_conns = elector(monkeypatch, server)
+
+    leader._step()
+    follower._step()
+    assert leader.is_leader and leader.elections_won == 1
+    assert not follower.is_leader and follower.elections_won == 0
+    # A refused candidate does not keep its connection open
+    assert follower_conns[0].closed and not leader_conns[0].closed
+
+    leader._step()
+    assert leader_conns[0].statements[-1] == "SELECT 1"
+    assert len(leader_conns) == 1
+
+
+def test_failed_heartbeat_drops_leadership_and_frees_the_lock(monkeypatch, server):
+    leader, leader_conns = elector(monkeypatch, server)
+    follower, _ = elector(monkeypatch, server)
+    leader._step()
+
+    leader_conns[0].broken = True
+    leader._step()
+    assert not leader.is_leader and leader.leadership_lost == 1
+    assert leader.stats()["leader_for_s"] is None
+
+    follower._step()
+    assert follower.is_leader
+
+
+def test_release_unlocks_and_closes_the_connection(monkeypatch, server):
+    leader, leader_conns = elector(monkeypatch, server)
+    leader._step()
+    leader._release()
+    assert not leader.is_leader
+    assert "pg_advisory_unlock" in leader_conns[0].statements[-1]
+    assert leader_conns[0].closed and server == {}
+    leader._release()  # idempotent
+
+
+async def test_cancelling_run_releases_leadership(monkeypatch, server):
+    leader, leader_conns = elector(monkeypatch, server)
+    task = asyncio.create_task(leader.run())
+    while not leader.is_leader:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not leader.is_leader and server == {}
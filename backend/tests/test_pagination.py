@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, create_engine, select
+
+from app.core.pagination import decode_cursor, encode_cursor, newest_first
+from app.services.farm_spatial import farms_in_district, farms_near
+
+metadata = MetaData()
+samples = Table(
+    "samples", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("sample_date", DateTime),
+)
+
+
+def test_cursor_round_trip():
+    at = datetime(2025, 3, 1, 6, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor("soil_samples", (at, 42))
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "soil_samples", (datetime, int)) == [at, 42]
+    assert decode_cursor(None, "soil_samples", (datetime, int)) is None
+    assert decode_cursor(encode_cursor("farms_near", (1234.5678901234567, 9)), "farms_near", (float, int)) == [
+        1234.5678901234567, 9,
+    ]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    encode_cursor("predictions", (datetime(2025, 1, 1), 1)),
+    encode_cursor("soil_samples", ("yesterday", 1)),
+    encode_cursor("soil_samples", (datetime(2025, 1, 1),)),
+    encode_cursor("soil_samples", (datetime(2025, 1, 1), True)),
+])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor, "soil_samples", (datetime, int))
+    assert e.value.status_code == 400
+
+
+def test_newest_first_walks_every_row_once_across_pages():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    start = datetime(2025, 1, 1)
+    # Ten samples share each timestamp, so pages split ties on id
+    rows = [{"id": i, "sample_date": start + timedelta(hours=i // 10)} for i in range(1, 96)]
+    with engine.connect() as conn:
+        conn.execute(samples.insert(), rows)
+        seen, cursor = [], None
+        while True:
+            after = decode_cursor(cursor, "samples", (datetime, int))
+            query = newest_first(select(samples), samples.c.sample_date, samples.c.id, after, 7)
+            page = conn.execute(query).all()
+            assert len(page) <= 8
+            seen.extend(row.id for row in page[:7])
+            if len(page) <= 7:
+                break
+            cursor = encode_cursor("samples", (page[6].sample_date, page[6].id))
+
+    expected = sorted(rows, key=lambda r: (r["sample_date"], r["id"]), reverse=True)
+    assert seen == [r["id"] for r in expected]
+
+
+class FakeSpatialSession:
+    """Answers the farm_spatial queries from ``rows``, honouring their keyset and LIMIT parameters"""
+
+    def __init__(self, rows, key):
+        self.rows = sorted(rows, key=key)
+        self.key = key
+        self.statements = []
+
+    def execute(self, statement, params):
+        sql = str(statement)
+        self.statements.append(sql)
+        assert "OFFSET" not in sql
+        rows = self.rows
+        if "after_id" in params:
+            after = (params["after_distance"], params["after_id"]) if "after_distance" in params else (params["after_id"],)
+            rows = [row for row in rows if self.key(row) > after]
+        return [FakeRow(row) for row in rows[:params["limit"]]]
+
+
+class FakeRow:
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+
+def walk(fetch, kind, types):
+    seen, cursor = [], None
+    while True:
+        page, next_key = fetch(decode_cursor(cursor, kind, types))
+        assert len(page) <= 7
+        seen.extend(row["id"] for row in page)
+        if next_key is None:
+            return seen
+        cursor = encode_cursor(kind, next_key)
+
+
+def test_farms_near_pages_by_distance_then_id():
+    # Farms at equal distances split ties on id
+    rows = [{"id": i, "distance_m": float(i // 3) * 250.5} for i in range(1, 30)]
+    db = FakeSpatialSession(rows, key=lambda row: (row["distance_m"], row["id"]))
+    seen = walk(lambda after: farms_near(db, 1, 20.3, 85.8, 5000, 7, after), "farms_near", (float, int))
+    assert seen == [row["id"] for row in db.rows]
+    assert "(distance_m, id) >" in db.statements[-1] and "(distance_m, id) >" not in db.statements[0]
+
+
+def test_farms_in_district_pages_by_id():
+    db = FakeSpatialSession([{"id": i} for i in range(1, 22)], key=lambda row: (row["id"],))
+    seen = walk(lambda after: farms_in_district(db, 1, "Khordha", 7, after), "farms_district", (int,))
+    assert seen == list(range(1, 22))
+    # 21 rows in pages of 7: the third page is full but nothing follows it
+    assert len(db.statements) == 3
@@ -0,0 +1,54 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.db.query_stats import assert_max_queries, query_stats_middleware, track_queries
+
+engine = create_engine("sqlite://")
+
+
+def run_queries(n):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        for i in range(n):
+            conn.execute(text("SELECT :i"), {"i": i})
+
+
+def test_repeated_statements_are_grouped():
+    with track_queries() as outer:
+        with track_queries() as inner:
+            run_queries(6)
+        run_queries(0)
+    assert (inner.count, outer.count) == (7, 8)
+    assert inner.repeated(5) == [("SELECT ?", 6)]
+    assert outer.seconds >= inner.seconds > 0
+
+
+def test_assert_max_queries_reports_the_statements():
+    with assert_max_queries(3):
+        run_queries(2)
+    with pytest.raises(AssertionError, match="at most 2 queries, got 4 queries"):
+        with assert_max_queries(2):
+            run_queries(3)
+
+
+def test_middleware_headers_in_debug_mode(monkeypatch, caplog):
+    app = FastAPI()
+    app.middleware("http")(query_stats_middleware)
+
+    @app.get("/n-plus-one")
+    def n_plus_one():
+        run_queries(5)
+        return {}
+
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "DEBUG", False)
+    assert "X-DB-Query-Count" not in client.get("/n-plus-one").headers
+    assert "ran the same statement 5x" in caplog.text
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    headers = client.get("/n-plus-one").headers
+    assert (headers["X-DB-Query-Count"], headers["X-DB-Repeated-Queries"]) == ("6", "1")
+    assert float(headers["X-DB-Query-Ms"]) >= 0
@@ -0,0 +1,43 @@
+import time
+
+from app.core.rate_limit import TokenBucket, parse_retry_after
+
+
+def test_parse_retry_after_seconds_and_cap():
+    assert parse_retry_after("5", max_seconds=60) == 5.0
+    assert parse_retry_after("600", max_seconds=60) == 60.0
+    assert parse_retry_after(None, max_seconds=60) is None
+    assert parse_retry_after("not a date", max_seconds=60) is None
+
+
+def test_parse_retry_after_http_date_in_the_past_is_zero():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", max_seconds=60) == 0.0
+
+
+async def test_burst_is_served_without_waiting():
+    bucket = TokenBucket(rate_per_second=1, burst=5)
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    assert time.monotonic() - started < 0.05
+
+
+async def test_acquire_waits_for_refill_when_empty():
+    bucket = TokenBucket(rate_per_second=50, burst=1)
+    await bucket.acquire()
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.015
+
+
+async def test_throttling_halves_rate_and_honours_retry_after():
+    bucket = TokenBucket(rate_per_second=100, burst=10)
+    bucket.on_throttled(retry_after=0.05)
+    assert bucket.rate == 50
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.04
+
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 100
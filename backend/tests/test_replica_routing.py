@@ -0,0 +1,79 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.db import replicas
+from app.db.replicas import READ_PRIMARY_COOKIE, READ_PRIMARY_HEADER, Replica, ReplicaRouter, read_your_writes_middleware
+from app.db.session import PrimarySession
+
+
+def make_router(*healthy, sticky_seconds=60):
+    replicas = []
+    for index, is_healthy in enumerate(healthy):
+        replica = Replica(f"replica-{index}", engine=None)
+        replica.healthy = is_healthy
+        replicas.append(replica)
+    return ReplicaRouter(replicas, sticky_seconds=sticky_seconds, max_lag_seconds=5, check_seconds=5, secret="test")
+
+
+def test_reads_round_robin_over_healthy_replicas():
+    router = make_router(True, False, True)
+    names = [router.choose(user_id=1).name for _ in range(4)]
+    assert names == ["replica-0", "replica-2", "replica-0", "replica-2"]
+    assert [replica.reads for replica in router.replicas] == [2, 0, 2]
+
+
+def test_recent_writer_reads_from_primary_on_another_worker():
+    # The write and the read are served by different processes
+    writer, reader = make_router(True), make_router(True)
+    token = writer.sticky_token(7)
+    assert reader.choose(7, token) is None
+    assert reader.choose(7).name == "replica-0"
+    assert reader.choose(8, token).name == "replica-0"
+    assert reader.primary_reads["sticky"] == 1
+
+
+def test_forged_or_expired_tokens_are_ignored():
+    router = make_router(True)
+    user, until, signature = router.sticky_token(7).split(":")
+    assert not router.is_sticky(8, f"8:{until}:{signature}")
+    assert not router.is_sticky(7, f"7:{until}:{'0' * len(signature)}")
+    assert not router.is_sticky(7, "garbage")
+    assert not ReplicaRouter([], 60, 5, 5, secret="other").is_sticky(7, router.sticky_token(7))
+    expired = make_router(True, sticky_seconds=-1)
+    assert not expired.is_sticky(7, expired.sticky_token(7))
+
+
+def test_primary_when_no_replica_is_healthy_or_configured():
+    router = make_router(False, False)
+    assert router.choose(1) is None
+    assert router.primary_reads["no_healthy_replica"] == 1
+
+    router = make_router()
+    assert router.choose(1, router.sticky_token(1)) is None
+
+
+def test_committing_request_hands_out_a_token(monkeypatch):
+    writer = make_router(True)
+    monkeypatch.setattr(replicas, "replica_router", writer)
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.middleware("http")(read_your_writes_middleware)
+
+    @app.post("/write")
+    def write():
+        with PrimarySession(bind=engine) as db:
+            db.info["user_id"] = 7
+            db.commit()
+        return {}
+
+    @app.get("/read")
+    def read():
+        return {}
+
+    client = TestClient(app)
+    assert READ_PRIMARY_HEADER not in client.get("/read").headers
+    response = client.post("/write")
+    token = response.headers[READ_PRIMARY_HEADER]
+    assert response.cookies[READ_PRIMARY_COOKIE] == token
+    assert make_router(True).choose(7, token) is None
@@ -0,0 +1,73 @@
+import asyncio
+
+from app.core.cache import TTLCache, cache_key
+
+
+def _counting_fetch(values):
+    calls = {"n": 0}
+
+    async def fetch():
+        calls["n"] += 1
+        return values[min(calls["n"], len(values)) - 1]
+
+    return fetch, calls
+
+
+async def test_fresh_entries_are_served_from_cache():
+    cache = TTLCache(max_entries=10)
+    fetch, calls = _counting_fetch(["a"])
+
+    assert await cache.get_or_fetch("k", fetch, ttl=60) == "a"
+    assert await cache.get_or_fetch("k", fetch, ttl=60) == "a"
+    assert calls["n"] == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+async def test_none_results_are_not_cached():
+    cache = TTLCache(max_entries=10)
+    fetch, calls = _counting_fetch([None, "b"])
+
+    assert await cache.get_or_fetch("k", fetch, ttl=60) is None
+    assert await cache.get_or_fetch("k", fetch, ttl=60) == "b"
+    assert calls["n"] == 2
+
+
+async def test_stale_entry_is_served_while_refreshing():
+    cache = TTLCache(max_entries=10)
+    fetch, calls = _counting_fetch(["old", "new"])
+
+    await cache.get_or_fetch("k", fetch, ttl=0, stale_ttl=60)
+    # Past TTL but inside the stale window: old value returned immediately
+    assert await cache.get_or_fetch("k", fetch, ttl=0, stale_ttl=60) == "old"
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert calls["n"] == 2
+    assert cache.stats()["stale_hits"] == 1
+    assert cache._entries["k"].value == "new"
+
+
+async def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    fetch, _ = _counting_fetch(["v"])
+
+    await cache.get_or_fetch("a", fetch, ttl=60)
+    await cache.get_or_fetch("b", fetch, ttl=60)
+    await cache.get_or_fetch("a", fetch, ttl=60)
+    await cache.get_or_fetch("c", fetch, ttl=60)
+
+    assert set(cache._entries) == {"a", "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_key_rounds_coordinates():
+    assert cache_key("current", 20.46251, 85.88279) == cache_key("current", 20.4612, 85.8808)
+
+
+async def test_expired_entry_is_served_when_upstream_fails():
+    cache = TTLCache(max_entries=10, stale_if_error=60)
+    fetch, _ = _counting_fetch(["cached", None])
+
+    await cache.get_or_fetch("k", fetch, ttl=0)
+    assert await cache.get_or_fetch("k", fetch, ttl=0) == "cached"
+    assert cache.stats()["served_stale_on_error"] == 1
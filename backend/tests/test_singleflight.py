@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = {"n": 0}
+
+    async def fetch():
+        calls["n"] += 1
+        await asyncio.sleep(0.01)
+        return "forecast"
+
+    results = await asyncio.gather(*(flight.do(("puri", 10), fetch) for _ in range(50)))
+
+    assert results == ["forecast"] * 50
+    assert calls["n"] == 1
+    assert flight.stats()["coalesced"] == 49
+    assert flight.stats()["in_flight"] == 0
+
+
+async def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0)
+        return True
+
+    await asyncio.gather(flight.do(("puri", 10), fetch), flight.do(("puri", 5), fetch))
+
+    assert flight.stats()["upstream_calls"] == 2
+
+
+async def test_errors_reach_every_waiting_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        await flight.do("k", fail)
@@ -0,0 +1,20 @@
+from app.services.weather_grid import cell_for, group_by_cell
+
+
+def test_nearby_farms_share_a_cell():
+    # Two farms ~300 m apart in the same village
+    a = cell_for(20.2961, 85.8245, cell_deg=0.01)
+    b = cell_for(20.2985, 85.8270, cell_deg=0.01)
+    assert a == b
+    assert a.latitude == 20.295 and a.longitude == 85.825
+
+
+def test_cells_do_not_straddle_zero_or_negative_coordinates():
+    assert cell_for(-0.001, -0.001, cell_deg=0.01).key == "0.01:-1:-1"
+    assert cell_for(0.001, 0.001, cell_deg=0.01).key == "0.01:0:0"
+
+
+def test_group_by_cell_collects_farm_ids():
+    targets = [(1, 85.8245, 20.2961), (2, 85.8270, 20.2985), (3, 86.5, 21.5)]
+    cells = group_by_cell(targets)
+    assert sorted(sorted(farm_ids) for _, farm_ids in cells.values()) == [[1, 2], [3]]
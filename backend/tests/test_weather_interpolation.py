@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.services.weather_interpolation import WeatherInterpolator, chord_to_km, idw, to_unit_vectors
+
+
+def test_chord_distance_matches_great_circle():
+    # Bhubaneswar -> Cuttack is roughly 22 km
+    a, b = to_unit_vectors(np.array([20.2961, 20.4625]), np.array([85.8245, 85.8830]))
+    assert abs(chord_to_km(np.linalg.norm(a - b)) - 19.5) < 1.0
+
+
+def test_idw_weights_closer_points_more_and_skips_missing():
+    distances = np.array([[1.0, 3.0]])
+    values = np.array([[[30.0, np.nan], [20.0, 80.0]]])
+    result = idw(distances, values, power=2.0, max_distance_km=50.0)
+    assert abs(result[0, 0] - 29.0) < 1e-9  # weights 1 and 1/9
+    assert abs(result[0, 1] - 80.0) < 1e-9  # only the farther point has humidity
+
+
+def test_idw_exact_hit_and_out_of_range():
+    distances = np.array([[0.0, 2.0], [100.0, 200.0]])
+    values = np.array([[[25.0], [35.0]], [[25.0], [35.0]]])
+    result = idw(distances, values, power=2.0, max_distance_km=50.0)
+    assert result[0, 0] == 25.0
+    assert np.isnan(result[1, 0])
+
+
+def test_estimate_many_is_vectorized_over_farms():
+    interpolator = WeatherInterpolator()
+    interpolator.set_source(
+        "districts",
+        [20.0, 20.0, 21.0],
+        [85.0, 86.0, 85.0],
+        [{"temperature": 30.0}, {"temperature": 32.0}, {"temperature": 28.0, "humidity": 70.0}],
+    )
+    lats = np.random.default_rng(0).uniform(20.0, 21.0, 5000)
+    lons = np.random.default_rng(1).uniform(85.0, 86.0, 5000)
+    values, nearest = interpolator.estimate_many(lats, lons)
+
+    assert values.shape == (5000, 5)
+    # Farms with no reference within range get no estimate instead of a guess
+    in_range = nearest <= 75.0
+    assert np.isnan(values[~in_range, 0]).all()
+    assert np.all((values[in_range, 0] > 28.0 - 1e-9) & (values[in_range, 0] < 32.0 + 1e-9))
+    assert interpolator.estimate(20.0, 85.0)["temperature"] == 30.0
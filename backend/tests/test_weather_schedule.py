@@ -0,0 +1,20 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.services.weather_schedule import next_due_time
+
+
+def test_next_due_stays_within_jitter_window():
+    refreshed_at = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    rng = random.Random(7)
+    due = [next_due_time(refreshed_at, 3600, 0.1, rng) for _ in range(500)]
+
+    assert min(due) >= refreshed_at + timedelta(seconds=3240)
+    assert max(due) <= refreshed_at + timedelta(seconds=3960)
+    # Jitter actually spreads farms refreshed together across the window
+    assert max(due) - min(due) > timedelta(seconds=600)
+
+
+def test_zero_jitter_is_exactly_one_interval():
+    refreshed_at = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    assert next_due_time(refreshed_at, 21600, 0.0) == refreshed_at + timedelta(hours=6)
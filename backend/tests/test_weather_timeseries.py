@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+
+from app.services import weather_timeseries
+from app.services.district_forecast_table import IST
+from app.services.weather_timeseries import DAY, HOUR, _add_daily_precipitation, _aggregate, _bucket, append_observations
+
+OBSERVED_AT = datetime(2025, 7, 1, 6, 20, tzinfo=timezone.utc)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Answers the observation INSERT ... RETURNING as if ``existing`` cells were already stored"""
+
+    def __init__(self, existing):
+        self.existing = set(existing)
+
+    def execute(self, stmt):
+        params = stmt.compile().params
+        rows = []
+        for i in range(len([k for k in params if k.startswith("cell_key_m")])):
+            row = {c: params[f"{c}_m{i}"] for c in ("cell_key", "observed_at", "temperature", "humidity",
+                                                   "pressure", "wind_speed", "precipitation")}
+            if row["cell_key"] not in self.existing:
+                rows.append(row)
+        return FakeResult(rows)
+
+
+def test_only_newly_inserted_observations_reach_the_rollups(monkeypatch):
+    folded = []
+    monkeypatch.setattr(weather_timeseries, "_upsert_rollups", lambda db, aggregates: folded.extend(aggregates))
+    rows = [{"cell_key": key, "temperature": 30.0} for key in ("a", "b", "c")]
+
+    assert append_observations(FakeSession(existing={"b"}), rows, OBSERVED_AT) == 2
+    assert sorted((agg["cell_key"], agg["resolution"]) for agg in folded) == [
+        ("a", "day"), ("a", "hour"), ("c", "day"), ("c", "hour"),
+    ]
+    assert all(agg["samples"] == 1 for agg in folded)
+
+    # A retried chunk whose observations are all stored folds nothing
+    folded.clear()
+    assert append_observations(FakeSession(existing={"a", "b", "c"}), rows, OBSERVED_AT) == 0
+    assert folded == []
+
+
+def test_averages_count_only_readings_that_have_the_field():
+    observations = [
+        {"cell_key": "a", "observed_at": OBSERVED_AT, "temperature": 30.0, "humidity": 80.0},
+        {"cell_key": "a", "observed_at": OBSERVED_AT, "temperature": 32.0, "humidity": None},
+    ]
+    hour = next(agg for agg in _aggregate(observations) if agg["resolution"] == "hour")
+    assert (hour["samples"], hour["temperature_samples"], hour["humidity_samples"], hour["pressure_samples"]) == (2, 2, 1, 0)
+    assert hour["humidity_sum"] / hour["humidity_samples"] == 80.0
+    assert hour["pressure_sum"] is None
+
+
+def test_buckets_are_india_standard_time_hours_and_days():
+    late_evening_utc = datetime(2025, 7, 1, 18, 40, tzinfo=timezone.utc)
+    assert _bucket(late_evening_utc, HOUR) == datetime(2025, 7, 2, 0, 0, tzinfo=IST)
+    assert _bucket(late_evening_utc, DAY) == datetime(2025, 7, 2, tzinfo=IST)
+    assert _bucket(late_evening_utc, DAY) == datetime(2025, 7, 1, 18, 30, tzinfo=timezone.utc)
+
+
+def test_daily_precipitation_sums_hours_not_readings():
+    def reading(hour, minute, mm):
+        return {"cell_key": "a", "observed_at": datetime(2025, 7, 1, hour, minute, tzinfo=IST), "precipitation": mm}
+
+    # Three refreshes in the 06:00 hour all report the same past-hour rain
+    aggregates = _aggregate([reading(6, 0, 2.0), reading(6, 20, 2.0), reading(6, 40, 1.5), reading(7, 10, 4.0)])
+    hours = {agg["bucket_start"].hour: agg["precipitation_sum"] for agg in aggregates if agg["resolution"] == "hour"}
+    assert hours == {6: 2.0, 7: 4.0}
+
+    # 06:00 already stored 1.0 mm, 07:00 already its 4.0 mm: the day grows by 1.0
+    stored = {("a", datetime(2025, 7, 1, 6, tzinfo=IST)): 1.0, ("a", datetime(2025, 7, 1, 7, tzinfo=IST)): 4.0}
+    _add_daily_precipitation(aggregates, stored)
+    day = next(agg for agg in aggregates if agg["resolution"] == "day")
+    assert day["precipitation_sum"] == 1.0